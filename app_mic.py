@@ -1,101 +1,178 @@
 import os
-import requests
 import streamlit as st
 import pandas as pd
 from datetime import date, datetime, timezone
-import plotly.express as px
-import google.generativeai as genai
 from dotenv import load_dotenv
-from streamlit_autorefresh import st_autorefresh
-from audio_recorder_streamlit import audio_recorder
-import tempfile
-import speech_recognition as sr
-from gtts import gTTS
-import io
+import time
+import hashlib
 import numpy as np
 import json
+from requests import HTTPError
+from streamlit.errors import StreamlitAPIException
+from contextlib import contextmanager
+from mic.firebase import FirebaseClient, PushIdGenerator
+from mic.gemini import gerar_em_stream
+from mic.analise import AnaliseTelemetria, contexto_alertas
+from mic.contexto import construir_contexto
+from mic.dispositivos import EstadoDispositivos
+from mic.historico import HistoricoStore
+from mic.normalizacao import ESQUEMA_CADASTRO, ESQUEMA_TOMADA, normalizar, tabela, tipar
+from mic.llm_cache import DEFAULT_TOLERANCES, RespostaCache, chave as chave_resposta
+from mic.metricas import contar, medir, observar, registro as metricas, servir_do_ambiente
+from mic.registry import DeviceRegistry
+from mic.stream import TelemetriaStream
+from mic.stt import ReconhecimentoOcupado, criar_reconhecedor, reconhecer_audio
+from mic.telemetria import TelemetriaCache
+from mic.tts import AudioCache, SintetizadorTTS, TTSPorSentenca, criar_motor, juntar_audios
 
 # -------------------- Carregar .env --------------------
 load_dotenv()
 GEN_API_KEY = os.getenv("GEMINI_API_KEY")
-if GEN_API_KEY:
-    genai.configure(api_key=GEN_API_KEY)
 
 FIREBASE_DB_URL = os.getenv("FIREBASE_DB_URL", "https://mic-9d88e-default-rtdb.firebaseio.com").rstrip("/")
 FIREBASE_AUTH = os.getenv("FIREBASE_AUTH", "")
-
-# -------------------- Inicialização da sessão --------------------
-if 'df_devices' not in st.session_state:
-    st.session_state.df_devices = pd.DataFrame()
+FIREBASE_POOL_SIZE = int(os.getenv("FIREBASE_POOL_SIZE", "10"))
+FIREBASE_PAGE_SIZE = int(os.getenv("FIREBASE_PAGE_SIZE", "500"))
+# Com streaming, /tomadas chega por uma conexão SSE e o rerun só redesenha a página
+FIREBASE_STREAMING = os.getenv("FIREBASE_STREAMING", "1") == "1"
+# Leitura paginada de /tomadas sem stream (ou com ele caído): nunca mais que a cada POLLING_S
+POLLING_S = float(os.getenv("POLLING_S", "5"))
+# Redesenho da seção ao vivo; 1 s só enquanto o stream está entregando eventos
+REFRESH_MS = 1000 if FIREBASE_STREAMING else int(POLLING_S * 1000)
+# Intervalos (s) dos fragmentos mais lentos: chamados pendentes e histórico
+CHAMADOS_TTL = int(os.getenv("CHAMADOS_TTL", "10"))
+HIST_TTL = int(os.getenv("HIST_TTL", "30"))
+
+REGISTRY_DB = os.getenv("REGISTRY_DB", "dados_consumo_mic.db")
+EXCEL_FILE_NAME = "dados_consumo_mic.xlsx"
+HISTORICO_DIR = os.getenv("HISTORICO_DIR", "historico_cache")
+# Limite de pontos do gráfico histórico (somando todos os dispositivos)
+HIST_MAX_POINTS = int(os.getenv("HIST_MAX_POINTS", "2000"))
+HIST_MIN_POINTS = 30
+# Orçamento do contexto enviado ao Gemini
+CONTEXTO_MAX_TOKENS = int(os.getenv("CONTEXTO_MAX_TOKENS", "1500"))
+CONTEXTO_TOP_N = int(os.getenv("CONTEXTO_TOP_N", "5"))
+# Análise local contínua: standby é consumo entre 0,5 W e STANDBY_MAX_W por STANDBY_MIN_S segundos
+STANDBY_MAX_W = float(os.getenv("STANDBY_MAX_W", "10"))
+STANDBY_MIN_S = float(os.getenv("STANDBY_MIN_S", "1800"))
+
+TELEMETRY_COLS = ["Voltage","Current","Power","Energy","Frequency","PF"]
+
+# Resposta do Gemini exibida (e narrada por sentença) enquanto é gerada
+GEMINI_STREAMING = os.getenv("GEMINI_STREAMING", "1") == "1"
+
+# TTS: motor (gtts, espeak ou silencioso), cache de áudio em disco e pool de síntese
+TTS_ENGINE = os.getenv("TTS_ENGINE", "gtts")
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", os.path.join(".cache", "tts"))
+TTS_CACHE_MAX_MB = int(os.getenv("TTS_CACHE_MAX_MB", "50"))
+TTS_WORKERS = int(os.getenv("TTS_WORKERS", "4"))
+TTS_TIMEOUT = float(os.getenv("TTS_TIMEOUT", "15"))
+
+# Reconhecimento de voz: google (online) ou sphinx/vosk/whisper (offline)
+STT_BACKEND = os.getenv("STT_BACKEND", "google")
+STT_TIMEOUT = float(os.getenv("STT_TIMEOUT", "15"))
+# Transcrições simultâneas no processo (todas as sessões); além disso o pedido é recusado
+STT_WORKERS = int(os.getenv("STT_WORKERS", "4"))
+
+# Cache de respostas do Gemini: tolerâncias por grandeza podem ser ajustadas via JSON
+LLM_CACHE_FILE = os.getenv("LLM_CACHE_FILE", os.path.join(".cache", "gemini_respostas.json"))
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", "600"))
+LLM_CACHE_MAX = int(os.getenv("LLM_CACHE_MAX", "256"))
+LLM_CACHE_TOLERANCES = {**DEFAULT_TOLERANCES, **json.loads(os.getenv("LLM_CACHE_TOLERANCES", "{}"))}
 
 # -------------------- Firebase --------------------
-def firebase_get(path: str):
-    url = f"{FIREBASE_DB_URL}/{path.lstrip('/')}.json"
-    params = {}
-    if FIREBASE_AUTH:
-        params["auth"] = FIREBASE_AUTH
-    r = requests.get(url, params=params, timeout=10)
-    if r.status_code == 200:
-        try:
-            return r.json()
-        except Exception:
-            return None
-    else:
-        r.raise_for_status()
+@st.cache_resource
+def get_firebase_client():
+    # Um único cliente (e pool de conexões) por processo, compartilhado entre reruns e sessões
+    return FirebaseClient(FIREBASE_DB_URL, FIREBASE_AUTH, pool_size=FIREBASE_POOL_SIZE)
+
+@st.cache_resource
+def get_telemetria_stream():
+    return TelemetriaStream(get_firebase_client(), "/tomadas").start()
+
+@st.cache_resource
+def get_registry():
+    registry = DeviceRegistry(REGISTRY_DB)
+    # Migração única da planilha legada para o cadastro SQLite
+    registry.migrate_from_excel(EXCEL_FILE_NAME)
+    return registry
+
+@st.cache_resource
+def get_historico_store():
+    return HistoricoStore(HISTORICO_DIR)
+
+def firebase_get(path: str, params: dict = None):
+    return get_firebase_client().get(path, params=params)
+
+def firebase_get_many(paths, return_exceptions: bool = False):
+    return get_firebase_client().get_many(paths, return_exceptions=return_exceptions)
 
 def firebase_put(path: str, data: dict):
-    url = f"{FIREBASE_DB_URL}/{path.lstrip('/')}.json"
-    params = {}
-    if FIREBASE_AUTH:
-        params["auth"] = FIREBASE_AUTH
-    try:
-        if data is None:
-            r = requests.delete(url, params=params, timeout=10)
-            r.raise_for_status()
-            return r.json()
-        else:
-            headers = {"Content-Type": "application/json"}
-            payload = json.dumps(data, default=str)
-            r = requests.put(url, data=payload, params=params, headers=headers, timeout=10)
-            r.raise_for_status()
-            return r.json()
-    except Exception as e:
-        raise
+    return get_firebase_client().put(path, data)
 
 def firebase_post(path: str, data: dict):
-    url = f"{FIREBASE_DB_URL}/{path.lstrip('/')}.json"
-    params = {}
-    if FIREBASE_AUTH:
-        params["auth"] = FIREBASE_AUTH
-    try:
-        headers = {"Content-Type": "application/json"}
-        payload = json.dumps(data, default=str)
-        r = requests.post(url, data=payload, params=params, headers=headers, timeout=10)
-        r.raise_for_status()
-        return r.json()
-    except Exception as e:
-        raise
+    return get_firebase_client().post(path, data)
+
+def firebase_patch(path: str, data: dict):
+    return get_firebase_client().patch(path, data)
 
 def fetch_tomada(device_id: str):
     try:
         data = firebase_get(f"/tomadas/{device_id}")
         if not isinstance(data, dict):
             return None
-        ts = data.get("ts")
-        t = datetime.fromtimestamp(ts, tz=timezone.utc) if isinstance(ts, (int,float)) else datetime.now(timezone.utc)
-        return {
-            "time": t.isoformat(),
-            "Voltage": float(data.get("Voltage", 127.8)),
-            "Current": float(data.get("Current", 0.0)),
-            "Power": float(data.get("Power", 0.0)),
-            "Energy": float(data.get("Energy", 0.0)),
-            "Frequency": float(data.get("Frequency", 60.0)),
-            "PF": float(data.get("PF", 1.0)),
-        }
+        leitura = normalizar({device_id: data}, ESQUEMA_TOMADA)
+        t = datetime.fromtimestamp(int(leitura["ts"][0]), tz=timezone.utc)
+        return {"time": t.isoformat(), **{col: leitura[col][0] for col in TELEMETRY_COLS}}
     except Exception as e:
         st.warning(f"Não foi possível ler /tomadas/{device_id} do Firebase: {e}")
         return None
 
+def fetch_tomadas(page_size: int = FIREBASE_PAGE_SIZE):
+    # Lê /tomadas em poucas páginas ordenadas por $key em vez de um GET por dispositivo
+    tomadas = {}
+    last_key = None
+    while True:
+        params = {"orderBy": '"$key"', "limitToFirst": page_size}
+        if last_key is not None:
+            # startAt é inclusivo: pede um item a mais e descarta a última chave já lida
+            params["startAt"] = json.dumps(last_key)
+            params["limitToFirst"] = page_size + 1
+        page = firebase_get("/tomadas", params=params)
+        if not isinstance(page, dict) or not page:
+            break
+        keys = sorted(k for k in page.keys() if k != last_key)
+        for k in keys:
+            if isinstance(page[k], dict):
+                # o histórico gravado pelo ESP32 em /tomadas/{id}/historico não faz parte da leitura atual
+                tomadas[k] = {f: v for f, v in page[k].items() if f != "historico"}
+        if len(keys) < page_size:
+            break
+        last_key = keys[-1]
+    return tomadas
+
+def tomadas_para_dataframe(tomadas: dict):
+    cols = ["Device_ID", "time"] + TELEMETRY_COLS
+    if not tomadas:
+        return pd.DataFrame(columns=cols)
+    return tabela(tomadas, ESQUEMA_TOMADA, chave="Device_ID")[cols]
+
+def aplicar_telemetria(df_registered, tomadas: dict):
+    # Junta a leitura atual de cada tomada aos dispositivos registrados (merge vetorizado)
+    if df_registered.empty or "Device_ID" not in df_registered.columns:
+        return df_registered
+    df_fb = tomadas_para_dataframe(tomadas)
+    if df_fb.empty:
+        return df_registered
+    df_merged = df_registered.merge(df_fb, on="Device_ID", how="left", suffixes=("", "_fb"))
+    for col in ["time"] + TELEMETRY_COLS:
+        if col in df_registered.columns:
+            df_merged[col] = df_merged[f"{col}_fb"].combine_first(df_merged[col])
+        else:
+            df_merged[col] = df_merged[f"{col}_fb"]
+    # o merge devolve Device_ID como texto e medidas em float64: volta aos tipos do esquema
+    return tipar(df_merged.drop(columns=[f"{col}_fb" for col in ["time"] + TELEMETRY_COLS]), ESQUEMA_CADASTRO)
+
 # -------------------- Configuração do Gemini --------------------
 MODELO_ESCOLHIDO = "gemini-1.5-flash"
 prompt_sistema = """
@@ -106,112 +183,212 @@ Forneça alertas e recomendações para economizar energia com base nos dados ap
 Se a pergunta não puder ser respondida apenas com os dados fornecidos, você pode fornecer informações gerais baseadas em boas práticas ou conhecimento de mercado,
 indicando claramente quando a resposta é uma estimativa ou referência externa.
 """
-if GEN_API_KEY:
-    llm = genai.GenerativeModel(model_name=MODELO_ESCOLHIDO, system_instruction=prompt_sistema)
-else:
-    llm = None
+@st.cache_resource
+def get_llm():
+    # google.generativeai (e gRPC) só é importado na primeira pergunta, não a cada processo novo
+    if not GEN_API_KEY:
+        return None
+    import google.generativeai as genai
+    genai.configure(api_key=GEN_API_KEY)
+    return genai.GenerativeModel(model_name=MODELO_ESCOLHIDO, system_instruction=prompt_sistema)
+
+PROMPT_ALERTAS = ("Achados da análise automática dos dispositivos:\n{contexto}\n\n"
+                  "Redija esses achados como alertas curtos, cada um com uma recomendação para economizar energia.")
+PROMPT_PERGUNTA = "Considere os dispositivos:\n{contexto}\n\nPergunta: {pergunta}"
+
+@st.cache_resource
+def get_resposta_cache():
+    return RespostaCache(LLM_CACHE_FILE, ttl=LLM_CACHE_TTL, max_entries=LLM_CACHE_MAX)
+
+def chave_gemini(template: str, contexto, **campos):
+    # Leituras quase iguais (dentro das tolerâncias) reaproveitam a resposta anterior
+    return chave_resposta(
+        f"{MODELO_ESCOLHIDO}\n{prompt_sistema}\n{template}", contexto.registros,
+        extra=json.dumps(campos, sort_keys=True, ensure_ascii=False), tolerancias=LLM_CACHE_TOLERANCES,
+    )
+
+@st.cache_resource
+def get_sintetizador():
+    cache = AudioCache(TTS_CACHE_DIR, max_bytes=TTS_CACHE_MAX_MB * 1024 * 1024)
+    return SintetizadorTTS(criar_motor(TTS_ENGINE), cache, max_workers=TTS_WORKERS)
+
+@st.cache_resource
+def get_servidor_metricas():
+    # /metrics (Prometheus) em METRICAS_PORTA, um servidor por processo
+    return servir_do_ambiente()
+
+@st.cache_resource
+def get_reconhecedor():
+    return criar_reconhecedor(STT_BACKEND)
+
+def exibir_audio(tts):
+    # Fragmento próprio: o script termina com o texto e o áudio aparece quando a síntese acaba,
+    # com as sentenças unidas num só player. Só se reexecuta enquanto a síntese está pendente;
+    # depois de mostrar o player, não agenda mais nada
+    inicio = time.monotonic()
+
+    def audio_resposta():
+        if not tts.concluido() and time.monotonic() - inicio < TTS_TIMEOUT:
+            st.caption("🔊 Gerando áudio…")
+            time.sleep(0.3)
+            try:
+                st.rerun(scope="fragment")
+            except StreamlitAPIException:
+                # Execução completa do app: o Streamlit não reexecuta só o fragmento, então espera aqui
+                tts.aguardar(max(0.0, TTS_TIMEOUT - (time.monotonic() - inicio)))
+        audios = tts.audios()
+        falhas = [a for a in audios if isinstance(a, Exception)]
+        if falhas:
+            st.warning(f"Não foi possível gerar {len(falhas)} trecho(s) do áudio: {falhas[0]}")
+        audio = juntar_audios([a for a in audios if not isinstance(a, Exception)], get_sintetizador().formato)
+        if audio:
+            st.audio(audio, format=get_sintetizador().formato, autoplay=True)
+
+    st.fragment(audio_resposta)()
+
+def responder_gemini(template: str, contexto, titulo: str, msg_erro: str, **campos):
+    # Texto vai para o placeholder conforme chega; cada sentença completa já segue para o TTS
+    texto_area = st.empty()
+    audio_area = st.empty()
+    tts = TTSPorSentenca(get_sintetizador(), lang="pt")
+
+    llm = get_llm()
+    if not llm:
+        texto_resposta = "Gemini não está configurado (GEMINI_API_KEY ausente)."
+        tts.adicionar(texto_resposta)
+    else:
+        cache = get_resposta_cache()
+        key = chave_gemini(template, contexto, **campos)
+        texto_resposta = cache.get(key)
+        contar("gemini_cache", resultado="falha" if texto_resposta is None else "acerto")
+        if texto_resposta is not None:
+            tts.adicionar(texto_resposta)
+        elif not GEMINI_STREAMING:
+            try:
+                with medir("gemini", modo="bloqueante"):
+                    texto_resposta = llm.generate_content(template.format(contexto=contexto, **campos)).text
+                cache.put(key, texto_resposta)
+            except Exception as e:
+                texto_resposta = f"{msg_erro}: {e}"
+            tts.adicionar(texto_resposta)
+        else:
+            partes = []
+            inicio = time.perf_counter()
+            try:
+                for parte in gerar_em_stream(llm, template.format(contexto=contexto, **campos)):
+                    if not partes:
+                        observar("gemini_primeiro_token_segundos", time.perf_counter() - inicio)
+                    partes.append(parte)
+                    tts.adicionar(parte)
+                    texto_area.markdown(f"**{titulo}** {''.join(partes)}▌")
+                texto_resposta = "".join(partes)
+                cache.put(key, texto_resposta)
+                observar("gemini_segundos", time.perf_counter() - inicio, modo="stream")
+            except Exception as e:
+                contar("gemini_erros", modo="stream")
+                texto_resposta = "".join(partes) + f"\n\n{msg_erro}: {e}"
+                tts.adicionar(f"{msg_erro}.")
+
+    tts.finalizar()
+    texto_area.markdown(f"**{titulo}** {texto_resposta}")
+    with audio_area.container():
+        exibir_audio(tts)
+    return texto_resposta
 
 # -------------------- Funções auxiliares --------------------
+CHAMADO_PENDENTE = "pending_registration"
+
+@st.cache_data(ttl=CHAMADOS_TTL, show_spinner=False)
+def fetch_device_calls():
+    # Só os chamados pendentes, pela consulta indexada (".indexOn": "status" em /device_calls)
+    params = {"orderBy": '"status"', "equalTo": json.dumps(CHAMADO_PENDENTE)}
+    try:
+        return firebase_get("/device_calls", params=params)
+    except HTTPError as e:
+        if e.response is None or e.response.status_code != 400:
+            raise
+    # Regras sem o índice: o Firebase recusa a consulta e a fila é filtrada aqui
+    calls = firebase_get("/device_calls")
+    return {k: v for k, v in calls.items() if isinstance(v, dict) and v.get("status") == CHAMADO_PENDENTE} if isinstance(calls, dict) else {}
+
 def get_pending_device_calls():
     try:
-        calls = firebase_get("/device_calls")
+        calls = fetch_device_calls()
         if calls:
-            registered_devices = st.session_state.df_devices['Device_ID'].tolist() if 'df_devices' in st.session_state and not st.session_state.df_devices.empty else []
-            pending_ids = [dev_id for dev_id in calls.keys() if calls[dev_id] and calls[dev_id].get('status') == 'pending_registration' and dev_id not in registered_devices]
-            return pending_ids
+            registered_devices = set(dados_atuais()["Device_ID"])
+            return sorted(dev_id for dev_id, call in calls.items()
+                          if isinstance(call, dict) and call.get("status") == CHAMADO_PENDENTE
+                          and dev_id not in registered_devices)
         return []
     except Exception as e:
         st.warning(f"Não foi possível buscar chamados de dispositivos: {e}")
         return []
 
 # -------------------- Registro e atualização de dispositivos --------------------
+# Metadados que a skill da Alexa lê em /dispositivos (o cadastro completo fica no banco local)
+CAMPOS_ESPELHO = ["Dispositivo", "Prioridade", "Nome_Conectado", "Modelo_Dispositivo"]
+push_id = PushIdGenerator()
+
+def _metadados(registro):
+    return {c: "" if pd.isna(registro.get(c)) else str(registro.get(c)) for c in CAMPOS_ESPELHO}
+
+def espelhar_dispositivos(registros):
+    # Um único PATCH multi-caminho em /dispositivos, qualquer que seja o número de registros
+    dados = {str(r["Device_ID"]): _metadados(r) for r in registros if r.get("Device_ID")}
+    if dados:
+        firebase_patch("/dispositivos", dados)
+
+def registrar_lote(registros):
+    """Registra vários dispositivos: upsert no cadastro local e um único PATCH multi-caminho no Firebase.
+
+    O PATCH remove os chamados, grava o registro inicial no histórico e espelha os
+    metadados em /dispositivos. Se ele falhar, os chamados continuam pendentes e o
+    lote pode ser reenviado (o upsert é idempotente). Devolve os registros gravados.
+    """
+    agora = datetime.now(timezone.utc).isoformat()
+    novos = [{**{col: 0.0 for col in TELEMETRY_COLS}, "time": agora, "Nome_Conectado": "", "Modelo_Dispositivo": "",
+              **r, "Device_ID": str(r["Device_ID"])} for r in registros]
+    if not novos:
+        return []
+    get_registry().upsert_many(novos)
+    atualizacoes = {}
+    for r in novos:
+        dev = r["Device_ID"]
+        atualizacoes[f"device_calls/{dev}"] = None
+        atualizacoes[f"historico/{dev}/{push_id()}"] = r
+        atualizacoes[f"dispositivos/{dev}"] = _metadados(r)
+    firebase_patch("/", atualizacoes)
+    return novos
+
+def register_devices(registros):
+    try:
+        novos = registrar_lote(registros)
+    except Exception as e:
+        st.error(f"Erro ao registrar dispositivos: {e}")
+        return
+    nomes = ", ".join(f"'{r['Dispositivo']}'" for r in novos[:5]) + ("..." if len(novos) > 5 else "")
+    st.success(f"✅ {len(novos)} dispositivo(s) registrado(s) e salvo(s) no cadastro: {nomes}")
+
+    # Atualizar dados imediatamente
+    fetch_device_calls.clear()
+    carregar_historico.clear()
+    atualizar_dados()
+    st.rerun()
+
 def register_new_device(device_id, nome_aparelho, prioridade, nome_conectado, modelo_dispositivo):
-    new_device_data = {
+    register_devices([{
         "Device_ID": device_id,
         "Dispositivo": nome_aparelho,
         "Prioridade": prioridade,
         "Nome_Conectado": nome_conectado,
         "Modelo_Dispositivo": modelo_dispositivo,
-        "time": datetime.now(timezone.utc).isoformat(),
-        "Voltage": 0.0,
-        "Current": 0.0,
-        "Power": 0.0,
-        "Energy": 0.0,
-        "Frequency": 0.0,
-        "PF": 0.0,
-    }
-
-    if st.session_state.df_devices.empty:
-        st.session_state.df_devices = pd.DataFrame(columns=list(new_device_data.keys()))
-
-    if device_id not in st.session_state.df_devices['Device_ID'].values:
-        st.session_state.df_devices = pd.concat([st.session_state.df_devices, pd.DataFrame([new_device_data])], ignore_index=True)
-    else:
-        idx = st.session_state.df_devices[st.session_state.df_devices['Device_ID']==device_id].index[0]
-        for key, value in new_device_data.items():
-            if key != "Device_ID":
-                st.session_state.df_devices.loc[idx, key] = value
-
-    # Salvar Excel
-    try:
-        st.session_state.df_devices.to_excel("dados_consumo_mic.xlsx", index=False)
-        st.success(f"✅ Dispositivo '{nome_aparelho}' registrado/atualizado e salvo no Excel!")
-        try:
-            firebase_put(f"/device_calls/{device_id}", None)
-        except Exception as e:
-            st.warning(f"Não foi possível remover o chamado no Firebase: {e}")
-        try:
-            firebase_post(f"/historico/{device_id}", new_device_data)
-        except Exception as e:
-            st.warning(f"Não foi possível salvar no histórico do Firebase: {e}")
-        
-        # Atualizar dados imediatamente
-        st.session_state.df_devices = atualizar_dados()
-        st.rerun()
-        
-    except Exception as e:
-        st.error(f"Erro ao salvar dispositivo no Excel: {e}")
-
-def atualizar_dados():
-    df_local = pd.DataFrame()
-    EXCEL_FILE_NAME = "dados_consumo_mic.xlsx"
+    }])
 
-    if os.path.exists(EXCEL_FILE_NAME):
-        try:
-            df_registered = pd.read_excel(EXCEL_FILE_NAME)
-            for col in ["Voltage","Current","Power","Energy","Frequency","PF"]:
-                if col in df_registered.columns:
-                    df_registered[col] = pd.to_numeric(df_registered[col], errors='coerce').fillna(0.0)
-            df_registered["time"] = pd.to_datetime(df_registered["time"], errors="coerce")
-            df_local = df_registered.copy()
-        except Exception as e:
-            st.warning(f"Erro ao carregar dados do Excel: {e}")
-            df_local = pd.DataFrame(columns=[
-                "Device_ID","Dispositivo","Prioridade","Nome_Conectado","Modelo_Dispositivo",
-                "time","Voltage","Current","Power","Energy","Frequency","PF"
-            ])
-    else:
-        df_local = pd.DataFrame(columns=[
-            "Device_ID","Dispositivo","Prioridade","Nome_Conectado","Modelo_Dispositivo",
-            "time","Voltage","Current","Power","Energy","Frequency","PF"
-        ])
-
-    updated_rows = []
-    for index, row in df_local.iterrows():
-        device_id = row.get("Device_ID")
-        if device_id:
-            firebase_data = fetch_tomada(device_id)
-            if firebase_data:
-                row["time"] = pd.to_datetime(firebase_data["time"])
-                row["Voltage"] = float(firebase_data["Voltage"])
-                row["Current"] = float(firebase_data["Current"])
-                row["Power"] = float(firebase_data["Power"])
-                row["Energy"] = float(firebase_data["Energy"])
-                row["Frequency"] = float(firebase_data["Frequency"])
-                row["PF"] = float(firebase_data["PF"])
-        updated_rows.append(row)
-
-    df_local = pd.DataFrame(updated_rows)
+# -------------------- Estado compartilhado entre sessões --------------------
+def carregar_cadastro():
+    # Roda na thread do cache de telemetria: erros sobem e são exibidos pelas sessões
+    df_local = get_registry().to_dataframe()
+    df_local["time"] = pd.to_datetime(df_local["time"], errors="coerce", utc=True).dt.tz_localize(None)
 
     if df_local.empty:
         mock_data = [
@@ -223,310 +400,422 @@ def atualizar_dados():
         df_local = pd.DataFrame(mock_data)
         df_local["time"] = pd.to_datetime(df_local["time"], errors="coerce")
 
-    return df_local
+    return tipar(df_local, ESQUEMA_CADASTRO)
 
-def gerar_contexto_resumido(df_input):
-    cols = ["Dispositivo","Voltage","Current","Power","Energy","PF","Prioridade","Nome_Conectado","Modelo_Dispositivo"]
-    existing_cols = [c for c in cols if c in df_input.columns]
-    return df_input[existing_cols].to_dict(orient="records")
+@st.cache_resource
+def get_telemetria_cache():
+    # Um único leitor de /tomadas por processo; as sessões só leem o snapshot publicado
+    stream = get_telemetria_stream() if FIREBASE_STREAMING else None
+    return TelemetriaCache(carregar_cadastro, fetch_tomadas, montar_estado,
+                           stream=stream, intervalo=POLLING_S).start()
 
-# -------------------- Streamlit UI --------------------
-st.set_page_config(page_title="GoodWe Assistant", layout="wide", page_icon="⚡")
-st.title("⚡ GoodWe Assistant — Projeto de Monitoramento de Aparelhos")
-st.caption("Visualização e recomendações de consumo de energia de dispositivos domésticos")
-
-# Atualiza dados apenas se necessário
-if st.session_state.df_devices.empty:
-    st.session_state.df_devices = atualizar_dados()
-
-df = st.session_state.df_devices.copy()
-
-# -------------------- Sidebar --------------------
-with st.sidebar:
-    st.header("Configurações")
-    data_ref = st.date_input("Data de referência", value=date.today())
-    auto_refresh = st.checkbox("Atualizar automaticamente (5s)", value=True)
-    if auto_refresh:
-        st_autorefresh(interval=5000, key="datarefresh")
-    
-    # Botão de salvar - com verificação de segurança
-    if st.button("💾 Salvar no Excel"):
-        if not st.session_state.df_devices.empty:
-            try:
-                st.session_state.df_devices.to_excel("dados_consumo_mic.xlsx", index=False)
-                st.sidebar.success("Dados salvos com sucesso!")
-            except Exception as e:
-                st.sidebar.error(f"Erro ao salvar: {e}")
-        else:
-            st.sidebar.warning("Nenhum dado para salvar.")
-    
-    # Botão de download - com verificação de segurança
-    if not st.session_state.df_devices.empty:
-        csv_data = st.session_state.df_devices.to_csv(index=False).encode("utf-8")
-        st.download_button(
-            "⬇ Baixar CSV",
-            csv_data,
-            f"goodwe_{date.today()}.csv",
-            "text/csv"
-        )
-    else:
-        st.sidebar.info("Nenhum dado disponível para download")
+@st.cache_resource
+def get_analise():
+    return AnaliseTelemetria(standby_max_w=STANDBY_MAX_W, standby_min_s=STANDBY_MIN_S)
 
-    st.markdown("---")
-    st.header("Gerenciamento de Dispositivos")
-
-    # Registro manual
-    with st.expander("🛠️ Registrar dispositivo manualmente"):
-        device_id_manual = st.text_input("ID do dispositivo (manual)")
-        nome_aparelho_manual = st.text_input("Nome do Aparelho (manual)")
-        prioridade_manual = st.selectbox("Ordem de Prioridade (manual)", ["Máxima","Moderada","Mínima"], key="prioridade_manual")
-        nome_conectado_manual = st.text_input("Nome do Dispositivo Conectado (manual)")
-        modelo_dispositivo_manual = st.text_input("Modelo do Dispositivo (manual)")
-
-        if st.button("Registrar Manualmente"):
-            if device_id_manual and nome_aparelho_manual:
+def montar_estado(df_registered, tomadas: dict):
+    # Leituras novas alimentam a análise local (O(1) por amostra)
+    get_analise().observar_lote(tomadas)
+    # Uma cópia compacta por atualização, compartilhada por todas as sessões
+    return EstadoDispositivos.de_dataframe(aplicar_telemetria(df_registered, tomadas))
+
+def estado_atual():
+    return get_telemetria_cache().snapshot().dados or EstadoDispositivos.vazio()
+
+def dados_atuais():
+    # DataFrame sobre os buffers do estado compartilhado: somente leitura, sem cópia
+    return estado_atual().frame
+
+def nomes_dispositivos():
+    estado = estado_atual()
+    return dict(zip(estado.textos["Device_ID"], estado.textos["Dispositivo"])) if len(estado) else {}
+
+def intervalo_ao_vivo() -> float:
+    # Sem eventos novos, redesenhar a cada segundo só repetiria o mesmo estado
+    if FIREBASE_STREAMING and get_telemetria_stream().ativo():
+        return REFRESH_MS / 1000
+    return POLLING_S
+
+def atualizar_dados():
+    # Cadastro mudou: republica o estado já, sem esperar a próxima volta da thread
+    return (get_telemetria_cache().recarregar().dados or EstadoDispositivos.vazio()).frame
+
+def gerar_contexto_resumido(df_input):
+    return construir_contexto(df_input, max_tokens=CONTEXTO_MAX_TOKENS, top_n=CONTEXTO_TOP_N)
+
+def plotly_express():
+    # plotly.express custa centenas de ms para importar: só quando a primeira figura é montada
+    import plotly.express as px
+    return px
+
+# -------------------- Seções da página --------------------
+# Cada seção mede o próprio tempo de renderização; as que dependem de dados ao vivo
+# rodam como fragmentos com intervalo próprio, sem reexecutar a página inteira.
+@contextmanager
+def medir_secao(nome: str):
+    inicio = time.perf_counter()
+    yield
+    ms = (time.perf_counter() - inicio) * 1000
+    st.session_state.setdefault("tempos_secoes", {})[nome] = ms
+    observar("secao_segundos", ms / 1000, secao=nome)
+    if st.session_state.get("debug_tempos"):
+        st.caption(f"⏱️ {nome}: {ms:.1f} ms")
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def figura_barras(_estado, versao: int, y: str, titulo: str):
+    # Chaveada pela versão do estado publicado: nada é copiado nem hasheado a cada tick
+    dados = {"Dispositivo": _estado.textos["Dispositivo"], y: _estado.coluna(y)}
+    with medir("plotly", figura="barras"):
+        return plotly_express().bar(dados, x="Dispositivo", y=y, color="Dispositivo", title=titulo)
+
+@st.cache_data(ttl=HIST_TTL, show_spinner=False)
+def carregar_historico(dispositivos: tuple, nomes: tuple):
+    # Sincroniza só os registros novos e lê séries já agregadas do cache local
+    historico_store = get_historico_store()
+    erros = historico_store.sync(firebase_get_many, dispositivos)
+    nomes = dict(nomes)
+    pontos_por_dispositivo = max(HIST_MIN_POINTS, HIST_MAX_POINTS // max(len(dispositivos), 1))
+    frames = []
+    for dev in dispositivos:
+        temp_df = historico_store.serie(dev, max_points=pontos_por_dispositivo)
+        if not temp_df.empty:
+            temp_df['Dispositivo'] = nomes.get(dev) or dev
+            temp_df['Device_ID'] = dev
+            frames.append(temp_df)
+    df_historico = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+    # Se não houver histórico real, fallback para mock (30 dias)
+    if df_historico.empty:
+        dias = pd.date_range(start=date.today().replace(day=1), periods=30)
+        frames = [
+            pd.DataFrame({
+                "time": dias,
+                "Dispositivo": disp,
+                "Energy": np.random.uniform(low=0.05, high=0.5, size=len(dias))
+            })
+            for disp in dict.fromkeys(nomes.values())
+        ]
+        df_historico = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+    if 'time' in df_historico.columns:
+        df_historico = df_historico.sort_values('time')
+    return df_historico, {str(dev): str(erro) for dev, erro in erros.items()}
+
+def secao_sidebar():
+    with st.sidebar:
+        st.header("Configurações")
+        auto_refresh = st.checkbox(f"Atualizar automaticamente ({REFRESH_MS // 1000}s)", value=True)
+        st.checkbox("Mostrar tempos de renderização", key="debug_tempos")
+
+        df = dados_atuais()
+        # Botão de salvar - com verificação de segurança
+        if st.button("💾 Salvar cadastro"):
+            if not df.empty:
                 try:
-                    register_new_device(
-                        device_id=device_id_manual,
-                        nome_aparelho=nome_aparelho_manual,
-                        prioridade=prioridade_manual,
-                        nome_conectado=nome_conectado_manual,
-                        modelo_dispositivo=modelo_dispositivo_manual
-                    )
+                    registros = df.to_dict(orient="records")
+                    get_registry().upsert_many(registros)
+                    st.sidebar.success("Dados salvos com sucesso!")
                 except Exception as e:
-                    st.error(f"Erro ao registrar dispositivo manualmente: {e}")
+                    st.sidebar.error(f"Erro ao salvar: {e}")
+                else:
+                    try:
+                        espelhar_dispositivos(registros)
+                    except Exception as e:
+                        st.sidebar.warning(f"Não foi possível espelhar o cadastro em /dispositivos: {e}")
+            else:
+                st.sidebar.warning("Nenhum dado para salvar.")
+
+        # Botão de download - com verificação de segurança
+        if not df.empty:
+            st.download_button(
+                "⬇ Baixar CSV",
+                df.to_csv(index=False).encode("utf-8"),
+                f"goodwe_{date.today()}.csv",
+                "text/csv"
+            )
+        else:
+            st.sidebar.info("Nenhum dado disponível para download")
+
+        # Importação de planilha para o cadastro
+        planilha = st.file_uploader("Importar planilha (xlsx/csv)", type=["xlsx", "csv"])
+        if planilha is not None and st.button("Importar para o cadastro"):
+            try:
+                total = get_registry().import_file(planilha, name=planilha.name)
+                st.sidebar.success(f"{total} dispositivos importados.")
+                atualizar_dados()
+            except Exception as e:
+                st.sidebar.error(f"Erro ao importar: {e}")
             else:
-                st.error("ID e Nome do aparelho são obrigatórios para registro manual.")
-
-# -------------------- Chamados pendentes --------------------
-pending_calls = get_pending_device_calls()
-if pending_calls:
-    st.subheader("Chamados Pendentes")
-    selected_device_id = st.selectbox("Selecione um dispositivo para registrar:", pending_calls)
-    with st.form("form_register_device"):
-        st.write(f"Registrando dispositivo com ID: **{selected_device_id}**")
-        nome_aparelho = st.text_input("Nome do Aparelho (obrigatório)", key=f"nome_aparelho_{selected_device_id}")
-        prioridade = st.selectbox("Ordem de Prioridade", ["Máxima","Moderada","Mínima"], key=f"prioridade_{selected_device_id}")
-        nome_conectado = st.text_input("Nome do Dispositivo Conectado (opcional)", key=f"nome_conectado_{selected_device_id}")
-        modelo_dispositivo = st.text_input("Modelo do Dispositivo (opcional)", key=f"modelo_dispositivo_{selected_device_id}")
-
-        submitted = st.form_submit_button("Registrar Dispositivo")
-        if submitted:
-            if nome_aparelho:
                 try:
-                    register_new_device(selected_device_id, nome_aparelho, prioridade, nome_conectado, modelo_dispositivo)
+                    espelhar_dispositivos(get_registry().to_dataframe().to_dict(orient="records"))
                 except Exception as e:
-                    st.error(f"Erro ao registrar dispositivo: {e}")
-            else:
-                st.error("O nome do aparelho é obrigatório.")
-else:
-    st.info("Nenhum chamado de dispositivo pendente.")
-
-# -------------------- KPIs --------------------
-col1,col2,col3,col4 = st.columns(4)
-try:
-    tension_mean = st.session_state.df_devices['Voltage'].mean() if not st.session_state.df_devices.empty else 0.0
-    current_sum = st.session_state.df_devices['Current'].sum() if not st.session_state.df_devices.empty else 0.0
-    power_sum = st.session_state.df_devices['Power'].sum() if not st.session_state.df_devices.empty else 0.0
-    energy_sum = st.session_state.df_devices['Energy'].sum() if not st.session_state.df_devices.empty else 0.0
-except Exception:
-    tension_mean=current_sum=power_sum=energy_sum=0.0
-
-col1.metric("Tensão média (V)", f"{tension_mean:.2f}")
-col2.metric("Corrente total (A)", f"{current_sum:.2f}")
-col3.metric("Potência total (W)", f"{power_sum:.2f}")
-col4.metric("Energia total (kWh)", f"{energy_sum:.3f}")
-
-# -------------------- Gráficos --------------------
-left,right = st.columns(2)
-with left:
-    try:
-        if not st.session_state.df_devices.empty:
-            st.plotly_chart(px.bar(st.session_state.df_devices, x="Dispositivo", y="Power", color="Dispositivo", title="Potência (W)"), use_container_width=True)
-        else:
-            st.info("Nenhum dado disponível para gráfico de potência.")
-    except Exception:
-        st.info("Gráfico de potência indisponível.")
-with right:
-    try:
-        if not st.session_state.df_devices.empty:
-            st.plotly_chart(px.bar(st.session_state.df_devices, x="Dispositivo", y="Energy", color="Dispositivo", title="Energia (kWh)"), use_container_width=True)
+                    st.sidebar.warning(f"Não foi possível espelhar o cadastro em /dispositivos: {e}")
+
+        st.markdown("---")
+        st.header("Gerenciamento de Dispositivos")
+
+        # Registro manual
+        with st.expander("🛠️ Registrar dispositivo manualmente"):
+            device_id_manual = st.text_input("ID do dispositivo (manual)")
+            nome_aparelho_manual = st.text_input("Nome do Aparelho (manual)")
+            prioridade_manual = st.selectbox("Ordem de Prioridade (manual)", ["Máxima","Moderada","Mínima"], key="prioridade_manual")
+            nome_conectado_manual = st.text_input("Nome do Dispositivo Conectado (manual)")
+            modelo_dispositivo_manual = st.text_input("Modelo do Dispositivo (manual)")
+
+            if st.button("Registrar Manualmente"):
+                if device_id_manual and nome_aparelho_manual:
+                    try:
+                        register_new_device(
+                            device_id=device_id_manual,
+                            nome_aparelho=nome_aparelho_manual,
+                            prioridade=prioridade_manual,
+                            nome_conectado=nome_conectado_manual,
+                            modelo_dispositivo=modelo_dispositivo_manual
+                        )
+                    except Exception as e:
+                        st.error(f"Erro ao registrar dispositivo manualmente: {e}")
+                else:
+                    st.error("ID e Nome do aparelho são obrigatórios para registro manual.")
+
+        # Preenchido ao fim da execução, com os tempos de todas as seções
+        painel_tempos = st.empty()
+    return auto_refresh, painel_tempos
+
+def secao_chamados():
+    with medir_secao("Chamados pendentes"):
+        pending_calls = get_pending_device_calls()
+        if pending_calls:
+            st.subheader("Chamados Pendentes")
+            selected_device_id = st.selectbox("Selecione um dispositivo para registrar:", pending_calls)
+            with st.form("form_register_device"):
+                st.write(f"Registrando dispositivo com ID: **{selected_device_id}**")
+                nome_aparelho = st.text_input("Nome do Aparelho (obrigatório)", key=f"nome_aparelho_{selected_device_id}")
+                prioridade = st.selectbox("Ordem de Prioridade", ["Máxima","Moderada","Mínima"], key=f"prioridade_{selected_device_id}")
+                nome_conectado = st.text_input("Nome do Dispositivo Conectado (opcional)", key=f"nome_conectado_{selected_device_id}")
+                modelo_dispositivo = st.text_input("Modelo do Dispositivo (opcional)", key=f"modelo_dispositivo_{selected_device_id}")
+
+                submitted = st.form_submit_button("Registrar Dispositivo")
+                if submitted:
+                    if nome_aparelho:
+                        try:
+                            register_new_device(selected_device_id, nome_aparelho, prioridade, nome_conectado, modelo_dispositivo)
+                        except Exception as e:
+                            st.error(f"Erro ao registrar dispositivo: {e}")
+                    else:
+                        st.error("O nome do aparelho é obrigatório.")
+
+            # Provisionamento em massa: preenche a tabela e grava tudo com um único PATCH
+            if len(pending_calls) > 1:
+                with st.expander(f"📦 Registrar em lote ({len(pending_calls)} pendentes)"):
+                    with st.form("form_register_lote"):
+                        lote = st.data_editor(
+                            pd.DataFrame({"Device_ID": pending_calls, "Dispositivo": "", "Prioridade": "Moderada",
+                                          "Nome_Conectado": "", "Modelo_Dispositivo": ""}),
+                            disabled=["Device_ID"], hide_index=True, width="stretch",
+                            column_config={"Prioridade": st.column_config.SelectboxColumn(
+                                "Prioridade", options=["Máxima", "Moderada", "Mínima"], required=True)},
+                        )
+                        if st.form_submit_button("Registrar preenchidos"):
+                            preenchidos = lote[lote["Dispositivo"].fillna("").str.strip() != ""]
+                            if preenchidos.empty:
+                                st.error("Preencha o nome do aparelho de pelo menos um dispositivo.")
+                            else:
+                                register_devices(preenchidos.to_dict(orient="records"))
         else:
-            st.info("Nenhum dado disponível para gráfico de energia.")
-    except Exception:
-        st.info("Gráfico de energia indisponível.")
-
-# -------------------- Tabela --------------------
-with st.expander("📊 Ver tabela completa"):
-    if not st.session_state.df_devices.empty:
-        df_display = st.session_state.df_devices.copy()
-        df_display["time"] = pd.to_datetime(df_display["time"], errors="coerce").dt.strftime("%Y-%m-%d %H:%M")
-        st.dataframe(df_display, width="stretch", hide_index=True)
-    else:
-        st.info("Nenhum dado disponível para exibição.")
-
-# -------------------- Gemini: Alertas --------------------
-st.markdown("---")
-st.header("💬 Alertas e recomendações do Gemini")
-if st.button("Gerar alertas e recomendações"):
-    if not st.session_state.df_devices.empty:
-        contexto = gerar_contexto_resumido(st.session_state.df_devices)
-        prompt = f"Analise os dispositivos:\n{contexto}\n\nForneça alertas e recomendações para economizar energia."
-        try:
-            if llm:
-                resposta = llm.generate_content(prompt)
-                texto_resposta = resposta.text
+            st.info("Nenhum chamado de dispositivo pendente.")
+
+def secao_ao_vivo():
+    estado = get_telemetria_cache().snapshot()
+    if "cadastro" in estado.erros:
+        st.warning(f"Erro ao carregar o cadastro de dispositivos: {estado.erros['cadastro']}")
+    if "tomadas" in estado.erros:
+        st.warning(f"Não foi possível ler /tomadas do Firebase: {estado.erros['tomadas']}")
+    if "stream" in estado.erros:
+        st.warning(f"Atualização em tempo real interrompida: {estado.erros['stream']}")
+    dispositivos = estado.dados or EstadoDispositivos.vazio()
+
+    # -------------------- KPIs --------------------
+    with medir_secao("KPIs"):
+        col1,col2,col3,col4 = st.columns(4)
+        kpis = dispositivos.kpis()
+        col1.metric("Tensão média (V)", f"{kpis['tensao_media']:.2f}")
+        col2.metric("Corrente total (A)", f"{kpis['corrente_total']:.2f}")
+        col3.metric("Potência total (W)", f"{kpis['potencia_total']:.2f}")
+        col4.metric("Energia total (kWh)", f"{kpis['energia_total']:.3f}")
+
+        resumo = get_analise().resumo()
+        col5,col6,col7,col8 = st.columns(4)
+        col5.metric("Potência média móvel (W)", f"{resumo['potencia_ewma_total']:.0f}")
+        col6.metric("Maior pico (W)", f"{resumo['pico_w']:.0f}")
+        col7.metric("Standby (W)", f"{resumo['standby_w']:.1f}", f"{resumo['standby_dispositivos']} dispositivos", delta_color="off")
+        col8.metric("Alertas ativos", resumo["alertas"])
+
+    # -------------------- Alertas locais --------------------
+    with medir_secao("Alertas locais"):
+        alertas = get_analise().alertas()
+        if alertas:
+            nomes = nomes_dispositivos()
+            with st.expander(f"🚨 Alertas locais ({len(alertas)})"):
+                for alerta in alertas:
+                    st.markdown(f"**{nomes.get(alerta.device_id) or alerta.device_id}** — {alerta.mensagem}")
+
+    # -------------------- Gráficos --------------------
+    with medir_secao("Gráficos"):
+        left,right = st.columns(2)
+        with left:
+            try:
+                if len(dispositivos):
+                    st.plotly_chart(figura_barras(dispositivos, estado.versao, "Power", "Potência (W)"), use_container_width=True)
+                else:
+                    st.info("Nenhum dado disponível para gráfico de potência.")
+            except Exception:
+                st.info("Gráfico de potência indisponível.")
+        with right:
+            try:
+                if len(dispositivos):
+                    st.plotly_chart(figura_barras(dispositivos, estado.versao, "Energy", "Energia (kWh)"), use_container_width=True)
+                else:
+                    st.info("Nenhum dado disponível para gráfico de energia.")
+            except Exception:
+                st.info("Gráfico de energia indisponível.")
+
+    # -------------------- Tabela --------------------
+    with medir_secao("Tabela"):
+        with st.expander("📊 Ver tabela completa"):
+            if len(dispositivos):
+                # formata a hora no navegador em vez de copiar a tabela para converter em texto
+                st.dataframe(dispositivos.frame, width="stretch", hide_index=True,
+                             column_config={"time": st.column_config.DatetimeColumn(format="YYYY-MM-DD HH:mm")})
             else:
-                texto_resposta = "Gemini não está configurado (GEMINI_API_KEY ausente)."
-        except Exception as e:
-            texto_resposta = f"Erro ao gerar resposta do Gemini: {e}"
-
-        # Geração de áudio (TTS)
-        try:
-            tts = gTTS(texto_resposta, lang="pt")
-            audio_buffer = io.BytesIO()
-            tts.write_to_fp(audio_buffer)
-            audio_buffer.seek(0)
-            st.audio(audio_buffer, format="audio/mp3")
-        except Exception as e:
-            st.warning(f"Não foi possível gerar áudio: {e}")
-
-        st.markdown(f"**Alertas e recomendações:** {texto_resposta}")
-    else:
-        st.warning("Nenhum dado disponível para análise.")
+                st.info("Nenhum dado disponível para exibição.")
+
+def secao_alertas():
+    with medir_secao("Gemini: alertas"):
+        st.header("💬 Alertas e recomendações do Gemini")
+        cache_stats = get_resposta_cache().stats()
+        audio_cache = get_sintetizador().cache
+        st.caption(
+            f"Cache de respostas: {cache_stats['hits']} acertos, {cache_stats['misses']} falhas, {cache_stats['entries']} entradas"
+            f" · Cache de áudio: {audio_cache.hits} acertos, {audio_cache.misses} falhas"
+        )
+        if st.button("Gerar alertas e recomendações"):
+            # Os alertas já saem da análise local; o Gemini só os redige, e só quando há algum
+            alertas = get_analise().alertas()
+            if alertas:
+                contexto = contexto_alertas(alertas, nomes_dispositivos())
+                # A legenda vem antes: o player do áudio reexecuta só o próprio fragmento e encerra esta execução
+                st.caption(f"Contexto: {contexto.tokens} tokens, {len(alertas)} alertas em {contexto.dispositivos} dispositivos")
+                responder_gemini(PROMPT_ALERTAS, contexto, "Alertas e recomendações:", "Erro ao gerar resposta do Gemini")
+            else:
+                st.info("Nenhum alerta ativo na análise local dos dispositivos.")
 
-# -------------------- Gemini: Perguntas Texto/Voz --------------------
-st.markdown("---")
-st.header("🎙️ Pergunte ao Gemini")
+def secao_perguntas():
+    with medir_secao("Gemini: perguntas"):
+        st.header("🎙️ Pergunte ao Gemini")
 
-col_input, col_audio = st.columns([3,1])
-with col_input:
-    pergunta_texto = st.text_input("Digite sua pergunta:")
-with col_audio:
-    audio_bytes = audio_recorder()
+        col_input, col_audio = st.columns([3,1])
+        with col_input:
+            pergunta_texto = st.text_input("Digite sua pergunta:")
+        with col_audio:
+            from audio_recorder_streamlit import audio_recorder
+            audio_bytes = audio_recorder()
 
-pergunta_usuario = None
-if audio_bytes:
-    try:
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as temp_audio:
-            temp_audio.write(audio_bytes)
-            audio_path = temp_audio.name
-        recognizer = sr.Recognizer()
-        with sr.AudioFile(audio_path) as source:
-            audio_data = recognizer.record(source)
-            pergunta_usuario = recognizer.recognize_google(audio_data, language="pt-BR")
-        st.write(f"**Você disse:** {pergunta_usuario}")
-    except Exception as e:
-        st.warning(f"Não foi possível reconhecer o áudio: {e}")
-elif pergunta_texto:
-    pergunta_usuario = pergunta_texto
-    st.write(f"**Você escreveu:** {pergunta_usuario}")
-
-if pergunta_usuario:
-    if not st.session_state.df_devices.empty:
-        contexto = gerar_contexto_resumido(st.session_state.df_devices)
-        prompt = f"Considere os dispositivos:\n{contexto}\n\nPergunta: {pergunta_usuario}"
-        try:
-            if llm:
-                resposta = llm.generate_content(prompt)
-                texto_resposta = resposta.text
+        pergunta_usuario = None
+        if audio_bytes:
+            try:
+                # O componente devolve a mesma gravação a cada rerun: só transcreve gravações novas
+                audio_hash = hashlib.sha1(audio_bytes).hexdigest()
+                if st.session_state.get("stt_hash") != audio_hash:
+                    st.session_state.stt_texto = reconhecer_audio(audio_bytes, get_reconhecedor(), idioma="pt-BR",
+                                                                   timeout=STT_TIMEOUT, max_workers=STT_WORKERS)
+                    st.session_state.stt_hash = audio_hash
+                pergunta_usuario = st.session_state.stt_texto
+                st.write(f"**Você disse:** {pergunta_usuario}")
+            except TimeoutError:
+                st.warning(f"O reconhecimento de voz passou de {STT_TIMEOUT:.0f} s. Tente novamente.")
+            except ReconhecimentoOcupado:
+                st.warning("O reconhecimento de voz está ocupado com outras gravações. Tente novamente em instantes.")
+            except Exception as e:
+                st.warning(f"Não foi possível reconhecer o áudio: {e}")
+        elif pergunta_texto:
+            pergunta_usuario = pergunta_texto
+            st.write(f"**Você escreveu:** {pergunta_usuario}")
+
+        if pergunta_usuario:
+            df = dados_atuais()
+            if not df.empty:
+                contexto = gerar_contexto_resumido(df)
+                st.caption(f"Contexto: {contexto.tokens} tokens, {contexto.incluidos} de {contexto.dispositivos} dispositivos")
+                responder_gemini(PROMPT_PERGUNTA, contexto, "Resposta do Gemini:", "Erro ao consultar Gemini",
+                                 pergunta=pergunta_usuario)
             else:
-                texto_resposta = "Gemini não está configurado (GEMINI_API_KEY ausente)."
-        except Exception as e:
-            texto_resposta = f"Erro ao consultar Gemini: {e}"
+                st.warning("Nenhum dado disponível para consulta.")
 
-        # TTS e saída de áudio
+def secao_historico():
+    with medir_secao("Histórico"):
+        st.header("📈 Histórico geral de energia consumida (últimos registros)")
+        df = dados_atuais()
         try:
-            tts = gTTS(texto_resposta, lang="pt")
-            audio_out = io.BytesIO()
-            tts.write_to_fp(audio_out)
-            audio_out.seek(0)
-            st.audio(audio_out, format="audio/mp3")
-        except Exception as e:
-            st.warning(f"Não foi possível gerar áudio: {e}")
-
-        st.markdown(f"**Resposta do Gemini:** {texto_resposta}")
-    else:
-        st.warning("Nenhum dado disponível para consulta.")
+            dispositivos = tuple(df['Device_ID'].unique()) if not df.empty else ()
+            nomes = tuple(zip(df['Device_ID'], df['Dispositivo'])) if len(dispositivos) else ()
+        except Exception:
+            dispositivos, nomes = (), ()
+
+        df_historico, erros = carregar_historico(dispositivos, nomes)
+        for dev, erro in erros.items():
+            st.warning(f"Erro ao buscar histórico do dispositivo {dev}: {erro}")
+
+        if not df_historico.empty:
+            with medir("plotly", figura="historico"):
+                fig_hist = plotly_express().line(
+                    df_historico,
+                    x="time",
+                    y="Energy",
+                    color="Dispositivo",
+                    markers=True,
+                    title="Energia consumida por dispositivo (histórico)"
+                )
+            fig_hist.update_layout(
+                xaxis_title="Data",
+                yaxis_title="Energia consumida (kWh)"
+            )
+            st.plotly_chart(fig_hist, use_container_width=True)
+        else:
+            st.info("Histórico indisponível.")
 
-# -------------------- Gráfico histórico (agora real) --------------------
-st.markdown("---")
-st.header("📈 Histórico geral de energia consumida (últimos registros)")
+# -------------------- Streamlit UI --------------------
+def main():
+    st.set_page_config(page_title="GoodWe Assistant", layout="wide", page_icon="⚡")
+    get_servidor_metricas()
+    st.title("⚡ GoodWe Assistant — Projeto de Monitoramento de Aparelhos")
+    st.caption("Visualização e recomendações de consumo de energia de dispositivos domésticos")
 
-try:
-    dispositivos = st.session_state.df_devices['Device_ID'].unique() if not st.session_state.df_devices.empty else []
-except Exception:
-    dispositivos = []
+    # -------------------- Sidebar --------------------
+    auto_refresh, painel_tempos = secao_sidebar()
 
-df_historico = pd.DataFrame()
-for dev in dispositivos:
-    try:
-        dados_hist = firebase_get(f"/historico/{dev}")
-        if dados_hist and isinstance(dados_hist, dict):
-            temp_df = pd.DataFrame(dados_hist).T.reset_index(drop=True)
-            # normalizar colunas
-            if 'time' in temp_df.columns:
-                temp_df['time'] = pd.to_datetime(temp_df['time'], errors='coerce')
-            else:
-                temp_df['time'] = pd.NaT
-            if 'Energy' in temp_df.columns:
-                temp_df['Energy'] = pd.to_numeric(temp_df['Energy'], errors='coerce')
-            else:
-                temp_df['Energy'] = np.nan
-            if 'Power' in temp_df.columns:
-                temp_df['Power'] = pd.to_numeric(temp_df['Power'], errors='coerce')
-            else:
-                temp_df['Power'] = np.nan
-            # garantir Dispositivo
-            if 'Dispositivo' not in temp_df.columns:
-                nome = st.session_state.df_devices.loc[st.session_state.df_devices['Device_ID']==dev, 'Dispositivo']
-                temp_df['Dispositivo'] = nome.iloc[0] if len(nome)>0 else dev
-            temp_df['Device_ID'] = dev
-            df_historico = pd.concat([df_historico, temp_df], ignore_index=True)
-    except Exception as e:
-        st.warning(f"Erro ao buscar histórico do dispositivo {dev}: {e}")
+    # -------------------- Chamados pendentes --------------------
+    st.fragment(secao_chamados, run_every=CHAMADOS_TTL if auto_refresh else None)()
 
-# Se não houver histórico real, fallback para mock (30 dias)
-if df_historico.empty:
-    dias = pd.date_range(start=date.today().replace(day=1), periods=30)
-    df_historico = pd.DataFrame()
-    try:
-        dispositivos_nomes = st.session_state.df_devices['Dispositivo'].unique() if not st.session_state.df_devices.empty else []
-    except Exception:
-        dispositivos_nomes = []
-    for disp in dispositivos_nomes:
-        energia_mock = np.random.uniform(low=0.05, high=0.5, size=len(dias))
-        df_temp = pd.DataFrame({
-            "time": dias,
-            "Dispositivo": disp,
-            "Energy": energia_mock
-        })
-        df_historico = pd.concat([df_historico, df_temp], ignore_index=True)
-
-if not df_historico.empty:
-    # limpando/ordenando
-    if 'time' in df_historico.columns:
-        df_historico = df_historico.sort_values('time')
-    fig_hist = px.line(
-        df_historico,
-        x="time",
-        y="Energy",
-        color="Dispositivo",
-        markers=True,
-        title="Energia consumida por dispositivo (histórico)"
-    )
-    fig_hist.update_layout(
-        xaxis_title="Data",
-        yaxis_title="Energia consumida (kWh)"
-    )
-    st.plotly_chart(fig_hist, use_container_width=True)
-else:
-    st.info("Histórico indisponível.")
-
-# -------------------- Explicação das métricas (FINAL) --------------------
-st.markdown("---")
-with st.expander("ℹ️ O que são estas informações?"):
-    st.markdown("""
+    # -------------------- KPIs, gráficos e tabela (ao vivo) --------------------
+    st.fragment(secao_ao_vivo, run_every=intervalo_ao_vivo() if auto_refresh else None)()
+
+    # -------------------- Gemini: Alertas --------------------
+    # Como fragmentos, cliques e perguntas não recarregam o restante da página
+    st.markdown("---")
+    st.fragment(secao_alertas)()
+
+    # -------------------- Gemini: Perguntas Texto/Voz --------------------
+    st.markdown("---")
+    st.fragment(secao_perguntas)()
+
+    # -------------------- Gráfico histórico (agora real) --------------------
+    st.markdown("---")
+    st.fragment(secao_historico, run_every=HIST_TTL if auto_refresh else None)()
+
+    # -------------------- Explicação das métricas (FINAL) --------------------
+    st.markdown("---")
+    with st.expander("ℹ️ O que são estas informações?"):
+        st.markdown("""
 O GoodWe Assistant monitora os seguintes parâmetros de consumo elétrico para cada dispositivo:
 
 - **Tensão (Voltage - V):** A diferença de potencial aplicada ao dispositivo.
@@ -540,3 +829,20 @@ O GoodWe Assistant monitora os seguintes parâmetros de consumo elétrico para c
 💡 **Dica:** Dispositivos com alto consumo de potência ou energia acumulada podem impactar significativamente a conta de luz.
 Use os gráficos e alertas do Gemini para identificar picos de consumo e otimizar seu uso de energia.
 """)
+
+    # Tempos da execução completa; reexecuções de fragmentos atualizam só as próprias legendas
+    if st.session_state.get("debug_tempos"):
+        with painel_tempos.container():
+            st.markdown("---")
+            st.subheader("⏱️ Tempos de renderização")
+            tempos = sorted(st.session_state.get("tempos_secoes", {}).items(), key=lambda item: -item[1])
+            st.dataframe(pd.DataFrame(tempos, columns=["Seção", "ms"]).round(1), hide_index=True)
+            # Métricas do processo (todas as sessões): Firebase, Gemini, TTS, voz e figuras
+            if metricas.habilitado:
+                st.subheader("📊 Métricas do processo")
+                st.dataframe(pd.DataFrame(metricas.resumo()).round(1), hide_index=True)
+            else:
+                st.caption("Defina METRICAS=1 para medir Firebase, Gemini, TTS e voz em todas as sessões.")
+
+if __name__ == "__main__":
+    main()
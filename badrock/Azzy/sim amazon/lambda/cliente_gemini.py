@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+"""Cliente do Gemini para a skill: conexão reaproveitada, streaming com corte e cache da apresentação.
+
+A Alexa espera no máximo 8 s pela resposta. A resposta vem por streaming
+(streamGenerateContent com SSE) e, ao fim do orçamento, a leitura é cortada:
+fica a melhor resposta parcial, terminada na última frase completa. A sessão
+HTTP é do módulo, então invocações num contêiner quente não refazem TLS.
+
+A resposta ao prompt fixo de apresentação pode ser pré-calculada::
+
+    python cliente_gemini.py --intro   # grava intro_cache.json ao lado deste arquivo
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from metricas import contar, observar
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+INTRO_CACHE_FILE = os.path.join(BASE_DIR, "intro_cache.json")
+
+MODELO = os.getenv("GEMINI_MODEL", "gemini-2.5-flash-lite")
+# GEMINI_BASE_URL permite apontar para um servidor local (mic.fake_gemini) nos testes
+BASE_URL = os.getenv("GEMINI_BASE_URL", "https://generativelanguage.googleapis.com/v1beta").rstrip("/")
+ORCAMENTO_S = float(os.getenv("GEMINI_ORCAMENTO_S", "6.0"))  # folga para o resto do handler dentro dos 8 s
+TIMEOUT_CONEXAO = 2.0
+FIM_DE_FRASE = (". ", "! ", "? ", ".\n", "!\n", "?\n", "\n\n")
+
+# Sessão compartilhada entre invocações do mesmo contêiner (keep-alive)
+http = requests.Session()
+http.mount("https://", HTTPAdapter(pool_connections=2, pool_maxsize=4))
+http.mount("http://", HTTPAdapter(pool_connections=2, pool_maxsize=4))
+
+
+class ErroGemini(Exception):
+    def __init__(self, status: int, texto: str):
+        super().__init__(f"{status} {texto[:300]}")
+        self.status = status
+
+
+@dataclass
+class Resposta:
+    texto: str
+    completo: bool  # False quando o orçamento acabou antes do fim do stream
+    segundos: float
+
+
+def _chave_api() -> str:
+    return os.getenv("GOOGLE_API_KEY", "")
+
+
+def melhor_parcial(texto: str) -> str:
+    """Corta uma resposta interrompida na última frase completa"""
+    texto = texto.strip()
+    if texto.endswith((".", "!", "?")):
+        # o corte veio logo depois de uma frase completa
+        return texto
+    fim = max(texto.rfind(marca) for marca in FIM_DE_FRASE)
+    if fim > 0:
+        return texto[:fim + 1].strip()
+    return f"{texto}…" if texto else ""
+
+
+def gerar(payload: dict, orcamento_s: float = None) -> Resposta:
+    """Faz streaming do generateContent e devolve o que chegou dentro do orçamento"""
+    orcamento_s = ORCAMENTO_S if orcamento_s is None else orcamento_s
+    inicio = time.monotonic()
+    pedacos, fim = [], threading.Event()
+    estado = {"erro": None}
+
+    def ler():
+        try:
+            url = f"{BASE_URL}/models/{MODELO}:streamGenerateContent"
+            with http.post(url, params={"alt": "sse"}, json=payload, stream=True,
+                           headers={"x-goog-api-key": _chave_api()},
+                           timeout=(TIMEOUT_CONEXAO, orcamento_s)) as resp:
+                if resp.status_code != 200:
+                    raise ErroGemini(resp.status_code, resp.text)
+                # chunk_size=None entrega os eventos assim que chegam
+                for linha in resp.iter_lines(chunk_size=None):
+                    if fim.is_set():
+                        break
+                    if not linha.startswith(b"data:"):
+                        continue
+                    evento = json.loads(linha[5:])
+                    for candidato in evento.get("candidates", [])[:1]:
+                        for parte in candidato.get("content", {}).get("parts", []):
+                            pedacos.append(parte.get("text", ""))
+        except Exception as e:
+            if not fim.is_set():
+                estado["erro"] = e
+        finally:
+            fim.set()
+
+    threading.Thread(target=ler, name="gemini-stream", daemon=True).start()
+    completo = fim.wait(orcamento_s)
+    if not completo:
+        # corte: fica com o que já chegou; a thread larga o stream no próximo evento
+        # (fechar a resposta daqui bloquearia até a leitura em andamento terminar)
+        fim.set()
+    texto = "".join(pedacos)
+    if estado["erro"] is not None and not texto:
+        raise estado["erro"]
+    if estado["erro"] is not None:
+        completo = False
+    observar("gemini_segundos", time.monotonic() - inicio)
+    if not completo:
+        contar("gemini_cortes")
+    return Resposta(texto.strip() if completo else melhor_parcial(texto), completo, time.monotonic() - inicio)
+
+
+# -------------------- Apresentação pré-calculada --------------------
+_intro_memo = {}
+
+
+def _chave_intro(prompt: str) -> str:
+    return hashlib.sha256(f"{MODELO}\n{prompt}".encode("utf-8")).hexdigest()
+
+
+def _carregar_intro_cache() -> dict:
+    try:
+        with open(INTRO_CACHE_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def resposta_intro(prompt: str, orcamento_s: float = None) -> str:
+    """Resposta ao prompt fixo: do intro_cache.json, da memória do contêiner ou, em último caso, do modelo"""
+    chave = _chave_intro(prompt)
+    if chave not in _intro_memo:
+        _intro_memo.update(_carregar_intro_cache())
+    texto = _intro_memo.get(chave)
+    if texto:
+        return texto
+    logger.warning("Apresentação fora do intro_cache.json; chamando o modelo")
+    resposta = gerar({"contents": [{"role": "user", "parts": [{"text": prompt}]}]}, orcamento_s)
+    if resposta.completo and resposta.texto:
+        _intro_memo[chave] = resposta.texto
+    return resposta.texto
+
+
+def gravar_intro_cache(prompt: str):
+    """Gera a resposta completa da apresentação (sem o corte da Alexa) e grava no cache"""
+    resposta = gerar({"contents": [{"role": "user", "parts": [{"text": prompt}]}]}, orcamento_s=60)
+    if not resposta.completo or not resposta.texto:
+        raise RuntimeError("Resposta incompleta do modelo; cache não gravado")
+    cache = _carregar_intro_cache()
+    cache[_chave_intro(prompt)] = resposta.texto
+    with open(INTRO_CACHE_FILE, "w", encoding="utf-8") as f:
+        json.dump(cache, f, ensure_ascii=False, indent=2)
+    return resposta.texto
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--intro", action="store_true", help="pré-calcula a resposta ao prompt.txt")
+    args = parser.parse_args()
+    if args.intro:
+        with open(os.path.join(BASE_DIR, "prompt.txt"), "r", encoding="utf-8") as f:
+            print(gravar_intro_cache(f.read().strip()))
@@ -0,0 +1,305 @@
+# -*- coding: utf-8 -*-
+"""Dados das tomadas para a skill: respostas prontas sem passar pelo modelo.
+
+Lê a mesma telemetria do dashboard (/tomadas) e os nomes que o dashboard
+espelha em /dispositivos. Tudo fica num snapshot em cache no contêiner:
+/tomadas por alguns segundos, o cadastro por alguns minutos.
+
+Perguntas comuns são respondidas por templates:
+- potência agora;
+- energia de hoje;
+- aparelho que mais consome.
+
+Para perguntas abertas sobre os aparelhos, o Gemini recebe só um resumo compacto dos dados.
+
+A energia de hoje é a leitura atual menos a última leitura de /historico/{id}
+entre a meia-noite de ontem e a de hoje. Essa referência vem de uma consulta
+por $key, porque as chaves de push são cronológicas. Ela é guardada até o dia
+virar. Só o painel (cadastros) e o simulador escrevem nesse nó: o firmware
+publica apenas a leitura atual, com o Energy acumulado desde que ligou, e o PUT
+em /tomadas/{id} apaga o próprio /historico a cada envio. Sem referência, a
+resposta diz que não há histórico em vez de dar um valor.
+"""
+import difflib
+import json
+import logging
+import os
+import re
+import time
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from metricas import medir
+
+logger = logging.getLogger(__name__)
+
+TOMADAS_TTL_S = float(os.getenv("TOMADAS_TTL_S", "15"))
+CADASTRO_TTL_S = float(os.getenv("CADASTRO_TTL_S", "300"))
+FIREBASE_TIMEOUT_S = float(os.getenv("FIREBASE_TIMEOUT_S", "2.5"))
+FUSO_HORARIO = os.getenv("FUSO_HORARIO", "America/Sao_Paulo")
+LEITURA_ANTIGA_S = 600  # leituras mais velhas que isso são avisadas na resposta
+DIA_MS = 24 * 3600 * 1000
+# O firmware manda ts = millis()/1000 (uptime); só carimbos acima disso são epoch e têm idade
+TS_EPOCH_MIN = 1e9
+PUSH_CHARS = "-0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ_abcdefghijklmnopqrstuvwxyz"
+# Palavras que indicam pergunta sobre a casa; "energia" sozinha não conta, é o assunto geral da Azzy
+PALAVRAS_CONSUMO = {"consumo", "consumindo", "consome", "gasta", "gastando", "gastou", "gastei", "watts", "watt",
+                    "kwh", "quilowatt", "aparelho", "aparelhos", "tomada", "tomadas", "standby", "potencia"}
+ARTIGOS = {"a", "o", "as", "os", "da", "do", "das", "dos", "minha", "meu", "de"}
+
+
+@dataclass
+class Leitura:
+    device_id: str
+    nome: str
+    power: float
+    energy: float
+    ts: float
+
+
+def normalizar_nome(texto: str) -> str:
+    """Minúsculas, sem acentos e sem artigos: "a Geladeira" -> "geladeira" """
+    texto = unicodedata.normalize("NFKD", texto or "").encode("ascii", "ignore").decode("ascii").lower()
+    palavras = [p for p in re.findall(r"[a-z0-9]+", texto) if p not in ARTIGOS]
+    return " ".join(palavras)
+
+
+def _numero(valor, padrao: float = 0.0) -> float:
+    try:
+        valor = float(valor)
+    except (TypeError, ValueError):
+        return padrao
+    return padrao if valor != valor else valor
+
+
+def watts(valor: float) -> str:
+    return f"{valor:,.0f}".replace(",", ".") + " watts"
+
+
+def kwh(valor: float) -> str:
+    return f"{valor:.2f}".replace(".", ",") + " quilowatt-hora"
+
+
+def prefixo_push(ms: int) -> str:
+    """Os 8 primeiros caracteres de uma chave de push criada no instante `ms`"""
+    chars = []
+    for _ in range(8):
+        chars.append(PUSH_CHARS[ms % 64])
+        ms //= 64
+    return "".join(reversed(chars))
+
+
+def _fuso():
+    try:
+        from zoneinfo import ZoneInfo
+        return ZoneInfo(FUSO_HORARIO)
+    except Exception:
+        return timezone(timedelta(hours=-3))
+
+
+class Casa:
+    def __init__(self, db_url: str, auth: str = "", ttl_tomadas: float = TOMADAS_TTL_S,
+                 ttl_cadastro: float = CADASTRO_TTL_S, timeout: float = FIREBASE_TIMEOUT_S):
+        self.db_url = db_url.rstrip("/")
+        self.auth = auth
+        self.ttl_tomadas = ttl_tomadas
+        self.ttl_cadastro = ttl_cadastro
+        self.timeout = timeout
+        self.fuso = _fuso()
+        self.http = requests.Session()
+        self.http.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=8))
+        self.http.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=8))
+        self._tomadas = (0.0, None)  # (lido_em, {id: leitura})
+        self._cadastro = (0.0, {})  # (lido_em, {id: metadados})
+        self._referencias = ("", {})  # (dia, {id: Energy à meia-noite})
+
+    # ---------- Firebase ----------
+    def _get(self, path: str, params: dict = None):
+        params = dict(params or {})
+        if self.auth:
+            params["auth"] = self.auth
+        with medir("firebase"):
+            resp = self.http.get(f"{self.db_url}{path}.json", params=params, timeout=self.timeout)
+            resp.raise_for_status()
+            return resp.json()
+
+    def _tomadas_atuais(self) -> dict:
+        lido_em, tomadas = self._tomadas
+        if tomadas is not None and time.time() - lido_em < self.ttl_tomadas:
+            return tomadas
+        try:
+            data = self._get("/tomadas")
+        except Exception:
+            if tomadas is None:
+                raise
+            logger.warning("Falha ao ler /tomadas; usando o snapshot anterior", exc_info=True)
+            return tomadas
+        tomadas = {k: v for k, v in data.items() if isinstance(v, dict)} if isinstance(data, dict) else {}
+        self._tomadas = (time.time(), tomadas)
+        return tomadas
+
+    def _cadastro_atual(self) -> dict:
+        lido_em, cadastro = self._cadastro
+        if time.time() - lido_em < self.ttl_cadastro:
+            return cadastro
+        try:
+            data = self._get("/dispositivos")
+            cadastro = {k: v for k, v in data.items() if isinstance(v, dict)} if isinstance(data, dict) else {}
+        except Exception:
+            logger.warning("Falha ao ler /dispositivos; usando os IDs como nomes", exc_info=True)
+        self._cadastro = (time.time(), cadastro)
+        return cadastro
+
+    # ---------- consultas ----------
+    def leituras(self) -> list:
+        tomadas = self._tomadas_atuais()
+        cadastro = self._cadastro_atual()
+        leituras = []
+        for dev, valores in tomadas.items():
+            nome = (cadastro.get(dev) or {}).get("Dispositivo") or valores.get("Dispositivo") or dev
+            leituras.append(Leitura(dev, str(nome), _numero(valores.get("Power")), _numero(valores.get("Energy")),
+                                    _numero(valores.get("ts"), 0.0)))
+        return sorted(leituras, key=lambda l: l.power, reverse=True)
+
+    def encontrar(self, aparelho: str, leituras: list = None):
+        """Leitura do aparelho citado (nome falado ou ID), com tolerância a acentos e artigos"""
+        leituras = self.leituras() if leituras is None else leituras
+        alvo = normalizar_nome(aparelho)
+        if not alvo:
+            return None
+        nomes = {normalizar_nome(l.nome): l for l in leituras}
+        nomes.update({normalizar_nome(l.device_id): l for l in leituras})
+        if alvo in nomes:
+            return nomes[alvo]
+        for nome, leitura in nomes.items():
+            if nome and (nome in alvo or alvo in nome):
+                return leitura
+        parecidos = difflib.get_close_matches(alvo, list(nomes), n=1, cutoff=0.75)
+        return nomes[parecidos[0]] if parecidos else None
+
+    def _referencia(self, dev: str, meia_noite_ms: int):
+        ontem = json.dumps(prefixo_push(meia_noite_ms - DIA_MS))
+        prefixo = json.dumps(prefixo_push(meia_noite_ms))
+        # última leitura de ontem; se o aparelho é de hoje, a primeira de hoje. Um registro mais
+        # antigo (ex.: só o do cadastro) não mede o dia e conta como sem histórico
+        for params in ({"orderBy": '"$key"', "startAt": ontem, "endAt": prefixo, "limitToLast": 1},
+                       {"orderBy": '"$key"', "startAt": prefixo, "limitToFirst": 1}):
+            data = self._get(f"/historico/{dev}", params)
+            if isinstance(data, dict):
+                for registro in data.values():
+                    if isinstance(registro, dict) and "Energy" in registro:
+                        return _numero(registro["Energy"])
+        return None
+
+    def energia_hoje(self, leituras: list) -> dict:
+        """kWh consumidos desde a meia-noite, por dispositivo (None sem histórico)"""
+        agora = datetime.now(self.fuso)
+        dia = agora.date().isoformat()
+        dia_ref, referencias = self._referencias
+        if dia_ref != dia:
+            referencias = {}
+            self._referencias = (dia, referencias)
+        faltando = [l.device_id for l in leituras if l.device_id not in referencias]
+        if faltando:
+            meia_noite_ms = int(agora.replace(hour=0, minute=0, second=0, microsecond=0).timestamp() * 1000)
+            with ThreadPoolExecutor(max_workers=min(8, len(faltando))) as pool:
+                for dev, ref in zip(faltando, pool.map(lambda d: self._referencia(d, meia_noite_ms), faltando)):
+                    referencias[dev] = ref
+        energia = {}
+        for l in leituras:
+            ref = referencias.get(l.device_id)
+            # medidor zerado durante o dia: tudo que ele marca agora é de hoje
+            energia[l.device_id] = None if ref is None else (l.energy - ref if l.energy >= ref else l.energy)
+        return energia
+
+    # ---------- respostas ----------
+    def _aviso_idade(self, leituras: list) -> str:
+        ts = max((l.ts for l in leituras if l.ts > TS_EPOCH_MIN), default=0)
+        if ts and time.time() - ts > LEITURA_ANTIGA_S:
+            return f" A última leitura é de {int((time.time() - ts) // 60)} minutos atrás."
+        return ""
+
+    def _nao_encontrado(self, aparelho: str, leituras: list) -> str:
+        nomes = ", ".join(l.nome for l in leituras[:5])
+        return f"Não encontrei o aparelho {aparelho}. Os aparelhos com tomada são: {nomes}."
+
+    def responder_potencia(self, aparelho: str = None) -> str:
+        leituras = self.leituras()
+        if not leituras:
+            return "Ainda não recebi leituras das tomadas."
+        if aparelho:
+            leitura = self.encontrar(aparelho, leituras)
+            if leitura is None:
+                return self._nao_encontrado(aparelho, leituras)
+            return f"{leitura.nome} está consumindo {watts(leitura.power)} agora.{self._aviso_idade([leitura])}"
+        total = sum(l.power for l in leituras)
+        return (f"Agora a casa está consumindo {watts(total)}, somando {len(leituras)} aparelhos."
+                f"{self._aviso_idade(leituras)}")
+
+    def responder_energia_hoje(self, aparelho: str = None) -> str:
+        leituras = self.leituras()
+        if not leituras:
+            return "Ainda não recebi leituras das tomadas."
+        if aparelho:
+            leitura = self.encontrar(aparelho, leituras)
+            if leitura is None:
+                return self._nao_encontrado(aparelho, leituras)
+            leituras = [leitura]
+        energia = self.energia_hoje(leituras)
+        com_historico = [l for l in leituras if energia.get(l.device_id) is not None]
+        if aparelho:
+            if not com_historico:
+                return (f"Não há histórico de leituras de {leituras[0].nome} para hoje, então não sei quanto "
+                        f"ele consumiu no dia. Agora ele está consumindo {watts(leituras[0].power)}.")
+            return f"Hoje {leituras[0].nome} consumiu {kwh(energia[leituras[0].device_id])}."
+        if not com_historico:
+            return ("Não há histórico de leituras de hoje para as tomadas, então não sei quanto a casa consumiu "
+                    f"no dia. Agora ela está consumindo {watts(sum(l.power for l in leituras))}.")
+        maior = max(com_historico, key=lambda l: energia[l.device_id])
+        fala = (f"Hoje a casa consumiu {kwh(sum(energia[l.device_id] for l in com_historico))}. "
+                f"Quem mais gastou foi {maior.nome}, com {kwh(energia[maior.device_id])}.")
+        sem_historico = len(leituras) - len(com_historico)
+        if sem_historico:
+            fala += f" {sem_historico} de {len(leituras)} aparelhos ficaram de fora por não terem histórico de hoje."
+        return fala
+
+    def responder_maior_consumo(self) -> str:
+        leituras = [l for l in self.leituras() if l.power > 0]
+        if not leituras:
+            return "Nenhum aparelho está consumindo energia agora."
+        fala = f"O aparelho que mais consome agora é {leituras[0].nome}, com {watts(leituras[0].power)}."
+        if len(leituras) > 1:
+            fala += f" Em seguida vem {leituras[1].nome}, com {watts(leituras[1].power)}."
+        return fala + self._aviso_idade(leituras[:1])
+
+    # ---------- contexto para o modelo ----------
+    def sobre_dispositivos(self, texto: str) -> bool:
+        """A pergunta fala da casa (consumo ou algum aparelho com tomada)?"""
+        alvo = normalizar_nome(texto)
+        if set(alvo.split()) & PALAVRAS_CONSUMO:
+            return True
+        try:
+            return any(normalizar_nome(l.nome) in alvo for l in self.leituras() if normalizar_nome(l.nome))
+        except Exception:
+            return False
+
+    def contexto_compacto(self, max_dispositivos: int = 10) -> str:
+        leituras = self.leituras()
+        linhas = [f"{l.nome}: {l.power:.0f} W, {l.energy:.2f} kWh acumulados" for l in leituras[:max_dispositivos]]
+        if len(leituras) > max_dispositivos:
+            resto = sum(l.power for l in leituras[max_dispositivos:])
+            linhas.append(f"outros {len(leituras) - max_dispositivos} aparelhos: {resto:.0f} W")
+        return "\n".join(linhas)
+
+
+def casa_do_ambiente():
+    """Casa configurada por FIREBASE_DB_URL/FIREBASE_AUTH; None se a skill não tiver banco"""
+    db_url = os.getenv("FIREBASE_DB_URL", "")
+    if not db_url:
+        return None
+    return Casa(db_url, os.getenv("FIREBASE_AUTH", ""))
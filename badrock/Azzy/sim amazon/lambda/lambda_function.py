@@ -2,70 +2,121 @@
 
 import logging
 import ask_sdk_core.utils as ask_utils
-import requests
 import os
+import threading
+from functools import lru_cache
 from dotenv import load_dotenv
-from ask_sdk_core.skill_builder import SkillBuilder
+from ask_sdk_core.api_client import DefaultApiClient
+from ask_sdk_core.skill_builder import CustomSkillBuilder
 from ask_sdk_core.dispatch_components import AbstractRequestHandler, AbstractExceptionHandler
-from ask_sdk_core.handler_input import HandlerInput
 from ask_sdk_model import Response
 
+import cliente_gemini
+import metricas
+from dispositivos import casa_do_ambiente
+from memoria import memoria_do_ambiente
+
 # Carrega variáveis do .env
 load_dotenv()
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
-# Chave da API
+# Chave da API: sem ela a skill ainda sobe e responde as perguntas sobre as tomadas
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 if not GOOGLE_API_KEY:
-    raise ValueError("A chave GOOGLE_API_KEY não foi encontrada no .env")
-
-# Endpoint do Gemini - modelo rápido para Alexa
-url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash-lite:generateContent?key={GOOGLE_API_KEY}"
+    logger.error("A chave GOOGLE_API_KEY não foi encontrada no .env; o Gemini ficará indisponível")
 
-headers = {
-    "Content-Type": "application/json"
-}
+# Fala enviada como resposta progressiva enquanto o Gemini gera a resposta
+FALA_PENSANDO = os.getenv("ALEXA_FALA_PENSANDO", "Hum, deixa eu pensar.")
+# Áudio pré-gravado (no bucket da skill, em AUDIO_PREFIX) tocado na abertura; vazio desliga
+AUDIO_BOAS_VINDAS = os.getenv("AUDIO_BOAS_VINDAS", "")
 
 # ----------------------------
-# Memória simples (chat em sessão)
+# Memória por sessão da Alexa (janela + resumo, com orçamento de tokens)
 # ----------------------------
-chat_history = []  # Vai guardar mensagens do usuário e IA
+memoria = memoria_do_ambiente()
 
-# Função para chamar o Gemini com contexto
-def call_gemini(user_text: str) -> str:
-    # Adiciona a fala do usuário ao histórico
-    chat_history.append({"role": "user", "parts": [{"text": user_text}]})
+# Telemetria das tomadas (snapshot em cache); None se FIREBASE_DB_URL não estiver configurado
+casa = casa_do_ambiente()
 
-    payload = {
-        "contents": chat_history
-    }
+def session_id(handler_input) -> str:
+    session = handler_input.request_envelope.session
+    return session.session_id if session else "sem-sessao"
+
+# Função para chamar o Gemini com o contexto da sessão
+def call_gemini(user_text: str, sid: str, contexto: str = None) -> str:
+    if not GOOGLE_API_KEY:
+        return "O Gemini não está configurado nesta skill."
+    sessao = memoria.sessao(sid)
+    payload = memoria.payload(sessao, user_text, contexto)
     try:
-        response = requests.post(url, json=payload, headers=headers, timeout=7)
-        if response.status_code == 200:
-            response_data = response.json()
-            candidates = response_data.get("candidates", [])
-            if candidates:
-                parts = candidates[0].get("content", {}).get("parts", [])
-                text = parts[0].get("text", "") if parts else "Texto não encontrado"
-            else:
-                text = "Texto não encontrado"
-
-            # Salva resposta da IA no histórico também
-            chat_history.append({"role": "model", "parts": [{"text": text}]})
-            return text
-        else:
-            logger.error(f"Erro na API Gemini: {response.status_code} {response.text}")
-            return "Erro na requisição"
+        resposta = cliente_gemini.gerar(payload)
+    except cliente_gemini.ErroGemini as e:
+        logger.error(f"Erro na API Gemini: {e}")
+        return "Erro na requisição"
     except Exception as e:
         logger.error(f"Exceção ao chamar Gemini: {e}", exc_info=True)
         return "Erro ao acessar o modelo"
 
+    if not resposta.texto:
+        logger.warning(f"Gemini sem resposta em {resposta.segundos:.1f} s")
+        return "Desculpe, não consegui pensar a tempo. Pode repetir?"
+    if not resposta.completo:
+        logger.info(f"Resposta cortada em {resposta.segundos:.1f} s ({len(resposta.texto)} caracteres)")
+    # Só turnos respondidos entram na memória (com o texto que a Alexa falou)
+    memoria.registrar(sessao, user_text, resposta.texto)
+    return resposta.texto
+
+def enviar_progressivo(handler_input, fala: str):
+    """Resposta progressiva da Alexa: o usuário ouve algo enquanto o modelo trabalha"""
+    try:
+        # modelos da diretiva carregados só quando a primeira resposta progressiva sai
+        from ask_sdk_model.services.directive import Header, SendDirectiveRequest, SpeakDirective
+        request_id = handler_input.request_envelope.request.request_id
+        directive_service = handler_input.service_client_factory.get_directive_service()
+        directive_service.enqueue(SendDirectiveRequest(header=Header(request_id=request_id),
+                                                       directive=SpeakDirective(speech=fala)))
+    except Exception as e:
+        logger.warning(f"Resposta progressiva não enviada: {e}")
+
+def contexto_dispositivos(query: str):
+    """Resumo das tomadas para perguntas abertas sobre a casa (None nas demais)"""
+    if casa is None or not query:
+        return None
+    try:
+        return casa.contexto_compacto() if casa.sobre_dispositivos(query) else None
+    except Exception as e:
+        logger.warning(f"Sem dados das tomadas para o contexto: {e}")
+        return None
+
+def slot_valor(handler_input, nome: str):
+    slots = handler_input.request_envelope.request.intent.slots or {}
+    slot = slots.get(nome)
+    return slot.value if slot is not None else None
+
+def responder_dispositivos(handler_input, pergunta) -> Response:
+    """Resposta por template a partir da telemetria, sem chamar o modelo"""
+    if casa is None:
+        speak_output = "Os dados das tomadas não estão configurados nesta skill."
+    else:
+        try:
+            speak_output = pergunta(casa)
+        except Exception as e:
+            logger.error(f"Erro ao consultar as tomadas: {e}", exc_info=True)
+            speak_output = "Não consegui ler os dados das tomadas agora. Tente de novo em instantes."
+    return (
+        handler_input.response_builder
+            .speak(speak_output)
+            .ask("Quer saber mais alguma coisa?")
+            .response
+    )
+
 # Função para ler o prompt inicial do arquivo
+@lru_cache(maxsize=None)
 def get_initial_prompt() -> str:
     try:
-        with open("prompt.txt", "r", encoding="utf-8") as f:
+        with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "prompt.txt"), "r", encoding="utf-8") as f:
             return f.read().strip()
     except FileNotFoundError:
         logger.warning("prompt.txt não encontrado. Usando prompt padrão.")
@@ -80,8 +131,18 @@ class LaunchRequestHandler(AbstractRequestHandler):
 
     def handle(self, handler_input):
         intro_text = get_initial_prompt()
-        resposta_modelo = call_gemini(intro_text)
+        # Prompt fixo: resposta pré-calculada, sem esperar o modelo
+        try:
+            resposta_modelo = cliente_gemini.resposta_intro(intro_text)
+        except Exception as e:
+            logger.error(f"Exceção ao gerar a apresentação: {e}", exc_info=True)
+            resposta_modelo = "Olá!"
+        else:
+            memoria.registrar(memoria.sessao(session_id(handler_input)), intro_text, resposta_modelo, fixo=True)
         speak_output = resposta_modelo + " Como posso te ajudar?"
+        if AUDIO_BOAS_VINDAS:
+            from utils import audio_ssml  # boto3 só é importado se houver áudio configurado
+            speak_output = audio_ssml(AUDIO_BOAS_VINDAS) + speak_output
         return (
             handler_input.response_builder
                 .speak(speak_output)
@@ -95,7 +156,11 @@ class ChatIntentHandler(AbstractRequestHandler):
 
     def handle(self, handler_input):
         query = handler_input.request_envelope.request.intent.slots["query"].value
-        resposta_modelo = call_gemini(query)
+        # A resposta progressiva sai em paralelo com a chamada ao modelo
+        progressivo = threading.Thread(target=enviar_progressivo, args=(handler_input, FALA_PENSANDO))
+        progressivo.start()
+        resposta_modelo = call_gemini(query, session_id(handler_input), contexto_dispositivos(query))
+        progressivo.join(timeout=1.0)
         speak_output = resposta_modelo
         return (
             handler_input.response_builder
@@ -104,6 +169,29 @@ class ChatIntentHandler(AbstractRequestHandler):
                 .response
         )
 
+class PotenciaAtualIntentHandler(AbstractRequestHandler):
+    def can_handle(self, handler_input):
+        return ask_utils.is_intent_name("PotenciaAtualIntent")(handler_input)
+
+    def handle(self, handler_input):
+        aparelho = slot_valor(handler_input, "aparelho")
+        return responder_dispositivos(handler_input, lambda c: c.responder_potencia(aparelho))
+
+class EnergiaHojeIntentHandler(AbstractRequestHandler):
+    def can_handle(self, handler_input):
+        return ask_utils.is_intent_name("EnergiaHojeIntent")(handler_input)
+
+    def handle(self, handler_input):
+        aparelho = slot_valor(handler_input, "aparelho")
+        return responder_dispositivos(handler_input, lambda c: c.responder_energia_hoje(aparelho))
+
+class MaiorConsumoIntentHandler(AbstractRequestHandler):
+    def can_handle(self, handler_input):
+        return ask_utils.is_intent_name("MaiorConsumoIntent")(handler_input)
+
+    def handle(self, handler_input):
+        return responder_dispositivos(handler_input, lambda c: c.responder_maior_consumo())
+
 class CancelOrStopIntentHandler(AbstractRequestHandler):
     def can_handle(self, handler_input):
         return (
@@ -112,8 +200,17 @@ class CancelOrStopIntentHandler(AbstractRequestHandler):
         )
 
     def handle(self, handler_input):
+        memoria.encerrar(session_id(handler_input))
         return handler_input.response_builder.speak("Até logo!").response
 
+class SessionEndedRequestHandler(AbstractRequestHandler):
+    def can_handle(self, handler_input):
+        return ask_utils.is_request_type("SessionEndedRequest")(handler_input)
+
+    def handle(self, handler_input):
+        memoria.encerrar(session_id(handler_input))
+        return handler_input.response_builder.response
+
 class CatchAllExceptionHandler(AbstractExceptionHandler):
     def can_handle(self, handler_input, exception):
         return True
@@ -128,11 +225,23 @@ class CatchAllExceptionHandler(AbstractExceptionHandler):
                 .response
         )
 
-# SkillBuilder
-sb = SkillBuilder()
+# SkillBuilder (com cliente de API para a resposta progressiva)
+sb = CustomSkillBuilder(api_client=DefaultApiClient())
 sb.add_request_handler(LaunchRequestHandler())
 sb.add_request_handler(ChatIntentHandler())
+sb.add_request_handler(PotenciaAtualIntentHandler())
+sb.add_request_handler(EnergiaHojeIntentHandler())
+sb.add_request_handler(MaiorConsumoIntentHandler())
 sb.add_request_handler(CancelOrStopIntentHandler())
+sb.add_request_handler(SessionEndedRequestHandler())
 sb.add_exception_handler(CatchAllExceptionHandler())
 
-lambda_handler = sb.lambda_handler()
+_skill_handler = sb.lambda_handler()
+
+def lambda_handler(event, context):
+    # Tempos da invocação (Gemini, Firebase, total) vão para o CloudWatch numa linha EMF
+    try:
+        with metricas.medir("invocacao"):
+            return _skill_handler(event, context)
+    finally:
+        metricas.publicar()
@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+"""Memória de conversa por sessão da Alexa.
+
+Cada sessão guarda três partes:
+- o turno de apresentação (fixo);
+- um resumo curto do que já saiu da janela;
+- uma janela com as mensagens mais recentes.
+
+Quando a janela passa do orçamento de tokens, os turnos mais antigos são
+dobrados no resumo. Assim o payload enviado ao Gemini, e com ele a latência,
+fica do mesmo tamanho por mais longa que seja a conversa.
+
+As sessões ficam em memória no contêiner, limitadas por LRU e tempo ocioso.
+Um adaptador de persistência opcional (S3) permite retomar a conversa depois
+de um cold start ou em outro contêiner.
+"""
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+CHARS_POR_TOKEN = 4  # mesma estimativa grosseira usada no dashboard
+
+
+def estimar_tokens(texto: str) -> int:
+    return len(texto) // CHARS_POR_TOKEN + 1
+
+
+def _texto(mensagem: dict) -> str:
+    return "".join(p.get("text", "") for p in mensagem.get("parts", []))
+
+
+def _mensagem(role: str, texto: str) -> dict:
+    return {"role": role, "parts": [{"text": texto}]}
+
+
+def resumo_extrativo(resumo: str, turnos: list, max_tokens: int) -> str:
+    """Acrescenta um trecho de cada turno ao resumo, sem chamar o modelo.
+
+    Se o resumo passar de `max_tokens`, os trechos mais antigos são descartados.
+    """
+    linhas = resumo.splitlines() if resumo else []
+    for msg in turnos:
+        quem = "Usuário" if msg.get("role") == "user" else "Assistente"
+        trecho = " ".join(_texto(msg).split())
+        linhas.append(f"- {quem}: {trecho[:160]}{'…' if len(trecho) > 160 else ''}")
+    while len(linhas) > 1 and estimar_tokens("\n".join(linhas)) > max_tokens:
+        linhas.pop(0)
+    return "\n".join(linhas)
+
+
+class Sessao:
+    __slots__ = ("id", "fixo", "resumo", "janela", "tokens", "usado_em")
+
+    def __init__(self, session_id: str):
+        self.id = session_id
+        self.fixo = []  # apresentação: nunca sai da conversa
+        self.resumo = ""
+        self.janela = []  # mensagens recentes, alternando user/model
+        self.tokens = 0  # tokens estimados da janela
+        self.usado_em = time.time()
+
+    def como_dict(self) -> dict:
+        return {"fixo": self.fixo, "resumo": self.resumo, "janela": self.janela}
+
+    @classmethod
+    def de_dict(cls, session_id: str, dados: dict):
+        sessao = cls(session_id)
+        sessao.fixo = dados.get("fixo") or []
+        sessao.resumo = dados.get("resumo") or ""
+        sessao.janela = dados.get("janela") or []
+        sessao.tokens = sum(estimar_tokens(_texto(m)) for m in sessao.janela)
+        return sessao
+
+
+class Memoria:
+    def __init__(self, orcamento_tokens: int = 1500, max_mensagens: int = 12, resumo_max_tokens: int = 300,
+                 max_sessoes: int = 500, ttl_ocioso: float = 3600, persistencia=None, resumir=resumo_extrativo):
+        self.orcamento_tokens = orcamento_tokens
+        self.max_mensagens = max_mensagens
+        self.resumo_max_tokens = resumo_max_tokens
+        self.max_sessoes = max_sessoes
+        self.ttl_ocioso = ttl_ocioso
+        self.persistencia = persistencia
+        self.resumir = resumir
+        self._sessoes = OrderedDict()  # session_id -> Sessao, da menos à mais recente
+
+    def sessao(self, session_id: str) -> Sessao:
+        agora = time.time()
+        sessao = self._sessoes.get(session_id)
+        if sessao is None and self.persistencia is not None:
+            try:
+                dados = self.persistencia.carregar(session_id)
+            except Exception as e:
+                logger.warning(f"Falha ao carregar a memória da sessão: {e}")
+                dados = None
+            if dados:
+                sessao = Sessao.de_dict(session_id, dados)
+        if sessao is None:
+            sessao = Sessao(session_id)
+        sessao.usado_em = agora
+        self._sessoes[session_id] = sessao
+        self._sessoes.move_to_end(session_id)
+        self._expirar(agora)
+        return sessao
+
+    def _expirar(self, agora: float):
+        while self._sessoes:
+            antiga = next(iter(self._sessoes.values()))
+            if len(self._sessoes) <= self.max_sessoes and agora - antiga.usado_em <= self.ttl_ocioso:
+                break
+            del self._sessoes[antiga.id]
+
+    def payload(self, sessao: Sessao, texto_usuario: str, contexto: str = None) -> dict:
+        """Corpo do generateContent: apresentação + janela + nova fala.
+
+        O resumo e o contexto do turno (dados das tomadas) vão como instrução de
+        sistema e não ficam na memória.
+        """
+        payload = {"contents": sessao.fixo + sessao.janela + [_mensagem("user", texto_usuario)]}
+        partes = []
+        if sessao.resumo:
+            partes.append({"text": f"Resumo da conversa anterior com este usuário:\n{sessao.resumo}"})
+        if contexto:
+            partes.append({"text": f"Leituras atuais das tomadas da casa do usuário:\n{contexto}"})
+        if partes:
+            payload["systemInstruction"] = {"parts": partes}
+        return payload
+
+    def registrar(self, sessao: Sessao, texto_usuario: str, texto_modelo: str, fixo: bool = False):
+        """Guarda um turno completo (pergunta e resposta) e persiste a sessão"""
+        turno = [_mensagem("user", texto_usuario), _mensagem("model", texto_modelo)]
+        if fixo:
+            sessao.fixo = turno
+        else:
+            sessao.janela.extend(turno)
+            sessao.tokens += estimar_tokens(texto_usuario) + estimar_tokens(texto_modelo)
+            self._compactar(sessao)
+        if self.persistencia is not None:
+            try:
+                self.persistencia.salvar(sessao.id, sessao.como_dict())
+            except Exception as e:
+                logger.warning(f"Falha ao salvar a memória da sessão: {e}")
+
+    def _compactar(self, sessao: Sessao):
+        # tira pares (pergunta, resposta) do início até caber; o último turno fica sempre
+        saiu = []
+        while len(sessao.janela) > 2 and (sessao.tokens > self.orcamento_tokens
+                                          or len(sessao.janela) > self.max_mensagens):
+            par, sessao.janela = sessao.janela[:2], sessao.janela[2:]
+            sessao.tokens -= sum(estimar_tokens(_texto(m)) for m in par)
+            saiu.extend(par)
+        if saiu:
+            try:
+                sessao.resumo = self.resumir(sessao.resumo, saiu, self.resumo_max_tokens)
+            except Exception as e:
+                logger.warning(f"Falha ao resumir a conversa: {e}")
+                sessao.resumo = resumo_extrativo(sessao.resumo, saiu, self.resumo_max_tokens)
+
+    def encerrar(self, session_id: str):
+        self._sessoes.pop(session_id, None)
+        if self.persistencia is not None:
+            try:
+                self.persistencia.apagar(session_id)
+            except Exception as e:
+                logger.warning(f"Falha ao apagar a memória da sessão: {e}")
+
+
+class PersistenciaS3:
+    """Guarda cada sessão como um JSON pequeno no bucket de persistência da skill"""
+
+    def __init__(self, bucket: str, prefixo: str = "memoria/", cliente=None):
+        self.bucket = bucket
+        self.prefixo = prefixo
+        self._cliente = cliente
+
+    @property
+    def cliente(self):
+        if self._cliente is None:
+            from utils import get_s3_client  # mesmo cliente das URLs pré-assinadas, criado uma vez
+            self._cliente = get_s3_client()
+        return self._cliente
+
+    def _chave(self, session_id: str) -> str:
+        return f"{self.prefixo}{session_id}.json"
+
+    def carregar(self, session_id: str):
+        try:
+            obj = self.cliente.get_object(Bucket=self.bucket, Key=self._chave(session_id))
+        except self.cliente.exceptions.NoSuchKey:
+            return None
+        return json.loads(obj["Body"].read())
+
+    def salvar(self, session_id: str, dados: dict):
+        corpo = json.dumps(dados, ensure_ascii=False).encode("utf-8")
+        self.cliente.put_object(Bucket=self.bucket, Key=self._chave(session_id), Body=corpo,
+                                ContentType="application/json")
+
+    def apagar(self, session_id: str):
+        self.cliente.delete_object(Bucket=self.bucket, Key=self._chave(session_id))
+
+
+def memoria_do_ambiente() -> Memoria:
+    """Memória configurada pelas variáveis de ambiente; MEMORIA_PERSISTENCIA=s3 liga a persistência"""
+    persistencia = None
+    if os.getenv("MEMORIA_PERSISTENCIA", "").lower() == "s3":
+        bucket = os.getenv("S3_PERSISTENCE_BUCKET")
+        if bucket:
+            persistencia = PersistenciaS3(bucket, os.getenv("MEMORIA_S3_PREFIXO", "memoria/"))
+        else:
+            logger.warning("MEMORIA_PERSISTENCIA=s3 sem S3_PERSISTENCE_BUCKET; memória só no contêiner")
+    return Memoria(
+        orcamento_tokens=int(os.getenv("MEMORIA_MAX_TOKENS", "1500")),
+        max_mensagens=int(os.getenv("MEMORIA_MAX_MENSAGENS", "12")),
+        resumo_max_tokens=int(os.getenv("MEMORIA_RESUMO_TOKENS", "300")),
+        persistencia=persistencia,
+    )
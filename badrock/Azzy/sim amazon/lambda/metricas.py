@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""Métricas da skill no CloudWatch, no Embedded Metric Format (EMF).
+
+Uma Lambda não tem onde expor /metrics, então os tempos e contadores de cada
+invocação saem numa única linha JSON no log, que o CloudWatch transforma em
+métricas sem chamada extra de API. Desligado por padrão (``METRICAS=1`` liga);
+desligado, ``medir`` devolve um contexto vazio e ``contar`` retorna logo.
+
+    with medir("gemini"):
+        ...
+    contar("firebase_erros")
+    publicar()  # no fim da invocação
+"""
+import json
+import os
+import threading
+import time
+from contextlib import nullcontext
+
+HABILITADO = os.getenv("METRICAS", "0") == "1"
+NAMESPACE = os.getenv("METRICAS_NAMESPACE", "MIC/Azzy")
+
+_NADA = nullcontext()
+_lock = threading.Lock()
+_tempos = {}  # nome -> [segundos, ...] da invocação atual
+_contadores = {}  # nome -> valor
+
+
+class _Intervalo:
+    __slots__ = ("nome", "inicio")
+
+    def __init__(self, nome: str):
+        self.nome = nome
+
+    def __enter__(self):
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, tipo, *_):
+        observar(f"{self.nome}_segundos", time.perf_counter() - self.inicio)
+        if tipo is not None:
+            contar(f"{self.nome}_erros")
+        return False
+
+
+def medir(nome: str):
+    """Contexto que mede o bloco em ``<nome>_segundos`` (e conta ``<nome>_erros``)"""
+    if not HABILITADO:
+        return _NADA
+    return _Intervalo(nome)
+
+
+def observar(nome: str, segundos: float):
+    if not HABILITADO:
+        return
+    with _lock:
+        _tempos.setdefault(nome, []).append(segundos)
+
+
+def contar(nome: str, valor: float = 1):
+    if not HABILITADO:
+        return
+    with _lock:
+        _contadores[nome] = _contadores.get(nome, 0) + valor
+
+
+def publicar(saida=print):
+    """Escreve o documento EMF da invocação e zera os valores (threads do handler incluídas)"""
+    global _tempos, _contadores
+    if not HABILITADO:
+        return
+    with _lock:
+        tempos, contadores = _tempos, _contadores
+        _tempos, _contadores = {}, {}
+    if not tempos and not contadores:
+        return
+    definicoes = [{"Name": nome, "Unit": "Seconds"} for nome in tempos]
+    definicoes += [{"Name": nome, "Unit": "Count"} for nome in contadores]
+    documento = {
+        "_aws": {
+            "Timestamp": int(time.time() * 1000),
+            "CloudWatchMetrics": [{"Namespace": NAMESPACE, "Dimensions": [[]], "Metrics": definicoes}],
+        },
+        **tempos,
+        **contadores,
+    }
+    saida(json.dumps(documento))
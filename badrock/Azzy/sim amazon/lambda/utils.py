@@ -1,27 +1,96 @@
 import logging
 import os
+import threading
+import time
+from collections import OrderedDict
+
 import boto3
 from botocore.exceptions import ClientError
 
+# Presigned URLs are reused until this many seconds before they expire
+URL_EXPIRY_MARGIN = 10
+URL_CACHE_MAX = 256
+AUDIO_PREFIX = os.environ.get("AUDIO_PREFIX", "audio/")
+AUDIO_EXPIRES_IN = 60 * 10
+
+_s3_client = None
+_s3_lock = threading.Lock()
+_url_cache = OrderedDict()  # (object_name, expires_in) -> (valid_until, url)
+_url_lock = threading.Lock()  # handler threads (e.g. progressive responses) share the cache
+
 
-def create_presigned_url(object_name):
-    """Generate a presigned URL to share an S3 object with a capped expiration of 60 seconds
+def get_s3_client():
+    """Return the S3 client shared by every invocation of a warm container.
+
+    Building a boto3 client is expensive (session, endpoint resolution,
+    credential chain), so it is created on first use and then reused.
+    """
+    global _s3_client
+    if _s3_client is None:
+        with _s3_lock:
+            if _s3_client is None:
+                _s3_client = boto3.client('s3',
+                                          region_name=os.environ.get('S3_PERSISTENCE_REGION'),
+                                          config=boto3.session.Config(signature_version='s3v4',
+                                                                      s3={'addressing_style': 'path'}))
+    return _s3_client
+
+
+def create_presigned_url(object_name, expires_in=60):
+    """Generate a presigned URL to share an S3 object, 60 seconds by default
+
+    URLs are cached by object name and handed out again until shortly before
+    they expire, so repeated responses do not sign the same object again.
 
     :param object_name: string
+    :param expires_in: URL lifetime in seconds
     :return: Presigned URL as string. If error, returns None.
     """
-    s3_client = boto3.client('s3',
-                             region_name=os.environ.get('S3_PERSISTENCE_REGION'),
-                             config=boto3.session.Config(signature_version='s3v4',s3={'addressing_style': 'path'}))
+    key = (object_name, expires_in)
+    now = time.time()
+    with _url_lock:
+        cached = _url_cache.get(key)
+        if cached is not None and cached[0] > now:
+            _url_cache.move_to_end(key)
+            return cached[1]
+
     try:
         bucket_name = os.environ.get('S3_PERSISTENCE_BUCKET')
-        response = s3_client.generate_presigned_url('get_object',
-                                                    Params={'Bucket': bucket_name,
-                                                            'Key': object_name},
-                                                    ExpiresIn=60*1)
+        response = get_s3_client().generate_presigned_url('get_object',
+                                                          Params={'Bucket': bucket_name,
+                                                                  'Key': object_name},
+                                                          ExpiresIn=expires_in)
     except ClientError as e:
         logging.error(e)
         return None
 
+    # signing happens outside the lock; two threads racing on a miss just store the same entry
+    with _url_lock:
+        _url_cache[key] = (now + max(expires_in - URL_EXPIRY_MARGIN, 0), response)
+        _url_cache.move_to_end(key)
+        while len(_url_cache) > URL_CACHE_MAX:
+            _url_cache.popitem(last=False)
+
     # The response contains the presigned URL
-    return response
\ No newline at end of file
+    return response
+
+
+def audio_url(name):
+    """Presigned URL of a pre-rendered audio asset stored under AUDIO_PREFIX
+
+    :param name: file name inside the audio prefix (e.g. "boas_vindas.mp3")
+    :return: Presigned URL as string, or None.
+    """
+    return create_presigned_url(f"{AUDIO_PREFIX}{name}", expires_in=AUDIO_EXPIRES_IN)
+
+
+def audio_ssml(name):
+    """SSML <audio> tag for a pre-rendered asset; empty string if it cannot be signed
+
+    :param name: file name inside the audio prefix
+    :return: SSML fragment as string
+    """
+    url = audio_url(name) if name else None
+    if not url:
+        return ""
+    return '<audio src="{}"/>'.format(url.replace("&", "&amp;"))
@@ -1,76 +1,101 @@
 import os
-import requests
-import google.generativeai as genai
+import sys
+from functools import lru_cache
+import pandas as pd
 from dotenv import load_dotenv
-from datetime import datetime, timezone
+
+# Cliente Firebase compartilhado com o dashboard (pacote mic/ na raiz do repositório)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+from mic.contexto import construir_contexto
+from mic.firebase import FirebaseClient
+from mic.llm_cache import RespostaCache, chave as chave_resposta
+from mic.metricas import medir, servir_do_ambiente
+from mic.normalizacao import ESQUEMA_TOMADA, Campo, tabela
 
 # -------------------- Carregar variáveis de ambiente --------------------
 load_dotenv()
 GEN_API_KEY = os.getenv("GEMINI_API_KEY")
 FIREBASE_DB_URL = os.getenv("FIREBASE_DB_URL", "").rstrip("/")
 FIREBASE_AUTH = os.getenv("FIREBASE_AUTH", "")
+FIREBASE_POOL_SIZE = int(os.getenv("FIREBASE_POOL_SIZE", "10"))
+LLM_CACHE_FILE = os.getenv("LLM_CACHE_FILE", os.path.join(".cache", "recomendacoes.json"))
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", "600"))
+LLM_CACHE_MAX = int(os.getenv("LLM_CACHE_MAX", "256"))
+MODELO = "models/gemini-2.5-pro"
+CONTEXTO_MAX_TOKENS = int(os.getenv("CONTEXTO_MAX_TOKENS", "4000"))
+PROMPT_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "prompt.txt")
 
-if not GEN_API_KEY:
-    raise ValueError("❌ Chave GEMINI_API_KEY não encontrada no .env")
+# -------------------- Firebase --------------------
+# Mesmo esquema do dashboard, mas sem tensão presumida quando a tomada não informa
+ESQUEMA_DISPOSITIVOS = {**ESQUEMA_TOMADA, "Voltage": Campo("float32", 0.0)}
 
-genai.configure(api_key=GEN_API_KEY)
+firebase = FirebaseClient(FIREBASE_DB_URL, FIREBASE_AUTH, pool_size=FIREBASE_POOL_SIZE)
 
-# -------------------- Firebase --------------------
-def firebase_get(path: str):
+def firebase_get(path: str, params: dict = None):
     """Busca dados do Firebase no caminho especificado"""
-    url = f"{FIREBASE_DB_URL}/{path.lstrip('/')}.json"
-    params = {}
-    if FIREBASE_AUTH:
-        params["auth"] = FIREBASE_AUTH
-    r = requests.get(url, params=params, timeout=10)
-    r.raise_for_status()
-    return r.json()
+    return firebase.get(path, params=params)
+
+def ler_dispositivos(client, path: str = "/tomadas"):
+    """Lê e normaliza as tomadas de um banco (ou grupo); erros sobem para quem chamou"""
+    data = client.get(path)
+    if not isinstance(data, dict):
+        return []
+    df = tabela(data, ESQUEMA_DISPOSITIVOS, chave="Device_ID")
+    df["time"] = pd.to_datetime(df["ts"], unit="s", utc=True).dt.strftime("%Y-%m-%dT%H:%M:%S+00:00")
+    return df[["Device_ID", "time", "Voltage", "Current", "Power", "Energy", "Frequency", "PF"]].to_dict(orient="records")
 
 def fetch_devices_data():
     """Busca todos os dispositivos e seus dados de consumo"""
     try:
-        data = firebase_get("/tomadas")
-        if not isinstance(data, dict):
-            return []
-        devices = []
-        for dev_id, values in data.items():
-            ts = values.get("ts")
-            t = datetime.fromtimestamp(ts, tz=timezone.utc) if isinstance(ts, (int, float)) else datetime.now(timezone.utc)
-            devices.append({
-                "Device_ID": dev_id,
-                "time": t.isoformat(),
-                "Voltage": float(values.get("Voltage", 0.0)),
-                "Current": float(values.get("Current", 0.0)),
-                "Power": float(values.get("Power", 0.0)),
-                "Energy": float(values.get("Energy", 0.0)),
-                "Frequency": float(values.get("Frequency", 60.0)),
-                "PF": float(values.get("PF", 1.0)),
-            })
-        return devices
+        return ler_dispositivos(firebase)
     except Exception as e:
         print(f"⚠ Erro ao buscar dados no Firebase: {e}")
         return []
 
 # -------------------- Agente Gemini --------------------
-def carregar_prompt():
-    """Lê o prompt do arquivo prompt.txt"""
-    with open("prompt.txt", "r", encoding="utf-8") as f:
+resposta_cache = RespostaCache(LLM_CACHE_FILE, ttl=LLM_CACHE_TTL, max_entries=LLM_CACHE_MAX)
+
+@lru_cache(maxsize=None)
+def carregar_prompt(caminho: str = PROMPT_FILE):
+    """Lê o prompt do arquivo prompt.txt (uma vez por processo)"""
+    with open(caminho, "r", encoding="utf-8") as f:
         return f.read()
 
-def gerar_recomendacoes(devices):
+@lru_cache(maxsize=None)
+def get_modelo():
+    """Instância única do modelo, compartilhada entre chamadas e threads.
+
+    O SDK do Gemini só é importado e configurado aqui, na primeira chamada ao
+    modelo: respostas em cache e leituras do Firebase não pagam esse custo.
+    """
+    if not GEN_API_KEY:
+        raise ValueError("❌ Chave GEMINI_API_KEY não encontrada no .env")
+    import google.generativeai as genai
+    genai.configure(api_key=GEN_API_KEY)
+    return genai.GenerativeModel(MODELO)
+
+def gerar_recomendacoes(devices, modelo=None, verbose: bool = True):
     """Envia os dados dos dispositivos para o Gemini e retorna dicas"""
     if not devices:
         return "Nenhum dispositivo encontrado no Firebase."
 
     prompt_base = carregar_prompt()
-    contexto = str(devices)
-    prompt = f"{prompt_base}\n\nDados coletados:\n{contexto}"
-    modelo = genai.GenerativeModel("models/gemini-2.5-pro")
-    resposta = modelo.generate_content(prompt)
-    return resposta.text
+
+    def gerar():
+        contexto = construir_contexto(devices, max_tokens=CONTEXTO_MAX_TOKENS)
+        if verbose:
+            print(f"🧮 Contexto: {contexto.tokens} tokens, {contexto.incluidos} de {contexto.dispositivos} dispositivos")
+        prompt = f"{prompt_base}\n\nDados coletados:\n{contexto}"
+        with medir("gemini", modelo=MODELO):
+            resposta = (modelo or get_modelo()).generate_content(prompt)
+        return resposta.text
+
+    # Leituras dentro das tolerâncias reaproveitam a última recomendação
+    return resposta_cache.get_or_generate(chave_resposta(f"{MODELO}\n{prompt_base}", devices), gerar)
 
 # -------------------- Execução principal --------------------
 if __name__ == "__main__":
+    servir_do_ambiente()
     dispositivos = fetch_devices_data()
     print("📡 Dispositivos encontrados:", len(dispositivos))
     for d in dispositivos:
@@ -79,3 +104,4 @@ if __name__ == "__main__":
     dicas = gerar_recomendacoes(dispositivos)
     print("\n⚡ Recomendações de Energia:")
     print(dicas)
+    print(f"\n🗃 Cache de respostas: {resposta_cache.stats()}")
@@ -0,0 +1,237 @@
+"""Recomendações em lote para muitas residências (relatório noturno).
+
+Cada alvo é um banco do Firebase ou um grupo de dispositivos dentro de um banco.
+O arquivo de alvos tem um por linha: a URL do banco, ou um JSON com
+"id", "db_url", "auth" e "path" (padrão "/tomadas"). Sem "db_url", vale o
+FIREBASE_DB_URL do .env. Linhas vazias e começadas por # são ignoradas.
+
+As leituras no Firebase e as chamadas ao Gemini passam por um pool de threads
+limitado. O modelo e o prompt são os mesmos para todos os alvos. As chamadas
+ao modelo respeitam um limite de requisições por minuto, e cada alvo tem um prazo total.
+O resultado sai em JSONL, uma linha por alvo, na ordem em que ficam prontos,
+e as métricas de vazão são impressas no final.
+
+    python lote.py alvos.txt --saida relatorio.jsonl --workers 16 --rpm 60 --prazo 120
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timezone
+
+from agent import (FIREBASE_AUTH, FIREBASE_DB_URL, FirebaseClient, carregar_prompt, gerar_recomendacoes,
+                   get_modelo, ler_dispositivos, resposta_cache, servir_do_ambiente)
+
+# Erros do Gemini que valem nova tentativa enquanto houver prazo
+ERROS_TRANSITORIOS = {"ResourceExhausted", "ServiceUnavailable", "DeadlineExceeded", "InternalServerError"}
+
+
+class PrazoEsgotado(Exception):
+    pass
+
+
+class LimiteTaxa:
+    """Balde de fichas: no máximo `por_minuto` chamadas por minuto, com rajada de `rajada`"""
+
+    def __init__(self, por_minuto: float, rajada: int = 1):
+        self.intervalo = 60.0 / por_minuto if por_minuto > 0 else 0.0
+        self.rajada = max(1, rajada)
+        self.fichas = float(self.rajada)
+        self.ultimo = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reservar(self, prazo: float) -> bool:
+        """Espera por uma ficha; devolve False (sem consumir) se ela só viria depois do prazo"""
+        if not self.intervalo:
+            return True
+        with self._lock:
+            agora = time.monotonic()
+            self.fichas = min(self.rajada, self.fichas + (agora - self.ultimo) / self.intervalo)
+            self.ultimo = agora
+            espera = (1 - self.fichas) * self.intervalo if self.fichas < 1 else 0.0
+            if agora + espera > prazo:
+                return False
+            self.fichas -= 1  # reserva já agora; quem chegar depois espera a vez seguinte
+        if espera:
+            time.sleep(espera)
+        return True
+
+
+class ModeloComPrazo:
+    """Modelo compartilhado com o limite de taxa e o prazo restante de um alvo"""
+
+    def __init__(self, modelo, limite: LimiteTaxa, prazo: float, tentativas: int = 3):
+        self.modelo = modelo
+        self.limite = limite
+        self.prazo = prazo
+        self.tentativas = tentativas
+        self.chamadas = 0
+
+    def generate_content(self, prompt, **kwargs):
+        for tentativa in range(self.tentativas):
+            if not self.limite.reservar(self.prazo):
+                raise PrazoEsgotado("prazo esgotado aguardando o limite de requisições")
+            restante = self.prazo - time.monotonic()
+            if restante <= 0:
+                raise PrazoEsgotado("prazo esgotado antes da chamada ao Gemini")
+            self.chamadas += 1
+            try:
+                return self.modelo.generate_content(prompt, request_options={"timeout": restante}, **kwargs)
+            except Exception as e:
+                if type(e).__name__ not in ERROS_TRANSITORIOS or tentativa == self.tentativas - 1:
+                    raise
+                time.sleep(min(2 ** tentativa, max(0.0, self.prazo - time.monotonic())))
+
+
+# -------------------- Alvos --------------------
+def ler_alvos(linhas) -> list:
+    alvos = []
+    for n, linha in enumerate(linhas, 1):
+        linha = linha.strip()
+        if not linha or linha.startswith("#"):
+            continue
+        alvo = json.loads(linha) if linha.startswith("{") else {"db_url": linha}
+        alvo.setdefault("db_url", FIREBASE_DB_URL)
+        alvo.setdefault("auth", FIREBASE_AUTH if alvo["db_url"] == FIREBASE_DB_URL else "")
+        alvo.setdefault("path", "/tomadas")
+        alvo.setdefault("id", alvo["db_url"] if alvo["path"] == "/tomadas" else f"{alvo['db_url']}{alvo['path']}")
+        if not alvo["db_url"]:
+            raise ValueError(f"linha {n}: alvo sem db_url e FIREBASE_DB_URL não definido")
+        alvos.append(alvo)
+    return alvos
+
+
+class Clientes:
+    """Um FirebaseClient (sessão HTTP e pool de conexões) por banco, reaproveitado entre alvos"""
+
+    def __init__(self, pool_size: int, timeout: float):
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self._clientes = {}
+        self._lock = threading.Lock()
+
+    def get(self, db_url: str, auth: str) -> FirebaseClient:
+        with self._lock:
+            cliente = self._clientes.get((db_url, auth))
+            if cliente is None:
+                cliente = self._clientes[(db_url, auth)] = FirebaseClient(
+                    db_url, auth, pool_size=self.pool_size, timeout=self.timeout, retries=1)
+            return cliente
+
+    def close(self):
+        with self._lock:
+            for cliente in self._clientes.values():
+                cliente.close()
+            self._clientes.clear()
+
+
+# -------------------- Processamento --------------------
+def processar(alvo: dict, clientes: Clientes, modelo, limite: LimiteTaxa, prazo_s: float) -> dict:
+    inicio = time.monotonic()
+    prazo = inicio + prazo_s
+    registro = {"id": alvo["id"], "db_url": alvo["db_url"], "path": alvo["path"], "status": "ok",
+                "dispositivos": 0, "chamadas_gemini": 0}
+    try:
+        devices = ler_dispositivos(clientes.get(alvo["db_url"], alvo["auth"]), alvo["path"])
+        registro["t_firebase_s"] = round(time.monotonic() - inicio, 3)
+        registro["dispositivos"] = len(devices)
+        if not devices:
+            registro["status"] = "sem_dispositivos"
+        else:
+            if time.monotonic() >= prazo:
+                raise PrazoEsgotado("prazo esgotado na leitura do Firebase")
+            limitado = ModeloComPrazo(modelo, limite, prazo)
+            t0 = time.monotonic()
+            registro["recomendacoes"] = gerar_recomendacoes(devices, modelo=limitado, verbose=False)
+            registro["t_gemini_s"] = round(time.monotonic() - t0, 3)
+            registro["chamadas_gemini"] = limitado.chamadas
+    except PrazoEsgotado as e:
+        registro.update(status="prazo_esgotado", erro=str(e))
+    except Exception as e:
+        registro.update(status="erro", erro=f"{type(e).__name__}: {e}")
+    registro["t_total_s"] = round(time.monotonic() - inicio, 3)
+    registro["gerado_em"] = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    return registro
+
+
+def executar(alvos: list, saida, workers: int = 8, rpm: float = 60, prazo_s: float = 120,
+             timeout_firebase: float = 10, modelo=None) -> dict:
+    """Processa os alvos com no máximo `workers` em paralelo e grava cada resultado assim que fica pronto"""
+    modelo = modelo or get_modelo()
+    carregar_prompt()  # lê o prompt antes de abrir as threads
+    limite = LimiteTaxa(rpm, rajada=max(1, int(rpm // 60)))
+    clientes = Clientes(pool_size=min(workers, 10), timeout=min(timeout_firebase, prazo_s))
+    latencias, status, chamadas = [], {}, 0
+    inicio = time.monotonic()
+    restantes = iter(alvos)
+    try:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="lote") as pool:
+            # no máximo 2 tarefas por worker na fila: milhares de alvos não viram milhares de futures
+            pendentes = set()
+            while True:
+                for alvo in restantes:
+                    pendentes.add(pool.submit(processar, alvo, clientes, modelo, limite, prazo_s))
+                    if len(pendentes) >= 2 * workers:
+                        break
+                if not pendentes:
+                    break
+                prontos, pendentes = wait(pendentes, return_when=FIRST_COMPLETED)
+                for futuro in prontos:
+                    registro = futuro.result()
+                    saida.write(json.dumps(registro, ensure_ascii=False) + "\n")
+                    latencias.append(registro["t_total_s"])
+                    status[registro["status"]] = status.get(registro["status"], 0) + 1
+                    chamadas += registro["chamadas_gemini"]
+                saida.flush()
+    finally:
+        clientes.close()
+
+    duracao = time.monotonic() - inicio
+    latencias.sort()
+
+    def percentil(p):
+        return latencias[min(len(latencias) - 1, int(p * len(latencias)))] if latencias else 0.0
+
+    return {
+        "alvos": len(latencias), "status": status, "duracao_s": round(duracao, 2),
+        "alvos_por_min": round(60 * len(latencias) / duracao, 1) if duracao else 0.0,
+        "latencia_p50_s": percentil(0.5), "latencia_p95_s": percentil(0.95), "latencia_max_s": percentil(1.0),
+        "chamadas_gemini": chamadas, "cache": resposta_cache.stats(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recomendações de energia em lote")
+    parser.add_argument("alvos", nargs="?", help="arquivo de alvos (padrão: stdin)")
+    parser.add_argument("--url", nargs="*", default=[], help="URLs de bancos, além das do arquivo")
+    parser.add_argument("--saida", default="-", help="arquivo JSONL de saída (padrão: stdout)")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("LOTE_WORKERS", "8")))
+    parser.add_argument("--rpm", type=float, default=float(os.getenv("LOTE_RPM", "60")),
+                        help="máximo de chamadas ao Gemini por minuto (0 = sem limite)")
+    parser.add_argument("--prazo", type=float, default=float(os.getenv("LOTE_PRAZO", "120")),
+                        help="prazo total por alvo, em segundos")
+    parser.add_argument("--timeout-firebase", type=float, default=10)
+    args = parser.parse_args()
+
+    linhas = list(args.url)
+    if args.alvos or not args.url:
+        with (open(args.alvos, encoding="utf-8") if args.alvos else sys.stdin) as f:
+            linhas += f.readlines()
+    alvos = ler_alvos(linhas)
+    servir_do_ambiente()  # com METRICAS=1 e METRICAS_PORTA, /metrics acompanha o lote em andamento
+
+    saida = sys.stdout if args.saida == "-" else open(args.saida, "w", encoding="utf-8")
+    try:
+        metricas = executar(alvos, saida, workers=args.workers, rpm=args.rpm, prazo_s=args.prazo,
+                            timeout_firebase=args.timeout_firebase)
+    finally:
+        if saida is not sys.stdout:
+            saida.close()
+    print(f"📊 {json.dumps(metricas, ensure_ascii=False)}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""Latência por turno da skill da Alexa com um Gemini local (mic.fake_gemini).
+
+Roda o lambda_handler de verdade, pelo SDK da Alexa, com envelopes de
+LaunchRequest e ChatIntent. Um ApiClient local recebe as respostas
+progressivas. Com o modelo lento, compara:
+- "antes": um requests.post novo por turno, esperando a resposta inteira até o timeout de 7 s;
+- "depois": sessão reaproveitada, streaming e corte dentro do orçamento.
+
+    python benchmarks/bench_alexa.py --turnos 10 --primeiro-token 1.0 --intervalo 0.4
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+
+import requests
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+LAMBDA_DIR = os.path.join(ROOT, "badrock", "Azzy", "sim amazon", "lambda")
+sys.path.insert(0, ROOT)
+from mic.fake_gemini import FakeGemini
+
+LIMITE_ALEXA = 8.0
+
+
+def cliente_diretivas():
+    """ApiClient local no lugar do serviço da Alexa: registra as respostas progressivas"""
+    from ask_sdk_model.services import ApiClient, ApiClientResponse
+
+    class ClienteLocal(ApiClient):
+        def __init__(self):
+            self.recebidas = []  # (instante, url, corpo)
+
+        def invoke(self, request):
+            self.recebidas.append((time.monotonic(), request.url, request.body))
+            return ApiClientResponse(headers=[], status_code=204, body="")
+
+    return ClienteLocal()
+
+
+def envelope(api_endpoint: str, session_id: str, nova: bool, intent: str = None, query: str = None) -> dict:
+    if intent:
+        request = {"type": "IntentRequest", "requestId": f"amzn1.echo-api.request.{uuid.uuid4()}",
+                   "timestamp": "2025-09-14T12:00:00Z", "locale": "pt-BR",
+                   "intent": {"name": intent, "confirmationStatus": "NONE",
+                              "slots": {"query": {"name": "query", "value": query, "confirmationStatus": "NONE"}}}}
+    else:
+        request = {"type": "LaunchRequest", "requestId": f"amzn1.echo-api.request.{uuid.uuid4()}",
+                   "timestamp": "2025-09-14T12:00:00Z", "locale": "pt-BR"}
+    app = {"applicationId": "amzn1.ask.skill.teste"}
+    user = {"userId": "amzn1.ask.account.teste"}
+    return {
+        "version": "1.0",
+        "session": {"new": nova, "sessionId": session_id, "application": app, "user": user, "attributes": {}},
+        "context": {"System": {"application": app, "user": user, "device": {"deviceId": "d", "supportedInterfaces": {}},
+                               "apiEndpoint": api_endpoint, "apiAccessToken": "token-teste"}},
+        "request": request,
+    }
+
+
+def fala(resposta: dict) -> str:
+    return resposta["response"]["outputSpeech"]["ssml"]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turnos", type=int, default=10)
+    parser.add_argument("--primeiro-token", type=float, default=1.0)
+    parser.add_argument("--intervalo", type=float, default=0.4, help="atraso entre pedaços; lento o bastante para passar de 8 s")
+    parser.add_argument("--orcamento", type=float, default=6.0)
+    args = parser.parse_args()
+
+    with FakeGemini(RESPOSTA_LONGA, primeiro_token=args.primeiro_token, intervalo=args.intervalo) as api:
+        os.environ.update({"GOOGLE_API_KEY": "teste", "GEMINI_BASE_URL": api.url,
+                           "GEMINI_ORCAMENTO_S": str(args.orcamento)})
+        sys.path.insert(0, LAMBDA_DIR)
+        import lambda_function
+
+        # antes: POST novo por turno, resposta inteira, timeout de 7 s
+        antes, falhas = [], 0
+        for _ in range(min(args.turnos, 3)):
+            t0 = time.monotonic()
+            try:
+                requests.post(f"{api.url}/models/gemini-2.5-flash-lite:generateContent",
+                              json={"contents": [{"role": "user", "parts": [{"text": "oi"}]}]}, timeout=7)
+            except requests.Timeout:
+                falhas += 1
+            antes.append(time.monotonic() - t0)
+        print(f"antes : {statistics.mean(antes):.2f} s por turno, {falhas}/{len(antes)} estouraram o timeout de 7 s")
+
+        # o SDK só fala HTTPS com o apiEndpoint; o cliente local recebe as diretivas no lugar dele
+        api_client = cliente_diretivas()
+        lambda_function.sb.api_client = api_client
+        diretivas = api_client.recebidas
+        endpoint = "https://api.amazonalexa.com"
+        sid = f"amzn1.echo-api.session.{uuid.uuid4()}"
+        handler = lambda_function.lambda_handler
+        chamadas = api.request_count
+
+        t0 = time.monotonic()
+        handler(envelope(endpoint, sid, True), None)
+        t_launch = time.monotonic() - t0
+        print(f"launch: {t_launch * 1000:.0f} ms, {api.request_count - chamadas} chamada(s) ao modelo "
+              f"(sem intro_cache.json a primeira chama o modelo)")
+        # passo de deploy: pré-calcula a apresentação (num arquivo temporário, não no diretório da skill)
+        lambda_function.cliente_gemini.INTRO_CACHE_FILE = os.path.join(tempfile.mkdtemp(), "intro_cache.json")
+        lambda_function.cliente_gemini.gravar_intro_cache(lambda_function.get_initial_prompt())
+        lambda_function.cliente_gemini._intro_memo.clear()
+        chamadas = api.request_count
+        t0 = time.monotonic()
+        handler(envelope(endpoint, f"{sid}-2", True), None)
+        print(f"launch com intro_cache.json: {(time.monotonic() - t0) * 1000:.0f} ms, "
+              f"{api.request_count - chamadas} chamada(s) ao modelo")
+
+        depois, progressivo, cortadas = [], [], 0
+        for i in range(args.turnos):
+            t0 = time.monotonic()
+            n = len(diretivas)
+            resposta = handler(envelope(endpoint, sid, False, "ChatIntent", f"pergunta número {i}"), None)
+            depois.append(time.monotonic() - t0)
+            if len(diretivas) > n:
+                progressivo.append(diretivas[n][0] - t0)
+            cortadas += not fala(resposta).rstrip(" </speak>").endswith(RESPOSTA_LONGA.strip()[-20:])
+        tam = [len(json.dumps(p)) for p in api.payloads[-args.turnos:]]
+        print(f"depois: {statistics.mean(depois):.2f} s por turno (máx {max(depois):.2f} s, limite {LIMITE_ALEXA:.0f} s), "
+              f"{cortadas}/{args.turnos} cortadas no orçamento")
+        if progressivo:
+            print(f"resposta progressiva em {statistics.mean(progressivo) * 1000:.0f} ms ({len(progressivo)} enviadas)")
+        print(f"payload ao modelo: {tam[0]} -> {tam[-1]} bytes do 1º ao {args.turnos}º turno")
+
+
+RESPOSTA_LONGA = ("Boa pergunta. A geladeira é o aparelho que mais consome na sua casa. "
+                  "Verifique a borracha da porta e evite colocar alimentos quentes. "
+                  "O chuveiro elétrico também pesa na conta, então tente reduzir o tempo de banho. "
+                  "Desligue a televisão da tomada à noite, porque o standby consome energia o dia inteiro. "
+                  "Por fim, troque as lâmpadas antigas por LED. ") * 2
+
+
+if __name__ == "__main__":
+    main()
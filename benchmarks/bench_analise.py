@@ -0,0 +1,82 @@
+"""Custo da análise local e chamadas ao Gemini evitadas.
+
+Mede o custo por amostra de AnaliseTelemetria.observar, a latência de
+alertas()/resumo() com a frota inteira carregada e, numa simulação de ticks
+com ruído nas leituras, quantas chaves distintas (= chamadas ao modelo com o
+cache de respostas) o prompt antigo, com todos os dispositivos, geraria
+contra o prompt só com os achados.
+
+    python benchmarks/bench_analise.py --devices 10000 --ticks 200
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from mic.analise import AnaliseTelemetria, contexto_alertas
+from mic.contexto import construir_contexto
+from mic.llm_cache import chave
+
+
+def leituras(rng, devices: int, ts: int) -> dict:
+    out = {}
+    for i in range(devices):
+        base = 5.0 if i % 10 == 0 else 100.0 + i % 900  # 10% em standby
+        out[f"dev{i:05d}"] = {
+            "Power": base * rng.uniform(0.9, 1.1), "Voltage": rng.gauss(127, 2) if i % 50 else 142.0,
+            "PF": 0.6 if i % 25 == 0 else rng.uniform(0.9, 1.0), "Current": base / 127, "Energy": 0.1, "ts": ts,
+        }
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--devices", type=int, default=10000)
+    parser.add_argument("--ticks", type=int, default=200)
+    parser.add_argument("--devices-llm", type=int, default=200, help="frota usada na contagem de chamadas ao modelo")
+    args = parser.parse_args()
+    rng = random.Random(0)
+
+    analise = AnaliseTelemetria(standby_min_s=600)
+    lote = leituras(rng, args.devices, 1700000000)
+    t0 = time.perf_counter()
+    analise.observar_lote(lote)
+    primeira = time.perf_counter() - t0
+    amostras = 0
+    t0 = time.perf_counter()
+    for tick in range(1, 21):
+        for dev, leitura in lote.items():
+            leitura["ts"] = 1700000000 + 60 * tick
+            amostras += analise.observar(dev, leitura)
+    por_amostra = (time.perf_counter() - t0) / amostras
+
+    repeticoes = 1000
+    t0 = time.perf_counter()
+    for _ in range(repeticoes):
+        alertas = analise.alertas()
+    t_alertas = (time.perf_counter() - t0) / repeticoes
+    t0 = time.perf_counter()
+    for _ in range(repeticoes):
+        analise.resumo()
+    t_resumo = (time.perf_counter() - t0) / repeticoes
+
+    print(f"{args.devices} dispositivos: 1ª carga {primeira * 1000:.1f} ms, {por_amostra * 1e6:.2f} µs por amostra")
+    print(f"alertas(): {t_alertas * 1e6:.0f} µs ({len(alertas)} ativos) | resumo(): {t_resumo * 1e6:.0f} µs")
+
+    # Chamadas ao modelo: uma por chave distinta, como se alguém clicasse em "Gerar alertas" a cada tick
+    analise = AnaliseTelemetria(standby_min_s=600)
+    chaves_antes, chaves_depois = set(), set()
+    for tick in range(args.ticks):
+        lote = leituras(rng, args.devices_llm, 1700000000 + 60 * tick)
+        analise.observar_lote(lote)
+        registros = [{"Device_ID": dev, **leitura} for dev, leitura in lote.items()]
+        chaves_antes.add(chave("alertas", construir_contexto(registros).registros))
+        chaves_depois.add(chave("alertas", contexto_alertas(analise.alertas()).registros))
+    print(f"{args.ticks} ticks, {args.devices_llm} dispositivos: {len(chaves_antes)} chamadas ao Gemini com o contexto completo, "
+          f"{len(chaves_depois)} só com os achados")
+
+
+if __name__ == "__main__":
+    main()
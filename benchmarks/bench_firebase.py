@@ -0,0 +1,51 @@
+"""Compara GETs soltos com requests contra o FirebaseClient, usando o RTDB falso.
+
+    python benchmarks/bench_firebase.py --devices 150 --latency 0.02
+"""
+import argparse
+import os
+import sys
+import time
+
+import requests
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from mic.fake_rtdb import FakeRTDB
+from mic.firebase import FirebaseClient
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--devices", type=int, default=150)
+    parser.add_argument("--latency", type=float, default=0.02, help="atraso simulado por requisição (s)")
+    parser.add_argument("--pool-size", type=int, default=10)
+    args = parser.parse_args()
+
+    seed = {"tomadas": {f"dev{i:05d}": {"Voltage": 127.8, "Current": 1.0, "Power": 127.8, "ts": 1700000000}
+                        for i in range(args.devices)}}
+    paths = [f"/tomadas/dev{i:05d}" for i in range(args.devices)]
+
+    with FakeRTDB(seed, latency=args.latency) as db:
+        t0 = time.perf_counter()
+        for p in paths:
+            requests.get(f"{db.url}{p}.json", timeout=10).json()
+        t_bare = time.perf_counter() - t0
+
+        with FirebaseClient(db.url, pool_size=args.pool_size) as client:
+            t0 = time.perf_counter()
+            for p in paths:
+                client.get(p)
+            t_session = time.perf_counter() - t0
+
+            t0 = time.perf_counter()
+            client.get_many(paths)
+            t_many = time.perf_counter() - t0
+
+    print(f"{args.devices} dispositivos, latência simulada {args.latency * 1000:.0f} ms")
+    print(f"requests.get sequencial : {t_bare:8.3f} s")
+    print(f"Session sequencial      : {t_session:8.3f} s")
+    print(f"get_many (pool={args.pool_size:<3d})     : {t_many:8.3f} s")
+
+
+if __name__ == "__main__":
+    main()
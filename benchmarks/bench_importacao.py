@@ -0,0 +1,120 @@
+"""Tempo de importação (cold start) do painel, do agente Cypher e da skill da Alexa.
+
+Cada ponto de entrada é importado num processo novo com ``python -X importtime``.
+O relatório mostra o tempo total, as importações diretas mais caras do módulo e
+qualquer subsistema pesado que tenha sido carregado na importação: Gemini, voz,
+Plotly e boto3 devem chegar só no primeiro uso. Sai com código 1 se algum chegar
+ou se um ponto de entrada não importar::
+
+    python benchmarks/bench_importacao.py
+    python benchmarks/bench_importacao.py --repeticoes 5 --saida importacao.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+LAMBDA_DIR = os.path.join(ROOT, "badrock", "Azzy", "sim amazon", "lambda")
+
+# (nome, diretório de trabalho, módulo importado)
+ENTRADAS = [
+    ("painel", ROOT, "app_mic"),
+    ("cypher", os.path.join(ROOT, "badrock", "Cypher"), "lote"),
+    ("alexa", LAMBDA_DIR, "lambda_function"),
+]
+# Carregados só no primeiro uso, nunca na importação
+PESADOS = ["google.generativeai", "speech_recognition", "gtts", "audio_recorder_streamlit", "plotly.express", "boto3"]
+
+
+def importtime(cwd: str, modulo: str) -> list:
+    """Linhas do ``-X importtime`` como (pacote, profundidade, próprio_us, acumulado_us)"""
+    # Sem chave e sem Firebase: a importação não pode depender de credenciais
+    env = {**os.environ, "PYTHONPATH": cwd, "GEMINI_API_KEY": "", "GOOGLE_API_KEY": "", "FIREBASE_DB_URL": "",
+           "PYTHONDONTWRITEBYTECODE": "1"}
+    r = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {modulo}"], cwd=cwd, env=env,
+                       capture_output=True, text=True)
+    if r.returncode != 0:
+        raise RuntimeError(r.stderr.strip().splitlines()[-1] if r.stderr.strip() else f"código {r.returncode}")
+    linhas = []
+    for linha in r.stderr.splitlines():
+        if not linha.startswith("import time:") or "self [us]" in linha:
+            continue
+        proprio, acumulado, pacote = linha[len("import time:"):].split("|", 2)
+        profundidade = (len(pacote) - len(pacote.lstrip()) - 1) // 2
+        linhas.append((pacote.strip(), profundidade, int(proprio), int(acumulado)))
+    return linhas
+
+
+def diretos(linhas: list, modulo: str) -> list:
+    """Importações diretas do ponto de entrada como (acumulado_us, pacote).
+
+    O ``-X importtime`` escreve cada módulo depois dos que ele importou, então os
+    filhos (profundidade 1) do ``modulo`` são os que vêm logo antes da sua linha.
+    """
+    filhos = []
+    for pacote, profundidade, _, acumulado in linhas:
+        if profundidade == 1:
+            filhos.append((acumulado, pacote))
+        elif profundidade == 0:
+            if pacote == modulo:
+                return filhos
+            filhos = []
+    return []
+
+
+def total_us(linhas: list, modulo: str) -> int:
+    return next(acumulado for pacote, prof, _, acumulado in linhas if prof == 0 and pacote == modulo)
+
+
+def relatorio(cwd: str, modulo: str, repeticoes: int, top: int) -> dict:
+    execucoes = [importtime(cwd, modulo) for _ in range(repeticoes)]
+    # só a linha do ponto de entrada: site, encodings e afins são da partida do interpretador
+    totais = [total_us(linhas, modulo) for linhas in execucoes]
+    # a execução mediana é a que vai para o detalhamento
+    linhas = execucoes[totais.index(sorted(totais)[len(totais) // 2])]
+    carregados = {pacote for pacote, *_ in linhas}
+    mais_caros = sorted(diretos(linhas, modulo), reverse=True)
+    return {
+        "total_ms": round(statistics.median(totais) / 1000, 1),
+        "modulos": len(linhas),
+        "mais_caros": [{"pacote": pacote, "ms": round(acumulado / 1000, 1)} for acumulado, pacote in mais_caros[:top]],
+        "pesados_na_importacao": [p for p in PESADOS if p in carregados],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--saida", help="grava o relatório em JSON")
+    args = parser.parse_args()
+
+    resultado, falhou = {}, False
+    for nome, cwd, modulo in ENTRADAS:
+        try:
+            rel = relatorio(cwd, modulo, args.repeticoes, args.top)
+        except RuntimeError as e:
+            print(f"\n{nome} ({modulo}): não importou: {e}")
+            resultado[nome] = {"erro": str(e)}
+            falhou = True
+            continue
+        resultado[nome] = rel
+        print(f"\n{nome} ({modulo}): {rel['total_ms']:.0f} ms, {rel['modulos']} módulos")
+        for item in rel["mais_caros"]:
+            print(f"  {item['pacote']:<40s} {item['ms']:8.1f} ms")
+        if rel["pesados_na_importacao"]:
+            falhou = True
+            print(f"  ✗ carregados na importação: {', '.join(rel['pesados_na_importacao'])}")
+
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            json.dump(resultado, f, ensure_ascii=False, indent=2)
+    if falhou:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Memória por sessão do estado dos dispositivos: DataFrame por sessão contra estado compacto compartilhado.
+
+"antes" reproduz o que cada sessão guardava: o DataFrame montado a partir de
+linhas (float64 e textos como objetos), a cópia `df = ...copy()` e a cópia da
+tabela com a hora convertida em texto. "depois" é um EstadoDispositivos por
+processo, do qual cada sessão só lê visões.
+
+    python benchmarks/bench_memoria.py --devices 1000 10000 --sessoes 10
+"""
+import argparse
+import gc
+import json
+import os
+import random
+import subprocess
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+
+def rss() -> int:
+    """Memória residente do processo, em bytes"""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def linhas(n: int) -> list:
+    rng = random.Random(0)
+    nomes = ["Geladeira", "Televisão", "Laptop", "Secador de cabelo", "Micro-ondas", "Ar-condicionado"]
+    return [
+        {
+            "Device_ID": f"{100000000000 + i}", "Dispositivo": rng.choice(nomes),
+            "Prioridade": rng.choice(["Máxima", "Moderada", "Mínima"]), "Nome_Conectado": "", "Modelo_Dispositivo": "",
+            "time": f"2025-09-14T{rng.randrange(24):02d}:{rng.randrange(60):02d}:00",
+            "Voltage": rng.uniform(110, 230), "Current": rng.uniform(0, 10), "Power": rng.uniform(0, 2000),
+            "Energy": rng.uniform(0, 50), "Frequency": 60.0, "PF": rng.uniform(0.5, 1.0),
+        }
+        for i in range(n)
+    ]
+
+
+def sessao_antes(rows: list):
+    import pandas as pd
+    df_devices = pd.DataFrame([pd.Series(r) for r in rows])
+    df_devices["time"] = pd.to_datetime(df_devices["time"], errors="coerce")
+    df = df_devices.copy()
+    df_display = df_devices.copy()
+    df_display["time"] = df_display["time"].dt.strftime("%Y-%m-%d %H:%M")
+    return df_devices, df, df_display
+
+
+def rodar(modo: str, devices: int, sessoes: int) -> dict:
+    import pandas as pd
+    from mic.dispositivos import EstadoDispositivos
+    from mic.normalizacao import ESQUEMA_CADASTRO, tipar
+
+    def compartilhado(rows):
+        df = pd.DataFrame(rows)
+        df["time"] = pd.to_datetime(df["time"], errors="coerce")
+        return EstadoDispositivos.de_dataframe(tipar(df, ESQUEMA_CADASTRO))
+
+    # aquece o pandas (inicializações preguiçosas) antes de tomar a base
+    sessao_antes(linhas(10))
+    compartilhado(linhas(10)).frame
+    rows = linhas(devices)
+    gc.collect()
+    base = rss()
+    if modo == "antes":
+        estado = [sessao_antes(rows) for _ in range(sessoes)]
+        objetos = sum(df.memory_usage(deep=True).sum() for s in estado for df in s)
+    else:
+        dispositivos = compartilhado(rows)
+        # cada sessão recebe uma cópia rasa do DataFrame (sem copiar os dados) e os KPIs
+        estado = [(dispositivos.frame, dispositivos.kpis()) for _ in range(sessoes)]
+        objetos = dispositivos.nbytes
+    gc.collect()
+    total = rss() - base
+    return {"modo": modo, "devices": devices, "sessoes": sessoes, "rss_total": total,
+            "rss_sessao": total / sessoes, "objetos": int(objetos)}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--devices", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--sessoes", type=int, default=10)
+    parser.add_argument("--interno", choices=["antes", "depois"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.interno:
+        print(json.dumps(rodar(args.interno, args.devices[0], args.sessoes)))
+        return
+
+    # Um processo por medição para o RSS de uma não contaminar a outra
+    print(f"{'devices':>8} {'modo':<7} {'RSS total (MB)':>15} {'RSS/sessão (MB)':>16} {'estruturas (MB)':>16}")
+    for n in args.devices:
+        for modo in ("antes", "depois"):
+            cmd = [sys.executable, os.path.abspath(__file__), "--interno", modo,
+                   "--devices", str(n), "--sessoes", str(args.sessoes)]
+            r = json.loads(subprocess.run(cmd, capture_output=True, text=True, check=True, cwd=ROOT).stdout.splitlines()[-1])
+            print(f"{n:>8} {modo:<7} {r['rss_total'] / 2**20:>15.2f} {r['rss_sessao'] / 2**20:>16.3f} "
+                  f"{r['objetos'] / 2**20:>16.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Normalização de payloads do Firebase: código antigo (por linha) contra mic.normalizacao.
+
+    python benchmarks/bench_normalizacao.py --tamanhos 10000 1000000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timezone
+
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from mic.normalizacao import ESQUEMA_HISTORICO, ESQUEMA_TOMADA, normalizar, tabela
+
+
+# ---------- implementações anteriores, copiadas para referência ----------
+def tomadas_por_linha(data: dict) -> pd.DataFrame:
+    # fetch_devices_data (agent.py) / fetch_tomada (app_mic.py)
+    devices = []
+    for dev_id, values in data.items():
+        ts = values.get("ts")
+        t = datetime.fromtimestamp(ts, tz=timezone.utc) if isinstance(ts, (int, float)) else datetime.now(timezone.utc)
+        devices.append({
+            "Device_ID": dev_id,
+            "time": t.isoformat(),
+            "Voltage": float(values.get("Voltage", 127.8)),
+            "Current": float(values.get("Current", 0.0)),
+            "Power": float(values.get("Power", 0.0)),
+            "Energy": float(values.get("Energy", 0.0)),
+            "Frequency": float(values.get("Frequency", 60.0)),
+            "PF": float(values.get("PF", 1.0)),
+        })
+    return pd.DataFrame(devices)
+
+
+def historico_por_coluna(registros: dict) -> dict:
+    # registros_para_array antes do esquema: uma Series de objetos e um to_numeric por campo
+    keys = sorted(k for k, v in registros.items() if isinstance(v, dict))
+    values = [registros[k] for k in keys]
+    ts = pd.to_numeric(pd.Series([v.get("ts") for v in values]), errors="coerce")
+    time_ = pd.to_datetime(pd.Series([v.get("time") for v in values]), errors="coerce", utc=True)
+    time_s = (time_ - pd.Timestamp(0, tz="UTC")) // pd.Timedelta(seconds=1)
+    out = {"ts": ts.fillna(time_s).fillna(0).astype("int64").to_numpy()}
+    for col in ("Power", "Energy"):
+        out[col] = pd.to_numeric(pd.Series([v.get(col) for v in values]), errors="coerce").to_numpy(dtype="float32")
+    return out
+
+
+# ---------- dados ----------
+def gerar_tomadas(n: int) -> dict:
+    rng = random.Random(0)
+    return {
+        f"dev{i:07d}": {
+            "Voltage": rng.uniform(110, 230), "Current": rng.uniform(0, 10), "Power": rng.uniform(0, 2000),
+            "Energy": rng.uniform(0, 50), "Frequency": 60.0, "PF": rng.uniform(0.5, 1.0), "ts": 1700000000 + i,
+        }
+        for i in range(n)
+    }
+
+
+def gerar_historico(n: int) -> dict:
+    rng = random.Random(1)
+    return {f"-N{i:09d}": {"ts": 1700000000 + 60 * i, "Power": rng.uniform(0, 2000), "Energy": i * 0.01} for i in range(n)}
+
+
+def medir(fn, *args, repeticoes: int = 3) -> float:
+    melhor = float("inf")
+    for _ in range(repeticoes):
+        t0 = time.perf_counter()
+        fn(*args)
+        melhor = min(melhor, time.perf_counter() - t0)
+    return melhor
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tamanhos", type=int, nargs="+", default=[10_000, 1_000_000])
+    args = parser.parse_args()
+
+    print(f"{'registros':>10} {'caso':<28} {'antes (ms)':>11} {'depois (ms)':>12} {'ganho':>7}")
+    for n in args.tamanhos:
+        repeticoes = 5 if n <= 100_000 else 1
+        tomadas = gerar_tomadas(n)
+        antes = medir(tomadas_por_linha, tomadas, repeticoes=repeticoes)
+        depois = medir(tabela, tomadas, ESQUEMA_TOMADA, "Device_ID", repeticoes=repeticoes)
+        print(f"{n:>10} {'/tomadas -> DataFrame':<28} {antes * 1000:>11.1f} {depois * 1000:>12.1f} {antes / depois:>6.1f}x")
+
+        memoria_antes = tomadas_por_linha(tomadas).memory_usage(deep=True).sum()
+        memoria_depois = tabela(tomadas, ESQUEMA_TOMADA, "Device_ID").memory_usage(deep=True).sum()
+        print(f"{n:>10} {'memória do DataFrame (MB)':<28} {memoria_antes / 2**20:>11.1f} {memoria_depois / 2**20:>12.1f} "
+              f"{memoria_antes / memoria_depois:>6.1f}x")
+        del tomadas
+
+        historico = gerar_historico(n)
+        antes = medir(historico_por_coluna, historico, repeticoes=repeticoes)
+        depois = medir(normalizar, historico, ESQUEMA_HISTORICO, None, True, repeticoes=repeticoes)
+        print(f"{n:>10} {'/historico -> colunas':<28} {antes * 1000:>11.1f} {depois * 1000:>12.1f} {antes / depois:>6.1f}x")
+        del historico
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+"""Suíte de desempenho do caminho de dados do painel, contra o RTDB falso.
+
+Importa o app_mic sem o servidor do Streamlit e, para cada tamanho de frota,
+sobe um RTDB falso com as tomadas do mic.simulador já cadastradas, 10% a mais
+de chamados pendentes e o histórico (1M de registros no total, divididos entre
+as tomadas). Mede:
+- atualizar_dados, fetch_tomada, get_pending_device_calls e gerar_contexto_resumido;
+- o histórico, na primeira sincronização e nas seguintes;
+- KPIs, análise local e figuras;
+- uma resposta do Gemini com TTS, com o ModeloStub e um motor de TTS de latência fixa.
+
+Cada medição guarda a mediana do tempo, as requisições ao RTDB e o pico de
+memória (tracemalloc, numa execução à parte). O resultado vai para um JSON por
+commit; com --comparar, lista o que piorou em relação a outro JSON e sai com
+código 1::
+
+    python benchmarks/bench_painel.py
+    python benchmarks/bench_painel.py --dispositivos 10 1000 --registros 100000 \\
+        --comparar benchmarks/resultados/painel-<commit>.json
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+from mic.fake_rtdb import FakeRTDB
+from mic.gemini import ModeloStub
+from mic.registry import DeviceRegistry
+from mic.simulador import arvore_inicial, exportar_cadastro, gerar_tomadas
+
+PASSO_HISTORICO = 60  # s entre registros do histórico sintético
+PERGUNTA = "Qual aparelho está consumindo mais agora?"
+
+
+class MotorLento:
+    """TTS sem rede com latência proporcional ao texto, como o gTTS"""
+    nome = "lento"
+    formato = "audio/wav"
+
+    def __init__(self, segundos_por_caractere: float):
+        self.segundos_por_caractere = segundos_por_caractere
+
+    def sintetizar(self, texto, lang="pt"):
+        time.sleep(len(texto) * self.segundos_por_caractere)
+        return texto.encode("utf-8")
+
+
+def commit_atual() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "desconhecido"
+
+
+def importar_app(tmp: str):
+    # Configuração antes do import: o app lê o ambiente no carregamento do módulo
+    os.environ.update({
+        "GEMINI_API_KEY": "", "FIREBASE_STREAMING": "0", "TTS_ENGINE": "silencioso",
+        "REGISTRY_DB": os.path.join(tmp, "cadastro.db"), "HISTORICO_DIR": os.path.join(tmp, "historico"),
+        "LLM_CACHE_FILE": os.path.join(tmp, "llm.json"), "TTS_CACHE_DIR": os.path.join(tmp, "tts"),
+    })
+    import app_mic
+    return app_mic
+
+
+def medir(db, fn, repeticoes: int, preparar=None) -> dict:
+    """Mediana do tempo e das requisições em ``repeticoes`` execuções; pico de memória numa extra"""
+    tempos, requisicoes = [], []
+    for _ in range(repeticoes):
+        if preparar:
+            preparar()
+        antes = db.request_count
+        t0 = time.perf_counter()
+        fn()
+        tempos.append(time.perf_counter() - t0)
+        requisicoes.append(db.request_count - antes)
+    if preparar:
+        preparar()
+    # tracemalloc deixa a execução mais lenta: memória e tempo não saem da mesma rodada
+    tracemalloc.start()
+    try:
+        fn()
+        pico = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {
+        "tempo_mediana_s": round(statistics.median(tempos), 6),
+        "tempo_min_s": round(min(tempos), 6),
+        "requisicoes": int(statistics.median(requisicoes)),
+        "pico_memoria_mb": round(pico / 2 ** 20, 3),
+    }
+
+
+def cenario(app, n: int, registros: int, repeticoes: int, args, tmp: str) -> dict:
+    t0 = time.perf_counter()
+    tomadas = gerar_tomadas(n + max(n // 10, 1))
+    cadastradas, pendentes = tomadas[:n], tomadas[n:]
+    por_tomada = registros // n
+    arvore = arvore_inicial(cadastradas, chamados=False, historico_horas=por_tomada * PASSO_HISTORICO / 3600,
+                            passo_s=PASSO_HISTORICO, historico="raiz")
+    agora = time.time()
+    for t in pendentes:
+        arvore["tomadas"][t.id] = t.amostra(agora)
+    arvore["device_calls"] = {t.id: t.chamado() for t in pendentes}
+    db = FakeRTDB(arvore, indices={"/device_calls": ["status"]}).start()
+    del arvore
+
+    pasta = tempfile.mkdtemp(prefix=f"n{n}-", dir=tmp)
+    exportar_cadastro(cadastradas, os.path.join(pasta, "frota.csv"))
+    DeviceRegistry(os.path.join(pasta, "cadastro.db")).import_file(os.path.join(pasta, "frota.csv"))
+
+    app.st.cache_data.clear()
+    app.st.cache_resource.clear()
+    app.FIREBASE_DB_URL = db.url
+    app.REGISTRY_DB = os.path.join(pasta, "cadastro.db")
+    app.HISTORICO_DIR = os.path.join(pasta, "historico")
+    app.POLLING_S = 3600  # a thread de telemetria não faz leituras durante as medições
+    modelo = ModeloStub(primeiro_token=args.gemini_primeiro_token, por_pedaco=args.gemini_por_pedaco)
+    app.get_llm = lambda: modelo
+    app.criar_motor = lambda nome: MotorLento(args.tts_por_caractere)
+    cache = app.get_telemetria_cache()
+    montagem = time.perf_counter() - t0
+
+    medicoes = {}
+    try:
+        medicoes["atualizar_dados"] = medir(db, app.atualizar_dados, repeticoes)
+        df = app.dados_atuais()
+        assert len(df) == n, f"{len(df)} dispositivos no estado, esperado {n}"
+
+        medio = cadastradas[n // 2].id
+        medicoes["fetch_tomada"] = medir(db, lambda: app.fetch_tomada(medio), repeticoes)
+
+        def chamados():
+            assert len(app.get_pending_device_calls()) == len(pendentes)
+        medicoes["get_pending_device_calls"] = medir(db, chamados, repeticoes, preparar=app.fetch_device_calls.clear)
+
+        medicoes["gerar_contexto_resumido"] = medir(db, lambda: app.gerar_contexto_resumido(df), repeticoes)
+
+        # mesmos argumentos que secao_historico monta a partir do estado atual
+        dispositivos = tuple(df["Device_ID"].unique())
+        nomes = tuple(zip(df["Device_ID"], df["Dispositivo"]))
+
+        def store_vazio():
+            app.HISTORICO_DIR = tempfile.mkdtemp(prefix="historico-", dir=pasta)
+            app.get_historico_store.clear()
+            app.carregar_historico.clear()
+        medicoes["historico_primeira_sync"] = medir(db, lambda: app.carregar_historico(dispositivos, nomes),
+                                                    max(1, repeticoes // 3), preparar=store_vazio)
+        medicoes["historico_incremental"] = medir(db, lambda: app.carregar_historico(dispositivos, nomes),
+                                                  repeticoes, preparar=app.carregar_historico.clear)
+        df_historico, _ = app.carregar_historico(dispositivos, nomes)
+
+        def kpis():
+            app.estado_atual().kpis()
+            app.get_analise().resumo()
+            app.get_analise().alertas()
+        medicoes["kpis"] = medir(db, kpis, repeticoes)
+
+        def figuras():
+            estado = cache.snapshot()
+            app.figura_barras(estado.dados, estado.versao, "Power", "Potência (W)")
+            app.figura_barras(estado.dados, estado.versao, "Energy", "Energia (kWh)")
+            app.plotly_express().line(df_historico, x="time", y="Energy", color="Dispositivo", markers=True)
+        medicoes["figuras"] = medir(db, figuras, repeticoes, preparar=app.figura_barras.clear)
+
+        def sem_cache_de_resposta():
+            app.LLM_CACHE_FILE = tempfile.mktemp(suffix=".json", dir=pasta)
+            app.TTS_CACHE_DIR = tempfile.mkdtemp(prefix="tts-", dir=pasta)
+            app.get_resposta_cache.clear()
+            app.get_sintetizador.clear()
+        contexto = app.gerar_contexto_resumido(df)
+        sinteses = []
+        app.exibir_audio = sinteses.append  # o fragmento do áudio não roda fora do Streamlit
+
+        def responder():
+            # texto completo e todo o áudio sintetizado, como o usuário recebe
+            app.responder_gemini(app.PROMPT_PERGUNTA, contexto, "Resposta:", "Erro", pergunta=PERGUNTA)
+            sinteses.pop().aguardar()
+        medicoes["resposta_gemini"] = medir(db, responder, max(1, repeticoes // 3), preparar=sem_cache_de_resposta)
+        medicoes["resposta_gemini_cache"] = medir(db, responder, repeticoes)
+    finally:
+        cache.stop()
+        db.stop()
+
+    return {"dispositivos": n, "pendentes": len(pendentes), "registros_historico": por_tomada * n,
+            "montagem_s": round(montagem, 2), "medicoes": medicoes}
+
+
+def comparar(atual: dict, base: dict, limite: float, minimo_s: float) -> list:
+    """Medições piores que a base: tempo acima de ``limite``, mais requisições ou mais memória"""
+    piores = []
+    for n, cen in atual["cenarios"].items():
+        base_cen = base.get("cenarios", {}).get(n)
+        if not base_cen:
+            continue
+        for op, m in cen["medicoes"].items():
+            b = base_cen["medicoes"].get(op)
+            if not b:
+                continue
+            if (m["tempo_mediana_s"] > b["tempo_mediana_s"] * (1 + limite)
+                    and m["tempo_mediana_s"] - b["tempo_mediana_s"] > minimo_s):
+                piores.append(f"{n} {op}: tempo {b['tempo_mediana_s'] * 1000:.1f} -> {m['tempo_mediana_s'] * 1000:.1f} ms")
+            if m["requisicoes"] > b["requisicoes"]:
+                piores.append(f"{n} {op}: requisições {b['requisicoes']} -> {m['requisicoes']}")
+            if m["pico_memoria_mb"] > b["pico_memoria_mb"] * (1 + limite) + 1:
+                piores.append(f"{n} {op}: memória {b['pico_memoria_mb']:.1f} -> {m['pico_memoria_mb']:.1f} MB")
+    return piores
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dispositivos", type=int, nargs="+", default=[10, 1000, 10000])
+    parser.add_argument("--registros", type=int, default=1_000_000, help="registros de histórico por cenário")
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--gemini-primeiro-token", type=float, default=0.3)
+    parser.add_argument("--gemini-por-pedaco", type=float, default=0.02)
+    parser.add_argument("--tts-por-caractere", type=float, default=0.001)
+    parser.add_argument("--saida", help="JSON de saída (padrão: benchmarks/resultados/painel-<commit>.json)")
+    parser.add_argument("--comparar", help="JSON de uma execução anterior para apontar regressões")
+    parser.add_argument("--limite", type=float, default=0.2, help="piora relativa tolerada (0.2 = 20%%)")
+    parser.add_argument("--minimo-ms", type=float, default=5.0, help="diferenças de tempo menores são ruído")
+    args = parser.parse_args()
+
+    commit = commit_atual()
+    saida = args.saida or os.path.join(ROOT, "benchmarks", "resultados", f"painel-{commit}.json")
+    with tempfile.TemporaryDirectory(prefix="bench-painel-") as tmp:
+        app = importar_app(tmp)
+        resultado = {
+            "commit": commit,
+            "data": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "plataforma": platform.platform(),
+            "parametros": vars(args),
+            "cenarios": {},
+        }
+        for n in args.dispositivos:
+            cen = cenario(app, n, args.registros, args.repeticoes, args, tmp)
+            resultado["cenarios"][str(n)] = cen
+            print(f"\n{n} dispositivos, {cen['registros_historico']} registros de histórico "
+                  f"(montagem {cen['montagem_s']:.1f} s)")
+            for op, m in cen["medicoes"].items():
+                print(f"  {op:<26s} {m['tempo_mediana_s'] * 1000:10.1f} ms {m['requisicoes']:7d} req "
+                      f"{m['pico_memoria_mb']:9.1f} MB")
+    resultado["pico_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+    os.makedirs(os.path.dirname(os.path.abspath(saida)), exist_ok=True)
+    with open(saida, "w", encoding="utf-8") as f:
+        json.dump(resultado, f, ensure_ascii=False, indent=2)
+    print(f"\nResultado em {saida} (pico de RSS {resultado['pico_rss_mb']:.0f} MB)")
+
+    if args.comparar:
+        with open(args.comparar, "r", encoding="utf-8") as f:
+            base = json.load(f)
+        piores = comparar(resultado, base, args.limite, args.minimo_ms / 1000)
+        print(f"\nComparado a {base.get('commit')}: " + ("sem regressões" if not piores else f"{len(piores)} regressões"))
+        for linha in piores:
+            print(f"  {linha}")
+        if piores:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""Cliente S3 e URLs pré-assinadas da skill da Alexa, contra um S3 local (moto).
+
+Sem rede nem credenciais, verifica e mede o que o utils.py da lambda promete:
+- um único cliente boto3 por contêiner, mesmo com chamadas concorrentes;
+- URLs repetidas saem do cache e são renovadas depois de expirar;
+- a URL do áudio de boas-vindas baixa o arquivo do bucket;
+- a memória da sessão vai e volta pelo mesmo cliente.
+Sai com código 1 se alguma verificação falhar::
+
+    pip install "moto[s3]"
+    python benchmarks/bench_s3.py --urls 2000 --threads 8
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+LAMBDA_DIR = os.path.join(ROOT, "badrock", "Azzy", "sim amazon", "lambda")
+
+BUCKET = "skill-local"
+AUDIO = "boas_vindas.mp3"
+
+
+def mock_s3():
+    try:
+        from moto import mock_aws  # moto >= 5
+    except ImportError:
+        from moto import mock_s3 as mock_aws
+    return mock_aws()
+
+
+def medir_ms(fn, n: int) -> float:
+    tempos = []
+    for i in range(n):
+        t0 = time.perf_counter()
+        fn(i)
+        tempos.append(time.perf_counter() - t0)
+    return statistics.median(tempos) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--urls", type=int, default=1000, help="assinaturas medidas em cada cenário")
+    parser.add_argument("--threads", type=int, default=8)
+    args = parser.parse_args()
+
+    os.environ.update({"AWS_ACCESS_KEY_ID": "teste", "AWS_SECRET_ACCESS_KEY": "teste",
+                       "S3_PERSISTENCE_REGION": "us-east-1", "S3_PERSISTENCE_BUCKET": BUCKET})
+    sys.path.insert(0, LAMBDA_DIR)
+    falhas = []
+
+    with mock_s3():
+        import boto3
+        import requests
+
+        import utils
+        from memoria import PersistenciaS3
+
+        criados = []
+        boto3_client = boto3.client
+
+        def contar_cliente(*a, **k):
+            criados.append(time.perf_counter())
+            return boto3_client(*a, **k)
+        boto3.client = contar_cliente
+
+        # contêiner frio: várias threads pedem o cliente ao mesmo tempo
+        with ThreadPoolExecutor(max_workers=args.threads) as pool:
+            clientes = list(pool.map(lambda _: utils.get_s3_client(), range(args.threads * 4)))
+        if len(criados) != 1 or len({id(c) for c in clientes}) != 1:
+            falhas.append(f"{len(criados)} clientes criados, esperado 1")
+        s3 = utils.get_s3_client()
+        s3.create_bucket(Bucket=BUCKET)
+        s3.put_object(Bucket=BUCKET, Key=f"{utils.AUDIO_PREFIX}{AUDIO}", Body=b"ID3-audio-de-teste")
+
+        # assinatura: um cliente novo por chamada (antes) x cliente compartilhado (depois) x cache
+        def cliente_novo(i):
+            boto3_client("s3", region_name="us-east-1").generate_presigned_url(
+                "get_object", Params={"Bucket": BUCKET, "Key": f"obj-{i}"}, ExpiresIn=60)
+        antes = medir_ms(cliente_novo, max(1, args.urls // 20))
+        depois = medir_ms(lambda i: utils.create_presigned_url(f"obj-{i}"), args.urls)
+        cache = medir_ms(lambda i: utils.create_presigned_url(f"obj-{i % 10}"), args.urls)
+
+        # cache concorrente: a mesma URL para todas as threads, sem exceções do OrderedDict
+        with ThreadPoolExecutor(max_workers=args.threads) as pool:
+            urls = set(pool.map(lambda i: utils.create_presigned_url(f"obj-{i % 50}"), range(args.urls)))
+        if len(urls) != 50:
+            falhas.append(f"{len(urls)} URLs distintas para 50 objetos")
+
+        # expiração: com margem zero e 1 s de validade, a URL é renovada
+        utils.URL_EXPIRY_MARGIN = 0
+        primeira = utils.create_presigned_url("expira", expires_in=1)
+        repetida = utils.create_presigned_url("expira", expires_in=1)
+        time.sleep(1.1)
+        renovada = utils.create_presigned_url("expira", expires_in=1)
+        if primeira != repetida:
+            falhas.append("URL dentro da validade não veio do cache")
+        if renovada == primeira:
+            falhas.append("URL expirada não foi renovada")
+
+        resposta = requests.get(utils.audio_url(AUDIO), timeout=5)
+        if resposta.status_code != 200 or resposta.content != b"ID3-audio-de-teste":
+            falhas.append(f"download do áudio pré-assinado: HTTP {resposta.status_code}")
+        if 'src="' not in utils.audio_ssml(AUDIO):
+            falhas.append("audio_ssml sem <audio src>")
+
+        persistencia = PersistenciaS3(BUCKET)
+        persistencia.salvar("sessao-1", {"resumo": "ok", "turnos": []})
+        if persistencia.carregar("sessao-1") != {"resumo": "ok", "turnos": []}:
+            falhas.append("memória não voltou igual do S3")
+        persistencia.apagar("sessao-1")
+        if persistencia.carregar("sessao-1") is not None:
+            falhas.append("memória apagada ainda está no S3")
+        if len(criados) != 1:
+            falhas.append(f"{len(criados)} clientes criados ao fim, esperado 1")
+
+    print(f"Clientes boto3 criados: {len(criados)}")
+    print(f"Assinatura com cliente novo:        {antes:8.3f} ms (mediana)")
+    print(f"Assinatura com cliente compartilhado: {depois:6.3f} ms")
+    print(f"URL vinda do cache:                  {cache:8.4f} ms")
+    for falha in falhas:
+        print(f"✗ {falha}")
+    if falhas:
+        sys.exit(1)
+    print("✓ cliente único, cache, renovação, download e memória conferidos")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Carga no Firebase com várias sessões do painel abertas ao mesmo tempo.
+
+Cada sessão é um AppTest do app_mic.py rodando no mesmo processo (como no
+servidor do Streamlit) contra o FakeRTDB, enquanto as tomadas mudam ao fundo.
+
+    python benchmarks/bench_sessoes.py --sessoes 1 5 10 20 --ticks 10
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+
+def rodar(sessoes: int, ticks: int, devices: int, intervalo: float, streaming: bool):
+    from mic.fake_rtdb import FakeRTDB
+    from mic.registry import DeviceRegistry
+
+    tmp = tempfile.mkdtemp()
+    ids = [f"dev{i:05d}" for i in range(devices)]
+    seed = {
+        "tomadas": {dev: {"Voltage": 127.0, "Current": 1.0, "Power": 100.0, "Energy": 0.5, "ts": 1700000000} for dev in ids},
+        "historico": {dev: {f"-N{j:03d}": {"ts": 1700000000 + 60 * j, "Power": 100.0, "Energy": 0.01 * j} for j in range(20)} for dev in ids},
+    }
+    DeviceRegistry(os.path.join(tmp, "registro.db")).upsert_many(
+        [{"Device_ID": dev, "Dispositivo": f"Aparelho {dev}", "Prioridade": "Moderada"} for dev in ids]
+    )
+
+    db = FakeRTDB(seed).start()
+    os.environ.update(
+        FIREBASE_DB_URL=db.url, FIREBASE_STREAMING="1" if streaming else "0", GEMINI_API_KEY="",
+        REGISTRY_DB=os.path.join(tmp, "registro.db"), HISTORICO_DIR=os.path.join(tmp, "historico"),
+        LLM_CACHE_FILE=os.path.join(tmp, "llm.json"), TTS_CACHE_DIR=os.path.join(tmp, "tts"),
+    )
+    from streamlit.testing.v1 import AppTest
+
+    parar = threading.Event()
+
+    def escritor():
+        # Telemetria chegando enquanto as sessões atualizam
+        while not parar.wait(0.05):
+            db.set(f"/tomadas/{random.choice(ids)}/Power", random.uniform(0, 2000))
+
+    threading.Thread(target=escritor, daemon=True).start()
+    apps = [AppTest.from_file(os.path.join(ROOT, "app_mic.py"), default_timeout=60) for _ in range(sessoes)]
+    inicio = db.request_count
+    t0 = time.perf_counter()
+    for _ in range(ticks):
+        for at in apps:
+            at.run()
+            if at.exception:
+                raise RuntimeError(at.exception[0].value)
+        time.sleep(intervalo)
+    duracao = time.perf_counter() - t0
+    parar.set()
+    total = db.request_count - inicio
+    db.stop()
+    return {"sessoes": sessoes, "ticks": ticks, "requisicoes": total,
+            "por_sessao": total / sessoes, "por_sessao_tick": total / (sessoes * ticks), "duracao_s": duracao}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessoes", type=int, nargs="+", default=[1, 5, 10])
+    parser.add_argument("--ticks", type=int, default=10)
+    parser.add_argument("--devices", type=int, default=50)
+    parser.add_argument("--intervalo", type=float, default=0.5, help="segundos entre atualizações de cada sessão")
+    parser.add_argument("--polling", action="store_true", help="desliga o stream SSE (FIREBASE_STREAMING=0)")
+    parser.add_argument("--interno", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.interno:
+        print(json.dumps(rodar(args.sessoes[0], args.ticks, args.devices, args.intervalo, not args.polling)))
+        return
+
+    # Um processo por cenário: os recursos em cache do Streamlit não vazam entre medições
+    print(f"{'sessões':>8} {'requisições':>12} {'por sessão':>11} {'por sessão/tick':>16} {'duração (s)':>12}")
+    for n in args.sessoes:
+        cmd = [sys.executable, os.path.abspath(__file__), "--interno", "--sessoes", str(n), "--ticks", str(args.ticks),
+               "--devices", str(args.devices), "--intervalo", str(args.intervalo)] + (["--polling"] if args.polling else [])
+        saida = subprocess.run(cmd, capture_output=True, text=True, check=True, cwd=ROOT).stdout
+        r = json.loads(saida.strip().splitlines()[-1])
+        print(f"{r['sessoes']:>8} {r['requisicoes']:>12} {r['por_sessao']:>11.2f} "
+              f"{r['por_sessao_tick']:>16.3f} {r['duracao_s']:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
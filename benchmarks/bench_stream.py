@@ -0,0 +1,54 @@
+"""Latência e volume de requisições: polling de /tomadas/{id} contra o stream SSE.
+
+    python benchmarks/bench_stream.py --devices 150 --updates 50
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from mic.fake_rtdb import FakeRTDB
+from mic.firebase import FirebaseClient
+from mic.stream import TelemetriaStream
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--devices", type=int, default=150)
+    parser.add_argument("--updates", type=int, default=50)
+    args = parser.parse_args()
+
+    seed = {"tomadas": {f"dev{i:05d}": {"Power": 0.0, "ts": 1700000000} for i in range(args.devices)}}
+    with FakeRTDB(seed) as db, FirebaseClient(db.url) as client:
+        before = db.request_count
+        stream = TelemetriaStream(client).start()
+        stream.wait_for_version(0, timeout=10)
+
+        latencies = []
+        for n in range(args.updates):
+            dev = f"dev{n % args.devices:05d}"
+            version = stream.version
+            t0 = time.perf_counter()
+            db.set(f"/tomadas/{dev}/Power", float(n))
+            stream.wait_for_version(version, timeout=5)
+            latencies.append(time.perf_counter() - t0)
+        stream_requests = db.request_count - before
+        stream.stop()
+
+        # Equivalente em polling: um GET por dispositivo a cada rerun de 5 s
+        before = db.request_count
+        t0 = time.perf_counter()
+        client.get_many([f"/tomadas/dev{i:05d}" for i in range(args.devices)])
+        poll_time = time.perf_counter() - t0
+        poll_requests = db.request_count - before
+
+    print(f"stream : latência mediana {statistics.median(latencies) * 1000:.2f} ms, "
+          f"{stream_requests} requisições para {args.updates} atualizações")
+    print(f"polling: {poll_requests} requisições e {poll_time * 1000:.1f} ms por rerun "
+          f"(latência até 5000 ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Tempo até a primeira saída: resposta bloqueante + TTS inteiro contra streaming por sentença.
+
+Usa o ModeloStub e um TTS simulado, sem rede:
+
+    python benchmarks/bench_ttft.py --primeiro-token 1.0 --tts-por-caractere 0.002
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from mic.gemini import ModeloStub, medir_primeiro_token
+from mic.tts import SintetizadorTTS, TTSPorSentenca
+
+RESPOSTA = (
+    "O secador de cabelo é o maior consumidor da casa. Reduza o tempo de uso ou use a temperatura média. "
+    "A geladeira está com consumo estável. Verifique a vedação da porta a cada seis meses. "
+    "A televisão consome energia em standby; desligue-a da tomada à noite. "
+) * 3
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--primeiro-token", type=float, default=1.0)
+    parser.add_argument("--por-pedaco", type=float, default=0.05)
+    parser.add_argument("--tts-por-caractere", type=float, default=0.002)
+    args = parser.parse_args()
+
+    class MotorSimulado:
+        nome = "simulado"
+        formato = "audio/wav"
+
+        def sintetizar(self, texto, lang="pt"):
+            time.sleep(len(texto) * args.tts_por_caractere)
+            return texto.encode("utf-8")
+
+    motor = MotorSimulado()
+
+    modelo = ModeloStub(RESPOSTA, primeiro_token=args.primeiro_token, por_pedaco=args.por_pedaco)
+
+    inicio = time.perf_counter()
+    texto = modelo.generate_content("prompt").text
+    motor.sintetizar(texto)
+    bloqueante = time.perf_counter() - inicio
+
+    primeiro_audio = None
+    tts = TTSPorSentenca(SintetizadorTTS(motor))
+
+    def ao_receber(parte):
+        nonlocal primeiro_audio
+        tts.adicionar(parte)
+        if tts.prontos() and primeiro_audio is None:
+            primeiro_audio = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    primeiro_texto = medir_primeiro_token(modelo, "prompt", ao_receber)["primeiro_token"]
+    tts.finalizar()
+    tts.aguardar()
+    total = time.perf_counter() - inicio
+    primeiro_audio = primeiro_audio or total
+
+    print(f"bloqueante: primeira saída em {bloqueante:.2f} s (texto e áudio juntos)")
+    print(f"streaming : primeiro texto em {primeiro_texto:.2f} s, primeiro áudio em {primeiro_audio:.2f} s, "
+          f"tudo pronto em {total:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+"""Módulos compartilhados do MIC (dashboard Streamlit e agente Cypher)."""
@@ -0,0 +1,259 @@
+"""Estatísticas contínuas por dispositivo e alertas locais.
+
+Cada leitura nova atualiza o estado do dispositivo em O(1): médias móveis
+exponenciais (EWMA) com constante de tempo fixa, esboços P² de percentis
+(mínimo e máximo saem dos marcadores extremos) e as condições de standby,
+fator de potência baixo e sobretensão. Os alertas ativos ficam num dicionário
+mantido a cada amostra, então consultá-los não percorre a frota; o Gemini só
+redige os achados.
+"""
+import math
+import threading
+import time
+from dataclasses import dataclass
+
+from mic.contexto import DESVIO_TENSAO, PF_BAIXO, Contexto, estimar_tokens
+
+TENSOES_NOMINAIS = (127.0, 220.0)
+POTENCIA_MIN_PF = 50.0  # abaixo disso o fator de potência quase não pesa na conta
+# O firmware manda ts = millis()/1000 (uptime): um recuo maior que isso é um reinício da tomada
+RECUO_REINICIO_S = 60.0
+
+
+class P2Quantil:
+    """Estimador P² (Jain & Chlamtac, 1985): um percentil em memória constante"""
+    __slots__ = ("p", "q", "n", "np_", "dn")
+
+    def __init__(self, p: float):
+        self.p = p
+        self.q = []  # alturas dos 5 marcadores (ordenadas)
+        self.n = [0, 1, 2, 3, 4]  # posições reais
+        self.np_ = [0.0, 2 * p, 4 * p, 2 + 2 * p, 4.0]  # posições desejadas
+        self.dn = [0.0, p / 2, p, (1 + p) / 2, 1.0]
+
+    def add(self, x: float):
+        q, n = self.q, self.n
+        if len(q) < 5:
+            q.append(x)
+            q.sort()
+            return
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = 0
+            while x >= q[k + 1]:
+                k += 1
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            self.np_[i] += self.dn[i]
+        for i in (1, 2, 3):
+            d = self.np_[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+                qp = q[i] + d / (n[i + 1] - n[i - 1]) * (
+                    (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+                    + (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+                )
+                if not q[i - 1] < qp < q[i + 1]:
+                    qp = q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+                q[i] = qp
+                n[i] += d
+
+    @property
+    def valor(self) -> float:
+        if not self.q:
+            return math.nan
+        if len(self.q) < 5:
+            return self.q[min(len(self.q) - 1, int(self.p * len(self.q)))]
+        return self.q[2]
+
+    @property
+    def minimo(self) -> float:
+        return self.q[0] if self.q else math.nan
+
+    @property
+    def maximo(self) -> float:
+        return self.q[-1] if self.q else math.nan
+
+
+class EstatisticasDispositivo:
+    __slots__ = ("ts", "amostras", "ultima", "ewma_w", "ewma_pf", "p50_w", "p95_w", "p50_v", "standby_desde")
+
+    def __init__(self):
+        self.ts = None
+        self.amostras = 0
+        self.ultima = None  # (W, V, PF) da última amostra
+        self.ewma_w = 0.0
+        self.ewma_pf = 1.0
+        self.p50_w = P2Quantil(0.5)
+        self.p95_w = P2Quantil(0.95)
+        self.p50_v = P2Quantil(0.5)
+        self.standby_desde = None
+
+    def como_dict(self) -> dict:
+        return {
+            "amostras": self.amostras, "ts": self.ts, "ewma_w": self.ewma_w, "ewma_pf": self.ewma_pf,
+            "min_w": self.p50_w.minimo, "max_w": self.p50_w.maximo, "p50_w": self.p50_w.valor,
+            "p95_w": self.p95_w.valor, "p50_v": self.p50_v.valor, "standby_desde": self.standby_desde,
+        }
+
+
+@dataclass(frozen=True)
+class Alerta:
+    device_id: str
+    tipo: str  # "standby", "pf_baixo" ou "sobretensao"
+    mensagem: str
+    valor: float
+    desde: float
+
+
+def _num(valor, padrao: float) -> float:
+    try:
+        valor = float(valor)
+    except (TypeError, ValueError):
+        return padrao
+    return padrao if math.isnan(valor) else valor
+
+
+class AnaliseTelemetria:
+    def __init__(self, tau: float = 300.0, standby_min_w: float = 0.5, standby_max_w: float = 10.0,
+                 standby_min_s: float = 1800.0, pf_baixo: float = PF_BAIXO, potencia_min_pf: float = POTENCIA_MIN_PF,
+                 tensoes_nominais=TENSOES_NOMINAIS, desvio_tensao: float = DESVIO_TENSAO,
+                 recuo_reinicio_s: float = RECUO_REINICIO_S):
+        self.tau = tau  # constante de tempo das EWMA, em segundos
+        self.standby_min_w = standby_min_w
+        self.standby_max_w = standby_max_w
+        self.standby_min_s = standby_min_s
+        self.pf_baixo = pf_baixo
+        self.potencia_min_pf = potencia_min_pf
+        self.tensoes_nominais = tensoes_nominais
+        self.desvio_tensao = desvio_tensao
+        self.recuo_reinicio_s = recuo_reinicio_s
+
+        self.dispositivos = {}
+        self.amostras = 0
+        self.potencia_ewma_total = 0.0
+        self.pico_w = 0.0
+        self._alertas = {}  # (device_id, tipo) -> Alerta
+        self._lock = threading.Lock()
+
+    # ---------- entrada ----------
+    def observar(self, device_id: str, leitura: dict, agora: float = None) -> bool:
+        """Incorpora uma leitura; devolve False se ela já tinha sido vista"""
+        w = _num(leitura.get("Power"), 0.0)
+        v = _num(leitura.get("Voltage"), 0.0)
+        pf = _num(leitura.get("PF"), 1.0)
+        ts = _num(leitura.get("ts"), math.nan)
+        with self._lock:
+            est = self.dispositivos.get(device_id)
+            if est is None:
+                est = self.dispositivos[device_id] = EstatisticasDispositivo()
+            if math.isnan(ts):
+                # sem carimbo de tempo, só conta como nova se os valores mudaram
+                if est.ultima == (w, v, pf):
+                    return False
+                ts = time.time() if agora is None else agora
+            elif est.ts is not None and ts <= est.ts:
+                if est.ts - ts < self.recuo_reinicio_s:
+                    return False
+                # a tomada reiniciou e o uptime voltou a zero: a amostra vale, numa nova base de tempo
+                est.ts = None
+                est.standby_desde = None
+            self._atualizar(device_id, est, ts, w, v, pf)
+            return True
+
+    def observar_lote(self, tomadas: dict, agora: float = None) -> int:
+        """Passa cada tomada do snapshot; só as leituras novas custam alguma coisa"""
+        return sum(self.observar(dev, leitura, agora) for dev, leitura in tomadas.items() if isinstance(leitura, dict))
+
+    def _atualizar(self, device_id, est: EstatisticasDispositivo, ts: float, w: float, v: float, pf: float):
+        if est.amostras == 0:
+            ewma_w, est.ewma_pf = w, pf
+        else:
+            # EWMA com amostragem irregular: o peso depende do intervalo desde a última leitura
+            a = 1.0 - math.exp(-max(ts - est.ts if est.ts is not None else 0.0, 1.0) / self.tau)
+            ewma_w = est.ewma_w + a * (w - est.ewma_w)
+            est.ewma_pf += a * (pf - est.ewma_pf)
+        self.potencia_ewma_total += ewma_w - est.ewma_w
+        est.ewma_w = ewma_w
+        est.ts = ts
+        est.ultima = (w, v, pf)
+        est.amostras += 1
+        est.p50_w.add(w)
+        est.p95_w.add(w)
+        if v > 0:
+            est.p50_v.add(v)
+        self.amostras += 1
+        self.pico_w = max(self.pico_w, w)
+
+        # standby: consumo baixo, mas não nulo, por tempo prolongado
+        if self.standby_min_w <= w <= self.standby_max_w:
+            if est.standby_desde is None:
+                est.standby_desde = ts
+        else:
+            est.standby_desde = None
+        duracao = ts - est.standby_desde if est.standby_desde is not None else 0.0
+        self._marcar(device_id, "standby", duracao >= self.standby_min_s, est.ewma_w, est.standby_desde,
+                     lambda: f"Em standby há {duracao / 60:.0f} min, consumindo ~{est.ewma_w:.1f} W")
+
+        self._marcar(device_id, "pf_baixo", 0 < est.ewma_pf < self.pf_baixo and est.ewma_w >= self.potencia_min_pf,
+                     est.ewma_pf, ts,
+                     lambda: f"Fator de potência médio {est.ewma_pf:.2f} (abaixo de {self.pf_baixo}) com ~{est.ewma_w:.0f} W")
+
+        v_ref = est.p50_v.valor
+        nominal = min(self.tensoes_nominais, key=lambda n: abs(n - v_ref)) if v_ref == v_ref else 0.0
+        limite = nominal * (1 + self.desvio_tensao)
+        self._marcar(device_id, "sobretensao", nominal > 0 and v > limite, v, ts,
+                     lambda: f"Tensão de {v:.0f} V acima de {limite:.0f} V (rede de {nominal:.0f} V)")
+
+    def _marcar(self, device_id, tipo: str, ativo: bool, valor: float, desde: float, mensagem):
+        chave = (device_id, tipo)
+        if not ativo:
+            self._alertas.pop(chave, None)
+            return
+        anterior = self._alertas.get(chave)
+        self._alertas[chave] = Alerta(device_id, tipo, mensagem(), valor, anterior.desde if anterior else desde)
+
+    # ---------- consulta ----------
+    def alertas(self) -> list:
+        with self._lock:
+            return sorted(self._alertas.values(), key=lambda a: (a.tipo, a.device_id))
+
+    def estatisticas(self, device_id: str):
+        with self._lock:
+            est = self.dispositivos.get(device_id)
+            return est.como_dict() if est else None
+
+    def resumo(self) -> dict:
+        with self._lock:
+            standby = [a for a in self._alertas.values() if a.tipo == "standby"]
+            return {
+                "amostras": self.amostras,
+                "potencia_ewma_total": self.potencia_ewma_total,
+                "pico_w": self.pico_w,
+                "standby_w": sum(a.valor for a in standby),
+                "standby_dispositivos": len(standby),
+                "alertas": len(self._alertas),
+            }
+
+
+def contexto_alertas(alertas: list, nomes: dict = None, contar_tokens=estimar_tokens) -> Contexto:
+    """Achados locais no formato de contexto do prompt.
+
+    Os registros só levam dispositivo e tipo de alerta: a chave do cache de respostas
+    muda quando o conjunto de achados muda, não a cada leitura.
+    """
+    nomes = nomes or {}
+    linhas, registros = [], []
+    for a in alertas:
+        nome = str(nomes.get(a.device_id) or a.device_id)
+        linhas.append(f"- {nome}: {a.mensagem}")
+        registros.append({"Device_ID": a.device_id, "Dispositivo": nome, "tipo": a.tipo})
+    texto = "\n".join(linhas) if linhas else "Nenhum alerta."
+    dispositivos = len({a.device_id for a in alertas})
+    return Contexto(texto, contar_tokens(texto), dispositivos, dispositivos, registros)
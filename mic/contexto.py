@@ -0,0 +1,121 @@
+"""Contexto compacto dos dispositivos para os prompts do Gemini.
+
+Em vez de serializar todos os registros com precisão total, gera um resumo
+da frota (totais, maiores consumidores, valores atípicos) seguido de uma
+tabela com valores arredondados, ordenada por potência e cortada para caber
+no orçamento de tokens. O tamanho do prompt fica limitado mesmo com
+centenas de dispositivos.
+"""
+import math
+from dataclasses import dataclass, field
+
+CAMPOS = ["Device_ID", "Dispositivo", "Prioridade", "Modelo_Dispositivo", "Voltage", "Current", "Power", "Energy", "PF"]
+PF_BAIXO = 0.85
+DESVIO_TENSAO = 0.10  # fração da tensão mediana da frota
+
+
+def estimar_tokens(texto: str) -> int:
+    """Estimativa rápida (~4 caracteres por token), sem chamar a API"""
+    return math.ceil(len(texto) / 4)
+
+
+@dataclass
+class Contexto:
+    texto: str
+    tokens: int
+    dispositivos: int
+    incluidos: int
+    registros: list = field(default_factory=list, repr=False)
+
+    def __str__(self):
+        return self.texto
+
+
+def _num(valor, padrao=0.0) -> float:
+    try:
+        valor = float(valor)
+    except (TypeError, ValueError):
+        return padrao
+    return padrao if math.isnan(valor) else valor
+
+
+def _fmt(valor: float, casas: int) -> str:
+    texto = f"{valor:.{casas}f}"
+    return texto.rstrip("0").rstrip(".") if "." in texto else texto
+
+
+def _registros(dados) -> list:
+    if hasattr(dados, "to_dict"):
+        cols = [c for c in CAMPOS if c in dados.columns]
+        return dados[cols].to_dict(orient="records")
+    return [{c: d.get(c) for c in CAMPOS if c in d} for d in dados]
+
+
+def construir_contexto(dados, max_tokens: int = 1500, top_n: int = 5, contar_tokens=estimar_tokens) -> Contexto:
+    """Monta o contexto de um DataFrame ou lista de dicts dentro de ``max_tokens``"""
+    registros = _registros(dados)
+    if not registros:
+        return Contexto("Nenhum dispositivo.", contar_tokens("Nenhum dispositivo."), 0, 0, registros)
+
+    linhas_dev = []
+    for r in registros:
+        nome = str(r.get("Dispositivo") or r.get("Device_ID") or "?").replace("|", "/")
+        linhas_dev.append({
+            "nome": nome,
+            "prioridade": str(r.get("Prioridade") or "")[:3],
+            "modelo": str(r.get("Modelo_Dispositivo") or "").replace("|", "/"),
+            "V": _num(r.get("Voltage")), "A": _num(r.get("Current")), "W": _num(r.get("Power")),
+            "kWh": _num(r.get("Energy")), "PF": _num(r.get("PF"), 1.0),
+        })
+    linhas_dev.sort(key=lambda d: d["W"], reverse=True)
+
+    n = len(linhas_dev)
+    potencia = [d["W"] for d in linhas_dev]
+    tensoes = sorted(d["V"] for d in linhas_dev if d["V"] > 0)
+    media_w = sum(potencia) / n
+    desvio_w = math.sqrt(sum((p - media_w) ** 2 for p in potencia) / n)
+    v_nominal = tensoes[len(tensoes) // 2] if tensoes else 0.0
+
+    resumo = [
+        f"Resumo: {n} dispositivos | Potência total {_fmt(sum(potencia), 0)} W"
+        f" | Energia total {_fmt(sum(d['kWh'] for d in linhas_dev), 3)} kWh"
+        f" | Corrente total {_fmt(sum(d['A'] for d in linhas_dev), 2)} A"
+        f" | Tensão mediana {_fmt(v_nominal, 1)} V",
+        "Maiores consumidores (W): " + "; ".join(f"{d['nome']} {_fmt(d['W'], 0)}" for d in linhas_dev[:top_n]),
+    ]
+    pf_baixo = [d for d in linhas_dev if 0 < d["PF"] < PF_BAIXO]
+    if pf_baixo:
+        resumo.append(f"PF baixo (<{PF_BAIXO}): " + "; ".join(f"{d['nome']} {_fmt(d['PF'], 2)}" for d in pf_baixo[:top_n])
+                      + (f" (+{len(pf_baixo) - top_n})" if len(pf_baixo) > top_n else ""))
+    if v_nominal:
+        fora = [d for d in linhas_dev if d["V"] > 0 and abs(d["V"] - v_nominal) > DESVIO_TENSAO * v_nominal]
+        if fora:
+            resumo.append(f"Tensão fora de {_fmt(v_nominal, 0)} V ±{DESVIO_TENSAO:.0%}: "
+                          + "; ".join(f"{d['nome']} {_fmt(d['V'], 0)}" for d in fora[:top_n])
+                          + (f" (+{len(fora) - top_n})" if len(fora) > top_n else ""))
+    if n >= 3 and desvio_w > 0:
+        atipicos = [d for d in linhas_dev if (d["W"] - media_w) / desvio_w > 2]
+        if atipicos:
+            resumo.append("Potência atípica (>2σ): " + "; ".join(f"{d['nome']} {_fmt(d['W'], 0)}" for d in atipicos[:top_n]))
+
+    com_modelo = any(d["modelo"] for d in linhas_dev)
+    cabecalho = "Dispositivos (nome|prio|V|A|W|kWh|PF" + ("|modelo" if com_modelo else "") + "), por potência:"
+    texto = "\n".join(resumo + [cabecalho])
+    tokens = contar_tokens(texto)
+
+    tabela = []
+    for d in linhas_dev:
+        linha = "|".join([d["nome"], d["prioridade"], _fmt(d["V"], 0), _fmt(d["A"], 2), _fmt(d["W"], 0),
+                          _fmt(d["kWh"], 3), _fmt(d["PF"], 2)] + ([d["modelo"]] if com_modelo else []))
+        custo = contar_tokens(linha + "\n")
+        # reserva espaço para a linha de omitidos
+        if tokens + custo > max_tokens - 12:
+            break
+        tabela.append(linha)
+        tokens += custo
+    incluidos = len(tabela)
+    if incluidos < n:
+        tabela.append(f"(+{n - incluidos} dispositivos omitidos pelo limite de tokens)")
+
+    texto = texto + "\n" + "\n".join(tabela)
+    return Contexto(texto, contar_tokens(texto), n, incluidos, registros)
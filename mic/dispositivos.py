@@ -0,0 +1,88 @@
+"""Estado compacto dos dispositivos, compartilhado entre sessões.
+
+As leituras ficam numa única matriz float32 (dispositivos × medidas), os
+horários num array datetime64[s] e os textos (IDs, nomes, prioridades) como
+categóricos. Tudo é somente leitura: KPIs, gráficos e tabela usam visões dos
+mesmos buffers, sem cópias por sessão.
+"""
+import numpy as np
+import pandas as pd
+
+MEDIDAS = ("Voltage", "Current", "Power", "Energy", "Frequency", "PF")
+TEXTOS = ("Device_ID", "Dispositivo", "Prioridade", "Nome_Conectado", "Modelo_Dispositivo")
+
+
+class EstadoDispositivos:
+    __slots__ = ("textos", "medidas", "tempo", "_frame")
+
+    def __init__(self, textos: dict, medidas: np.ndarray, tempo: np.ndarray):
+        self.textos = textos  # {coluna: pd.Categorical}
+        self.medidas = medidas  # float32 (n, len(MEDIDAS))
+        self.tempo = tempo  # datetime64[s] (n,)
+        self.medidas.flags.writeable = False
+        self.tempo.flags.writeable = False
+        self._frame = None
+
+    @classmethod
+    def vazio(cls):
+        return cls({col: pd.Categorical([]) for col in TEXTOS}, np.zeros((0, len(MEDIDAS)), dtype="float32"),
+                   np.zeros(0, dtype="datetime64[s]"))
+
+    @classmethod
+    def de_dataframe(cls, df: pd.DataFrame):
+        """Copia o DataFrame montado (cadastro + telemetria) para a forma compacta"""
+        n = len(df)
+        medidas = np.zeros((n, len(MEDIDAS)), dtype="float32")
+        for i, col in enumerate(MEDIDAS):
+            if col in df.columns:
+                medidas[:, i] = pd.to_numeric(df[col], errors="coerce").to_numpy(dtype="float32", na_value=np.nan)
+        if "time" in df.columns:
+            tempo = np.array(pd.to_datetime(df["time"], errors="coerce").to_numpy("datetime64[s]"))
+        else:
+            tempo = np.full(n, np.datetime64("NaT"), dtype="datetime64[s]")
+        textos = {}
+        for col in df.columns:
+            if col in MEDIDAS or col == "time":
+                continue
+            valores = df[col]
+            textos[col] = valores.array if isinstance(valores.dtype, pd.CategoricalDtype) else pd.Categorical(valores)
+        return cls(textos, medidas, tempo)
+
+    def __len__(self):
+        return len(self.tempo)
+
+    def coluna(self, nome: str) -> np.ndarray:
+        """Visão somente leitura de uma medida"""
+        return self.medidas[:, MEDIDAS.index(nome)]
+
+    def kpis(self) -> dict:
+        if not len(self):
+            return {"tensao_media": 0.0, "corrente_total": 0.0, "potencia_total": 0.0, "energia_total": 0.0}
+        # acumula em float64 para não perder precisão somando milhares de leituras float32
+        return {
+            "tensao_media": float(np.nanmean(self.coluna("Voltage"), dtype="float64")),
+            "corrente_total": float(np.nansum(self.coluna("Current"), dtype="float64")),
+            "potencia_total": float(np.nansum(self.coluna("Power"), dtype="float64")),
+            "energia_total": float(np.nansum(self.coluna("Energy"), dtype="float64")),
+        }
+
+    @property
+    def frame(self) -> pd.DataFrame:
+        """DataFrame sobre os mesmos buffers, montado uma vez por estado.
+
+        Cada chamada devolve uma cópia rasa: colunas novas, ordenações e
+        ``inplace`` de uma sessão ficam nela, e escritas nos dados compartilhados
+        esbarram nos arrays somente leitura em vez de vazar para as outras.
+        """
+        if self._frame is None:
+            df = pd.DataFrame(self.medidas, columns=list(MEDIDAS), copy=False)
+            df.insert(0, "time", pd.Series(self.tempo, copy=False))
+            for pos, (col, valores) in enumerate(self.textos.items()):
+                df.insert(pos, col, pd.Series(valores, copy=False))
+            self._frame = df
+        return self._frame.copy(deep=False)
+
+    @property
+    def nbytes(self) -> int:
+        textos = sum(c.codes.nbytes + c.categories.memory_usage(deep=True) for c in self.textos.values())
+        return self.medidas.nbytes + self.tempo.nbytes + textos
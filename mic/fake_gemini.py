@@ -0,0 +1,147 @@
+"""Servidor local que imita o generateContent da API do Gemini.
+
+Atende ``POST /v1beta/models/<modelo>:generateContent`` e
+``:streamGenerateContent?alt=sse``. A resposta chega em pedaços, com atraso
+configurável até o primeiro e entre os demais. Guarda os payloads recebidos
+para inspeção. Serve para testar a skill da Alexa e os benchmarks sem rede
+(``GEMINI_BASE_URL=http://127.0.0.1:9100/v1beta``)::
+
+    python -m mic.fake_gemini --port 9100 --primeiro-token 0.8 --intervalo 0.1
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+RESPOSTA_PADRAO = ("Claro! Para economizar energia, desligue os aparelhos da tomada quando não estiver usando. "
+                   "Prefira lâmpadas de LED. Evite abrir a geladeira muitas vezes. ")
+
+
+class FakeGemini:
+    def __init__(self, resposta: str = RESPOSTA_PADRAO, primeiro_token: float = 0.3, intervalo: float = 0.05,
+                 tamanho_pedaco: int = 24, status: int = 200):
+        self.resposta = resposta
+        self.primeiro_token = primeiro_token
+        self.intervalo = intervalo
+        self.tamanho_pedaco = tamanho_pedaco
+        self.status = status
+        self.lock = threading.Lock()
+        self.request_count = 0
+        self.payloads = []
+        self._server = None
+        self._thread = None
+
+    def pedacos(self) -> list:
+        n = self.tamanho_pedaco
+        return [self.resposta[i:i + n] for i in range(0, len(self.resposta), n)] or [""]
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1beta"
+
+    def start(self, host: str = "127.0.0.1", port: int = 0):
+        self._server = ThreadingHTTPServer((host, port), _make_handler(self))
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-gemini", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start() if self._server is None else self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def _candidato(texto: str, fim: bool) -> dict:
+    candidato = {"content": {"role": "model", "parts": [{"text": texto}]}, "index": 0}
+    if fim:
+        candidato["finishReason"] = "STOP"
+    return {"candidates": [candidato]}
+
+
+def _make_handler(api: FakeGemini):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def log_message(self, *args):
+            pass
+
+        def _reply(self, value, status: int = 200):
+            body = json.dumps(value).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            payload = json.loads(self.rfile.read(length) or b"{}")
+            with api.lock:
+                api.request_count += 1
+                api.payloads.append(payload)
+            path = urlsplit(self.path).path
+            if api.status != 200:
+                self._reply({"error": {"code": api.status, "message": "erro simulado"}}, status=api.status)
+                return
+            pedacos = api.pedacos()
+            time.sleep(api.primeiro_token)
+            if path.endswith(":generateContent"):
+                time.sleep(api.intervalo * (len(pedacos) - 1))
+                try:
+                    self._reply(_candidato(api.resposta, True))
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # o cliente desistiu (timeout)
+            elif path.endswith(":streamGenerateContent"):
+                self._stream(pedacos)
+            else:
+                self._reply({"error": {"code": 404, "message": "método desconhecido"}}, status=404)
+
+        def _stream(self, pedacos: list):
+            # chunked, como a API real: cada evento chega ao cliente assim que é escrito
+            self.close_connection = True
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            try:
+                for i, pedaco in enumerate(pedacos):
+                    if i:
+                        time.sleep(api.intervalo)
+                    evento = _candidato(pedaco, i == len(pedacos) - 1)
+                    dados = f"data: {json.dumps(evento, ensure_ascii=False)}\r\n\r\n".encode("utf-8")
+                    self.wfile.write(b"%x\r\n%s\r\n" % (len(dados), dados))
+                    self.wfile.flush()
+                self.wfile.write(b"0\r\n\r\n")
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # o cliente cortou o stream
+
+    return Handler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="API do Gemini falsa para testes offline")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--primeiro-token", type=float, default=0.3, help="atraso até o primeiro pedaço (s)")
+    parser.add_argument("--intervalo", type=float, default=0.05, help="atraso entre pedaços (s)")
+    parser.add_argument("--resposta", default=RESPOSTA_PADRAO)
+    args = parser.parse_args()
+
+    api = FakeGemini(args.resposta, args.primeiro_token, args.intervalo).start(args.host, args.port)
+    print(f"Fake Gemini em {api.url} (Ctrl+C para sair)")
+    try:
+        api._thread.join()
+    except KeyboardInterrupt:
+        api.stop()
@@ -0,0 +1,355 @@
+"""Servidor local que imita a API REST do Firebase Realtime Database.
+
+Guarda a árvore JSON em memória e atende GET/PUT/POST/PATCH/DELETE em
+``/<caminho>.json``, incluindo ``shallow`` e consultas ``orderBy`` com
+``startAt``/``endAt``/``equalTo``/``limitToFirst``/``limitToLast``, além do
+streaming ``Accept: text/event-stream`` com eventos ``put``/``patch``. Serve para
+rodar o dashboard, o agente e os benchmarks sem rede::
+
+    python -m mic.fake_rtdb --port 9000 --seed dados.json
+"""
+import argparse
+import json
+import queue
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from mic.firebase import PushIdGenerator
+
+RESYNC = object()
+KEEPALIVE = b"event: keep-alive\ndata: null\n\n"
+
+
+def _event(event: str, path: str, data) -> bytes:
+    # serializa na hora da escrita: a árvore pode mudar antes do envio
+    return f"event: {event}\ndata: {json.dumps({'path': path, 'data': data})}\n\n".encode("utf-8")
+
+
+def _split(path: str) -> list:
+    return [p for p in path.strip("/").split("/") if p]
+
+
+def _prune(value):
+    # O RTDB não guarda nós vazios nem nulos
+    if isinstance(value, dict):
+        pruned = {k: _prune(v) for k, v in value.items()}
+        pruned = {k: v for k, v in pruned.items() if v is not None}
+        return pruned or None
+    return value
+
+
+def _order_key(value):
+    # Ordem do RTDB: null < false < true < números < strings < objetos
+    if value is None:
+        return (0, 0)
+    if isinstance(value, bool):
+        return (1, int(value))
+    if isinstance(value, (int, float)):
+        return (2, value)
+    if isinstance(value, str):
+        return (3, value)
+    return (4, 0)
+
+
+def _key_order(key: str):
+    # Chaves numéricas vêm antes das demais, em ordem numérica
+    try:
+        return (0, int(key), "")
+    except ValueError:
+        return (1, 0, key)
+
+
+class IndiceAusente(Exception):
+    pass
+
+
+class FakeRTDB:
+    def __init__(self, data: dict = None, latency: float = 0.0, indices: dict = None):
+        self.root = _prune(data) if data else None
+        self.latency = latency
+        # {caminho: [filhos]} como nos ".indexOn" das regras; None aceita qualquer orderBy
+        self.indices = indices
+        self.lock = threading.RLock()
+        self.push_id = PushIdGenerator()
+        self.request_count = 0
+        self.request_counts = {}
+        self.keepalive = 30.0
+        self._subscribers = []
+        self._server = None
+        self._thread = None
+
+    # ---------- árvore ----------
+    def get(self, path: str):
+        node = self.root
+        for part in _split(path):
+            if not isinstance(node, dict):
+                return None
+            node = node.get(part)
+        return node
+
+    def set(self, path: str, value, notify: bool = True):
+        parts = _split(path)
+        value = _prune(value)
+        with self.lock:
+            if notify:
+                self._notify("put", parts, value)
+            if not parts:
+                self.root = value
+                return
+            if not isinstance(self.root, dict):
+                self.root = {}
+            chain = [self.root]
+            for part in parts[:-1]:
+                node = chain[-1]
+                if not isinstance(node.get(part), dict):
+                    node[part] = {}
+                chain.append(node[part])
+            if value is None:
+                chain[-1].pop(parts[-1], None)
+                # remove os pais que ficaram vazios
+                for depth in range(len(chain) - 1, 0, -1):
+                    if chain[depth]:
+                        break
+                    chain[depth - 1].pop(parts[depth - 1], None)
+                if not self.root:
+                    self.root = None
+            else:
+                chain[-1][parts[-1]] = value
+
+    def update(self, path: str, values: dict):
+        # PATCH multi-caminho: chaves com "/" atualizam nós em profundidade
+        with self.lock:
+            parts = _split(path)
+            base = "/".join(parts)
+            for key, value in values.items():
+                self.set(f"{base}/{key}" if base else key, value, notify=False)
+            for sub_parts, q in list(self._subscribers):
+                if parts[:len(sub_parts)] == sub_parts:
+                    q.put(_event("patch", "/" + "/".join(parts[len(sub_parts):]), values))
+                elif sub_parts[:len(parts)] == parts:
+                    q.put(_event("put", "/", self.get("/".join(sub_parts))))
+
+    # ---------- streaming ----------
+    def subscribe(self, path: str) -> "queue.Queue":
+        q = queue.Queue()
+        with self.lock:
+            parts = _split(path)
+            q.put(_event("put", "/", self.get(path)))
+            self._subscribers.append((parts, q))
+        return q
+
+    def unsubscribe(self, q):
+        with self.lock:
+            self._subscribers = [(p, s) for p, s in self._subscribers if s is not q]
+
+    def _notify(self, event: str, parts: list, value):
+        for sub_parts, q in self._subscribers:
+            if parts[:len(sub_parts)] == sub_parts:
+                q.put(_event(event, "/" + "/".join(parts[len(sub_parts):]), value))
+            elif sub_parts[:len(parts)] == parts:
+                # escrita acima do nó assinado: reenvia o nó inteiro depois de aplicada
+                q.put(RESYNC)
+
+    def push(self, path: str, value) -> str:
+        key = self.push_id()
+        self.set(f"{path.rstrip('/')}/{key}", value)
+        return key
+
+    def query(self, path: str, params: dict):
+        with self.lock:
+            node = self.get(path)
+            if params.get("shallow") == "true":
+                if isinstance(node, dict):
+                    return {k: (True if isinstance(v, dict) else v) for k, v in node.items()}
+                return node
+            if "orderBy" not in params or not isinstance(node, dict):
+                return node
+            order_by = json.loads(params["orderBy"])
+            if self.indices is not None and order_by not in ("$key", "$value"):
+                caminho = "/" + "/".join(_split(path))
+                if order_by not in self.indices.get(caminho, ()):
+                    raise IndiceAusente(f'Index not defined, add ".indexOn": "{order_by}", '
+                                        f'for path "{caminho}", to the rules')
+            if order_by == "$key":
+                sort_key = lambda kv: _key_order(kv[0])
+                bound = lambda v: _key_order(str(v))
+            else:
+                if order_by == "$value":
+                    extract = lambda v: v
+                else:
+                    def extract(v):
+                        for part in _split(order_by):
+                            v = v.get(part) if isinstance(v, dict) else None
+                        return v
+                sort_key = lambda kv: (_order_key(extract(kv[1])), _key_order(kv[0]))
+                bound = lambda v: (_order_key(v),)
+            items = sorted(node.items(), key=sort_key)
+            if "equalTo" in params:
+                target = bound(json.loads(params["equalTo"]))
+                items = [kv for kv in items if sort_key(kv)[:len(target)] == target]
+            if "startAt" in params:
+                start = bound(json.loads(params["startAt"]))
+                items = [kv for kv in items if sort_key(kv)[:len(start)] >= start]
+            if "endAt" in params:
+                end = bound(json.loads(params["endAt"]))
+                items = [kv for kv in items if sort_key(kv)[:len(end)] <= end]
+            if "limitToFirst" in params:
+                items = items[:int(params["limitToFirst"])]
+            if "limitToLast" in params:
+                items = items[-int(params["limitToLast"]):]
+            return dict(items)
+
+    # ---------- servidor HTTP ----------
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self, host: str = "127.0.0.1", port: int = 0):
+        self._server = ThreadingHTTPServer((host, port), _make_handler(self))
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-rtdb", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        with self.lock:
+            for _, q in self._subscribers:
+                q.put(None)
+            self._subscribers = []
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start() if self._server is None else self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def _make_handler(db: FakeRTDB):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def log_message(self, *args):
+            pass
+
+        def _path_params(self):
+            parts = urlsplit(self.path)
+            path = unquote(parts.path)
+            if path.endswith(".json"):
+                path = path[:-5]
+            params = {k: v[-1] for k, v in parse_qs(parts.query).items()}
+            return path, params
+
+        def _body(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            raw = self.rfile.read(length) if length else b""
+            return json.loads(raw) if raw else None
+
+        def _reply(self, value, status: int = 200):
+            body = json.dumps(value).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _count(self):
+            with db.lock:
+                db.request_count += 1
+                db.request_counts[self.command] = db.request_counts.get(self.command, 0) + 1
+            if db.latency:
+                time.sleep(db.latency)
+
+        def do_GET(self):
+            self._count()
+            path, params = self._path_params()
+            if "text/event-stream" in (self.headers.get("Accept") or ""):
+                self._stream(path)
+            else:
+                try:
+                    self._reply(db.query(path, params))
+                except IndiceAusente as e:
+                    self._reply({"error": str(e)}, status=400)
+
+        def _stream(self, path: str):
+            self.close_connection = True
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            q = db.subscribe(path)
+            try:
+                while True:
+                    try:
+                        item = q.get(timeout=db.keepalive)
+                    except queue.Empty:
+                        item = KEEPALIVE
+                    if item is None:
+                        break
+                    if item is RESYNC:
+                        with db.lock:
+                            item = _event("put", "/", db.get(path))
+                    self.wfile.write(item)
+                    self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+            finally:
+                db.unsubscribe(q)
+
+        def do_PUT(self):
+            self._count()
+            path, _ = self._path_params()
+            value = self._body()
+            db.set(path, value)
+            self._reply(value)
+
+        def do_POST(self):
+            self._count()
+            path, _ = self._path_params()
+            self._reply({"name": db.push(path, self._body())})
+
+        def do_PATCH(self):
+            self._count()
+            path, _ = self._path_params()
+            values = self._body()
+            if not isinstance(values, dict):
+                self._reply({"error": "Invalid data; couldn't parse JSON object."}, status=400)
+                return
+            db.update(path, values)
+            self._reply(values)
+
+        def do_DELETE(self):
+            self._count()
+            path, _ = self._path_params()
+            db.set(path, None)
+            self._reply(None)
+
+    return Handler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Firebase RTDB falso para testes offline")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--seed", help="arquivo JSON com a árvore inicial")
+    parser.add_argument("--latency", type=float, default=0.0, help="atraso artificial por requisição (s)")
+    args = parser.parse_args()
+
+    seed = None
+    if args.seed:
+        with open(args.seed, "r", encoding="utf-8") as f:
+            seed = json.load(f)
+    db = FakeRTDB(seed, latency=args.latency).start(args.host, args.port)
+    print(f"Fake RTDB em {db.url} (Ctrl+C para sair)")
+    try:
+        db._thread.join()
+    except KeyboardInterrupt:
+        db.stop()
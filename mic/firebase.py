@@ -0,0 +1,180 @@
+"""Cliente REST do Firebase Realtime Database com pool de conexões.
+
+Uma única ``requests.Session`` é reaproveitada entre chamadas, evitando um
+handshake TCP+TLS por requisição, e ``get_many`` dispara leituras em paralelo
+num pool de threads do mesmo tamanho do pool de conexões.
+"""
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+from mic.metricas import contar, medir
+
+# Respostas em que vale tentar de novo (limite de taxa / indisponibilidade)
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+PUSH_CHARS = "-0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ_abcdefghijklmnopqrstuvwxyz"
+
+
+def falhou_antes_do_envio(e: Exception) -> bool:
+    """True quando a falha foi ao abrir a conexão (DNS, recusa, timeout de conexão), antes de a requisição sair"""
+    if isinstance(e, requests.ConnectTimeout):
+        return True
+    if isinstance(e, requests.Timeout):
+        return False
+    razao = getattr(e.args[0], "reason", None) if e.args else None
+    return isinstance(razao, NewConnectionError)
+
+
+class PushIdGenerator:
+    """Gera chaves cronológicas no mesmo formato do ``push()`` do Firebase"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._last_ms = 0
+        self._last_rand = [0] * 12
+
+    def __call__(self, ms: float = None) -> str:
+        """Nova chave para o instante atual, ou para ``ms`` (epoch em milissegundos)"""
+        with self._lock:
+            now = int(time.time() * 1000) if ms is None else int(ms)
+            if now == self._last_ms:
+                # mesmo milissegundo: incrementa a parte aleatória para manter a ordem
+                i = 11
+                while i >= 0 and self._last_rand[i] == 63:
+                    self._last_rand[i] = 0
+                    i -= 1
+                if i >= 0:
+                    self._last_rand[i] += 1
+            else:
+                self._last_ms = now
+                self._last_rand = [random.randrange(64) for _ in range(12)]
+            ts_chars = []
+            for _ in range(8):
+                ts_chars.append(PUSH_CHARS[now % 64])
+                now //= 64
+            return "".join(reversed(ts_chars)) + "".join(PUSH_CHARS[r] for r in self._last_rand)
+
+
+class FirebaseClient:
+    def __init__(self, db_url: str, auth: str = "", pool_size: int = 10, timeout: float = 10,
+                 retries: int = 3, backoff: float = 0.25, max_backoff: float = 4.0):
+        self.db_url = db_url.rstrip("/")
+        self.auth = auth
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        self.session.close()
+
+    def url(self, path: str) -> str:
+        return f"{self.db_url}/{path.lstrip('/')}.json"
+
+    def params(self, params: dict = None) -> dict:
+        params = dict(params or {})
+        if self.auth:
+            params["auth"] = self.auth
+        return params
+
+    def _sleep_backoff(self, attempt: int):
+        # "Full jitter": espera aleatória entre 0 e o teto exponencial
+        time.sleep(random.uniform(0, min(self.max_backoff, self.backoff * (2 ** attempt))))
+
+    def request(self, method: str, path: str, data=None, params: dict = None):
+        """Executa uma requisição com retry e devolve o JSON da resposta (ou None)"""
+        with medir("firebase", metodo=method.upper()):
+            return self._request(method, path, data, params)
+
+    def _request(self, method: str, path: str, data, params: dict):
+        headers = {}
+        payload = None
+        if data is not None:
+            headers["Content-Type"] = "application/json"
+            payload = json.dumps(data, default=str)
+        # POST cria um novo push id a cada envio: só repete quando a requisição não chegou ao servidor
+        idempotent = method.upper() != "POST"
+
+        for attempt in range(self.retries + 1):
+            last = attempt >= self.retries
+            try:
+                r = self.session.request(method, self.url(path), params=self.params(params), data=payload,
+                                         headers=headers, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                # Timeout de leitura, conexão resetada ou RemoteDisconnected: o servidor já pode ter aplicado a escrita
+                if last or (not idempotent and not falhou_antes_do_envio(e)):
+                    raise
+                contar("firebase_retentativas", metodo=method.upper(), status=type(e).__name__)
+            else:
+                if r.status_code in RETRY_STATUS and not last and (idempotent or r.status_code in (429, 503)):
+                    contar("firebase_retentativas", metodo=method.upper(), status=r.status_code)
+                    self._sleep_backoff(attempt)
+                    continue
+                r.raise_for_status()
+                try:
+                    return r.json()
+                except ValueError:
+                    return None
+            self._sleep_backoff(attempt)
+
+    def get(self, path: str, params: dict = None):
+        return self.request("GET", path, params=params)
+
+    def put(self, path: str, data):
+        if data is None:
+            return self.delete(path)
+        return self.request("PUT", path, data=data)
+
+    def post(self, path: str, data):
+        return self.request("POST", path, data=data)
+
+    def patch(self, path: str, data: dict):
+        return self.request("PATCH", path, data=data)
+
+    def delete(self, path: str):
+        return self.request("DELETE", path)
+
+    def get_many(self, paths, return_exceptions: bool = False) -> list:
+        """Lê vários caminhos em paralelo, na mesma ordem de ``paths``.
+
+        Cada item pode ser um caminho ou uma tupla ``(caminho, params)``. Com
+        ``return_exceptions=True`` as falhas voltam na lista em vez de propagar.
+        """
+        items = [(p, None) if isinstance(p, str) else (p[0], p[1]) for p in paths]
+        if not items:
+            return []
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.pool_size, thread_name_prefix="firebase")
+
+        def _get(item):
+            try:
+                return self.get(*item)
+            except Exception as e:
+                if return_exceptions:
+                    return e
+                raise
+
+        return list(self._executor.map(_get, items))
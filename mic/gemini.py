@@ -0,0 +1,67 @@
+"""Utilitários para chamadas ao Gemini em streaming.
+
+``gerar_em_stream`` devolve o texto em pedaços à medida que o modelo
+responde (``generate_content(stream=True)``). ``ModeloStub`` imita a mesma
+interface com latências configuráveis, para medir o tempo até o primeiro
+token sem rede nem chave de API.
+"""
+import time
+
+
+def gerar_em_stream(llm, prompt: str):
+    """Gera os pedaços de texto da resposta conforme chegam"""
+    for chunk in llm.generate_content(prompt, stream=True):
+        try:
+            texto = chunk.text
+        except ValueError:
+            # pedaço sem texto (ex.: apenas metadados de segurança)
+            continue
+        if texto:
+            yield texto
+
+
+class _Resposta:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class ModeloStub:
+    def __init__(self, resposta: str = "Resposta de teste. " * 20, primeiro_token: float = 0.8,
+                 por_pedaco: float = 0.05, palavras_por_pedaco: int = 4):
+        self.resposta = resposta
+        self.primeiro_token = primeiro_token
+        self.por_pedaco = por_pedaco
+        self.palavras_por_pedaco = palavras_por_pedaco
+
+    def _pedacos(self):
+        palavras = self.resposta.split(" ")
+        for i in range(0, len(palavras), self.palavras_por_pedaco):
+            yield " ".join(palavras[i:i + self.palavras_por_pedaco]) + " "
+
+    def _stream(self):
+        time.sleep(self.primeiro_token)
+        for i, pedaco in enumerate(self._pedacos()):
+            if i:
+                time.sleep(self.por_pedaco)
+            yield _Resposta(pedaco)
+
+    def generate_content(self, prompt, stream: bool = False):
+        if stream:
+            return self._stream()
+        return _Resposta("".join(p.text for p in self._stream()))
+
+
+def medir_primeiro_token(llm, prompt: str, ao_receber=None) -> dict:
+    """Tempo até o primeiro pedaço e até a resposta completa, em segundos.
+
+    ``ao_receber(pedaco)`` é chamado a cada pedaço, dentro da medição (ex.: para
+    alimentar o TTS por sentença como o painel faz).
+    """
+    inicio = time.perf_counter()
+    primeiro = None
+    for pedaco in gerar_em_stream(llm, prompt):
+        if primeiro is None:
+            primeiro = time.perf_counter() - inicio
+        if ao_receber is not None:
+            ao_receber(pedaco)
+    return {"primeiro_token": primeiro, "total": time.perf_counter() - inicio}
@@ -0,0 +1,177 @@
+"""Cache local do histórico de consumo, em colunas, com agregações prontas.
+
+Cada dispositivo tem um arquivo binário só de acréscimo com registros
+``(ts, Power, Energy)`` e, ao lado, agregações de 1 min, 1 h e 1 dia mantidas
+de forma incremental. A sincronização com o Firebase busca apenas as chaves
+posteriores à última já gravada (``orderBy="$key"&startAt=``) e a leitura
+para o gráfico escolhe a resolução que cabe no número de pontos pedido.
+"""
+import json
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from mic.normalizacao import ESQUEMA_HISTORICO, SEM_TS, normalizar
+
+RECORD_DTYPE = np.dtype([("ts", "<i8"), ("Power", "<f4"), ("Energy", "<f4")])
+ROLLUP_DTYPE = np.dtype([("ts", "<i8"), ("Power", "<f4"), ("Energy", "<f4"), ("count", "<i4")])
+# resolução -> largura do balde em segundos
+RESOLUCOES = {"1min": 60, "1h": 3600, "1d": 86400}
+
+
+def _safe_name(device_id: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", str(device_id))
+
+
+def registros_para_array(registros: dict) -> np.ndarray:
+    """Converte {push_id: registro} do Firebase em registros ordenados pela chave.
+
+    Registros sem ``ts`` numérico nem ``time`` legível são descartados: no
+    instante 0 eles apareceriam no gráfico e nas agregações em 1970-01-01.
+    """
+    colunas = normalizar(registros, ESQUEMA_HISTORICO, ordenar=True)
+    validos = colunas["ts"] != SEM_TS
+    out = np.zeros(int(validos.sum()), dtype=RECORD_DTYPE)
+    for col in RECORD_DTYPE.names:
+        out[col] = colunas[col][validos]
+    return out
+
+
+def agregar(records: np.ndarray, width: int) -> np.ndarray:
+    """Agrega registros ordenados em baldes de ``width`` segundos.
+
+    Power vira a média do balde; Energy (contador acumulado) o maior valor.
+    """
+    if len(records) == 0:
+        return np.zeros(0, dtype=ROLLUP_DTYPE)
+    buckets = (records["ts"] // width) * width
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    power = records["Power"].astype("float64")
+    valid = ~np.isnan(power)
+    n_valid = np.add.reduceat(valid.astype("int64"), starts)
+    power_sum = np.add.reduceat(np.where(valid, power, 0.0), starts)
+
+    out = np.zeros(len(starts), dtype=ROLLUP_DTYPE)
+    out["ts"] = buckets[starts]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        out["Power"] = np.where(n_valid > 0, power_sum / np.maximum(n_valid, 1), np.nan)
+    out["Energy"] = np.fmax.reduceat(records["Energy"], starts)
+    out["count"] = np.diff(np.r_[starts, len(records)])
+    return out
+
+
+class HistoricoStore:
+    def __init__(self, directory: str = "historico_cache"):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, device_id: str, kind: str) -> str:
+        return os.path.join(self.directory, f"{_safe_name(device_id)}.{kind}")
+
+    def last_key(self, device_id: str):
+        try:
+            with open(self._path(device_id, "key"), "r", encoding="utf-8") as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def _read(self, device_id: str, kind: str, dtype) -> np.ndarray:
+        path = self._path(device_id, kind)
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            return np.zeros(0, dtype=dtype)
+        return np.memmap(path, dtype=dtype, mode="r")
+
+    def records(self, device_id: str) -> np.ndarray:
+        return self._read(device_id, "bin", RECORD_DTYPE)
+
+    def rollup(self, device_id: str, resolucao: str) -> np.ndarray:
+        return self._read(device_id, resolucao, ROLLUP_DTYPE)
+
+    def append(self, device_id: str, registros: dict) -> int:
+        """Acrescenta novos registros {push_id: registro} e atualiza as agregações"""
+        new = registros_para_array(registros)
+        if len(new) == 0:
+            if any(isinstance(v, dict) for v in registros.values()):
+                # só registros descartados: avança a chave para não buscá-los de novo
+                self._gravar_chave(device_id, registros)
+            return 0
+        previous = self.records(device_id)
+        last_ts = int(previous["ts"][-1]) if len(previous) else None
+        del previous  # libera o memmap antes de escrever no arquivo
+        new = np.sort(new, order="ts", kind="stable") if last_ts is None else new
+        with open(self._path(device_id, "bin"), "ab") as f:
+            new.tofile(f)
+
+        first_ts = int(new["ts"].min())
+        if last_ts is not None and (first_ts < last_ts or np.any(np.diff(new["ts"]) < 0)):
+            # registro fora de ordem: reordena o arquivo e reagrega tudo
+            raw = np.sort(np.array(self.records(device_id)), order="ts", kind="stable")
+            raw.tofile(self._path(device_id, "bin"))
+            first_ts = int(raw["ts"][0])
+        raw = self.records(device_id)
+        for resolucao, width in RESOLUCOES.items():
+            # só os baldes a partir do primeiro registro novo mudam
+            first_bucket = (first_ts // width) * width
+            tail = raw[np.searchsorted(raw["ts"], first_bucket):]
+            self._rewrite_tail(device_id, resolucao, first_bucket, agregar(np.asarray(tail), width))
+
+        self._gravar_chave(device_id, registros)
+        return len(new)
+
+    def _gravar_chave(self, device_id: str, registros: dict):
+        with open(self._path(device_id, "key"), "w", encoding="utf-8") as f:
+            f.write(max(k for k, v in registros.items() if isinstance(v, dict)))
+
+    def _rewrite_tail(self, device_id: str, resolucao: str, first_bucket: int, agg: np.ndarray):
+        path = self._path(device_id, resolucao)
+        current = self.rollup(device_id, resolucao)
+        keep = int(np.searchsorted(current["ts"], first_bucket)) if len(current) else 0
+        del current
+        with open(path, "ab") as f:
+            f.truncate(keep * ROLLUP_DTYPE.itemsize)
+            agg.tofile(f)
+
+    def sync(self, get_many, device_ids) -> dict:
+        """Busca no Firebase só o histórico novo de cada dispositivo; devolve {device_id: erro}"""
+        device_ids = list(device_ids)
+        requests = []
+        last_keys = []
+        for dev in device_ids:
+            last = self.last_key(dev)
+            params = {"orderBy": '"$key"'}
+            if last:
+                params["startAt"] = json.dumps(last)
+            requests.append((f"/historico/{dev}", params))
+            last_keys.append(last)
+
+        errors = {}
+        for dev, last, result in zip(device_ids, last_keys, get_many(requests, return_exceptions=True)):
+            if isinstance(result, Exception):
+                errors[dev] = result
+            elif isinstance(result, dict):
+                result.pop(last, None)  # startAt é inclusivo
+                self.append(dev, result)
+        return errors
+
+    def serie(self, device_id: str, max_points: int = 500, start: int = None, end: int = None) -> pd.DataFrame:
+        """Série para gráfico na resolução mais fina que caiba em ``max_points``"""
+        candidatos = [("raw", self.records(device_id))] + [(r, self.rollup(device_id, r)) for r in RESOLUCOES]
+        chosen = None
+        for resolucao, data in candidatos:
+            lo = np.searchsorted(data["ts"], start) if start is not None else 0
+            hi = np.searchsorted(data["ts"], end, side="right") if end is not None else len(data)
+            chosen = (resolucao, data[lo:hi])
+            if hi - lo <= max_points:
+                break
+        resolucao, data = chosen
+        if len(data) > max_points:
+            data = data[::int(np.ceil(len(data) / max_points))]
+        df = pd.DataFrame({
+            "time": pd.to_datetime(np.asarray(data["ts"]), unit="s"),
+            "Power": np.asarray(data["Power"]),
+            "Energy": np.asarray(data["Energy"]),
+        })
+        df.attrs["resolucao"] = resolucao
+        return df
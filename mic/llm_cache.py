@@ -0,0 +1,122 @@
+"""Cache de respostas do Gemini indexado por um retrato quantizado dos dispositivos.
+
+Leituras que mudaram menos que a tolerância de cada grandeza caem na mesma
+chave, então cliques repetidos em "Gerar alertas" ou a mesma pergunta não
+pagam outra chamada ao modelo. As entradas expiram por TTL, são descartadas
+por LRU e ficam salvas em disco entre reinícios.
+"""
+import hashlib
+import json
+import math
+import numbers
+import os
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_TOLERANCES = {
+    "Voltage": 2.0,
+    "Current": 0.1,
+    "Power": 10.0,
+    "Energy": 0.01,
+    "Frequency": 0.5,
+    "PF": 0.05,
+}
+# Campos que mudam a cada leitura e não alteram a resposta esperada
+VOLATILE_FIELDS = {"time", "ts"}
+
+
+def quantizar(registros, tolerancias: dict = None) -> list:
+    """Arredonda cada grandeza para o múltiplo da sua tolerância (índice inteiro do balde)"""
+    tolerancias = DEFAULT_TOLERANCES if tolerancias is None else tolerancias
+    out = []
+    for reg in registros:
+        q = {}
+        for campo, valor in reg.items():
+            if campo in VOLATILE_FIELDS:
+                continue
+            tol = tolerancias.get(campo)
+            if tol and isinstance(valor, numbers.Real) and not isinstance(valor, bool):
+                q[campo] = None if math.isnan(valor) else int(round(valor / tol))
+            else:
+                q[campo] = None if valor is None or valor != valor else str(valor)
+        out.append(q)
+    return sorted(out, key=lambda q: json.dumps(q, sort_keys=True))
+
+
+def chave(template: str, registros, extra: str = "", tolerancias: dict = None) -> str:
+    """Hash canônico do template + leituras quantizadas (+ pergunta, modelo etc.)"""
+    payload = json.dumps({"t": template, "d": quantizar(registros, tolerancias), "x": extra},
+                         sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class RespostaCache:
+    def __init__(self, path: str = None, ttl: float = 600, max_entries: int = 256):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # chave -> (criado_em, texto), do menos ao mais recente
+        self._lock = threading.Lock()
+        self._load()
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.time() - entry[0] <= self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: str, texto: str):
+        with self._lock:
+            self._entries[key] = (time.time(), texto)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._save()
+
+    def get_or_generate(self, key: str, gerar) -> str:
+        texto = self.get(key)
+        if texto is None:
+            texto = gerar()
+            self.put(key, texto)
+        return texto
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": len(self._entries),
+        }
+
+    # ---------- persistência ----------
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return
+        now = time.time()
+        for key, (created, texto) in saved.items():
+            if now - created <= self.ttl:
+                self._entries[key] = (created, texto)
+
+    def _save(self):
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self._entries, f, ensure_ascii=False)
+        os.replace(tmp, self.path)
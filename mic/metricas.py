@@ -0,0 +1,211 @@
+"""Métricas do processo: tempos, contadores e histogramas dos caminhos quentes.
+
+Firebase, Gemini, TTS, reconhecimento de fala, importação do cadastro e as
+seções do painel registram aqui quanto tempo levaram, para saber onde foi o
+tempo de uma atualização lenta. Tudo fica desligado por padrão: ``medir``
+devolve um contexto vazio compartilhado e ``contar``/``observar`` retornam
+logo na primeira linha. ``METRICAS=1`` liga a coleta e ``METRICAS_PORTA``
+expõe ``/metrics`` no formato texto do Prometheus::
+
+    with medir("firebase", metodo="GET"):
+        ...
+    contar("gemini_cache", resultado="acerto")
+
+Cada ``medir(nome)`` alimenta o histograma ``<nome>_segundos`` e, se o bloco
+levantar exceção, o contador ``<nome>_erros``.
+"""
+import bisect
+import os
+import threading
+import time
+from contextlib import nullcontext
+
+# Limites (s) dos histogramas: de leituras locais a respostas longas do Gemini
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+PREFIXO = "mic_"
+
+_NADA = nullcontext()
+
+
+class Histograma:
+    __slots__ = ("buckets", "contagens", "soma", "total", "maximo")
+
+    def __init__(self, buckets: tuple = BUCKETS):
+        self.buckets = buckets
+        self.contagens = [0] * (len(buckets) + 1)  # a última posição é o +Inf
+        self.soma = 0.0
+        self.total = 0
+        self.maximo = 0.0
+
+    def observar(self, valor: float):
+        self.contagens[bisect.bisect_left(self.buckets, valor)] += 1
+        self.soma += valor
+        self.total += 1
+        if valor > self.maximo:
+            self.maximo = valor
+
+    def quantil(self, q: float) -> float:
+        """Limite superior do bucket que contém o quantil ``q`` (o máximo, no último)"""
+        alvo = q * self.total
+        acumulado = 0
+        for i, n in enumerate(self.contagens):
+            acumulado += n
+            if acumulado >= alvo and n:
+                return min(self.buckets[i], self.maximo) if i < len(self.buckets) else self.maximo
+        return self.maximo
+
+
+class _Intervalo:
+    __slots__ = ("metricas", "nome", "rotulos", "inicio")
+
+    def __init__(self, metricas, nome: str, rotulos: dict):
+        self.metricas = metricas
+        self.nome = nome
+        self.rotulos = rotulos
+
+    def __enter__(self):
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, tipo, *_):
+        self.metricas.observar(f"{self.nome}_segundos", time.perf_counter() - self.inicio, **self.rotulos)
+        if tipo is not None:
+            self.metricas.contar(f"{self.nome}_erros", **self.rotulos)
+        return False
+
+
+def _chave(nome: str, rotulos: dict) -> tuple:
+    return nome, tuple(sorted((k, str(v)) for k, v in rotulos.items()))
+
+
+def _rotulos_prometheus(rotulos: tuple, extra: tuple = ()) -> str:
+    pares = [f'{k}="{v}"' for k, v in
+             ((k, v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")) for k, v in rotulos + extra)]
+    return "{" + ",".join(pares) + "}" if pares else ""
+
+
+class Metricas:
+    def __init__(self, habilitado: bool = False, buckets: tuple = BUCKETS, prefixo: str = PREFIXO):
+        self.habilitado = habilitado
+        self.buckets = tuple(buckets)
+        self.prefixo = prefixo
+        self._contadores = {}  # (nome, rótulos) -> valor
+        self._histogramas = {}  # (nome, rótulos) -> Histograma
+        self._lock = threading.Lock()
+        self._servidor = None
+
+    def medir(self, nome: str, **rotulos):
+        """Contexto que mede o bloco em ``<nome>_segundos``; vazio quando desligado"""
+        if not self.habilitado:
+            return _NADA
+        return _Intervalo(self, nome, rotulos)
+
+    def contar(self, nome: str, valor: float = 1, **rotulos):
+        if not self.habilitado:
+            return
+        chave = _chave(nome, rotulos)
+        with self._lock:
+            self._contadores[chave] = self._contadores.get(chave, 0) + valor
+
+    def observar(self, nome: str, valor: float, **rotulos):
+        if not self.habilitado:
+            return
+        chave = _chave(nome, rotulos)
+        with self._lock:
+            histograma = self._histogramas.get(chave)
+            if histograma is None:
+                histograma = self._histogramas[chave] = Histograma(self.buckets)
+            histograma.observar(valor)
+
+    def limpar(self):
+        with self._lock:
+            self._contadores.clear()
+            self._histogramas.clear()
+
+    # ---------- leitura ----------
+    def resumo(self) -> list:
+        """Uma linha por série, para o painel de depuração (tempos em ms)"""
+        with self._lock:
+            contadores = list(self._contadores.items())
+            histogramas = [(chave, h.total, h.soma, h.quantil(0.5), h.quantil(0.95), h.maximo)
+                           for chave, h in self._histogramas.items()]
+        linhas = []
+        for (nome, rotulos), total, soma, p50, p95, maximo in sorted(histogramas):
+            linhas.append({"metrica": nome, "rotulos": ", ".join(f"{k}={v}" for k, v in rotulos), "n": total,
+                           "total_ms": soma * 1000, "media_ms": soma * 1000 / total if total else 0.0,
+                           "p50_ms": p50 * 1000, "p95_ms": p95 * 1000, "max_ms": maximo * 1000})
+        for (nome, rotulos), valor in sorted(contadores):
+            linhas.append({"metrica": nome, "rotulos": ", ".join(f"{k}={v}" for k, v in rotulos), "n": valor})
+        return linhas
+
+    def prometheus(self) -> str:
+        """Todas as séries no formato texto de exposição do Prometheus"""
+        with self._lock:
+            contadores = sorted(self._contadores.items())
+            histogramas = sorted((chave, list(h.contagens), h.soma, h.total) for chave, h in self._histogramas.items())
+        linhas = []
+        tipos = set()
+        for (nome, rotulos), valor in contadores:
+            metrica = f"{self.prefixo}{nome}_total"
+            if metrica not in tipos:
+                tipos.add(metrica)
+                linhas.append(f"# TYPE {metrica} counter")
+            linhas.append(f"{metrica}{_rotulos_prometheus(rotulos)} {valor}")
+        for (nome, rotulos), contagens, soma, total in histogramas:
+            metrica = f"{self.prefixo}{nome}"
+            if metrica not in tipos:
+                tipos.add(metrica)
+                linhas.append(f"# TYPE {metrica} histogram")
+            acumulado = 0
+            for limite, n in zip(self.buckets + (float("inf"),), contagens):
+                acumulado += n
+                le = "+Inf" if limite == float("inf") else repr(limite)
+                linhas.append(f"{metrica}_bucket{_rotulos_prometheus(rotulos, (('le', le),))} {acumulado}")
+            linhas.append(f"{metrica}_sum{_rotulos_prometheus(rotulos)} {soma}")
+            linhas.append(f"{metrica}_count{_rotulos_prometheus(rotulos)} {total}")
+        return "\n".join(linhas) + "\n"
+
+    # ---------- exposição ----------
+    def servir(self, porta: int, host: str = "0.0.0.0"):
+        """Sobe ``/metrics`` numa thread daemon (uma vez por processo) e devolve o servidor"""
+        if self._servidor is not None:
+            return self._servidor
+        # http.server só é importado quando a exposição está ligada
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        metricas = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                corpo = metricas.prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(corpo)))
+                self.end_headers()
+                self.wfile.write(corpo)
+
+            def log_message(self, *args):
+                pass
+
+        servidor = ThreadingHTTPServer((host, porta), Handler)
+        servidor.daemon_threads = True
+        threading.Thread(target=servidor.serve_forever, name="metricas", daemon=True).start()
+        self._servidor = servidor
+        return servidor
+
+
+# Registro do processo, configurado pelo ambiente
+registro = Metricas(habilitado=os.getenv("METRICAS", "0") == "1")
+medir = registro.medir
+contar = registro.contar
+observar = registro.observar
+
+
+def servir_do_ambiente():
+    """Expõe ``/metrics`` em ``METRICAS_PORTA`` se a coleta estiver ligada; senão não faz nada"""
+    porta = os.getenv("METRICAS_PORTA")
+    if registro.habilitado and porta:
+        return registro.servir(int(porta))
+    return None
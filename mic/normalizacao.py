@@ -0,0 +1,142 @@
+"""Normalização vetorizada de payloads do Firebase ({id: registro}).
+
+Um esquema diz o tipo e o valor padrão de cada campo; cada coluna é montada
+numa única passada pelos registros e convertida de uma vez, sem `float()` ou
+`datetime.fromtimestamp` por linha:
+
+- medidas em float32, com o padrão aplicado onde o campo falta ou não é numérico;
+- `ts` em segundos epoch int64 (com campo alternativo em ISO 8601, se houver);
+- textos repetidos (IDs, nomes, prioridades) como categóricos.
+"""
+import time
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+
+@dataclass(frozen=True)
+class Campo:
+    tipo: str  # "float32", "epoch" ou "category"
+    padrao: object = None  # epoch: None usa o instante da normalização
+    alternativo: str = None  # epoch: campo em ISO 8601 usado quando não há número
+
+
+ESQUEMA_TOMADA = {
+    "ts": Campo("epoch"),
+    "Voltage": Campo("float32", 127.8),
+    "Current": Campo("float32", 0.0),
+    "Power": Campo("float32", 0.0),
+    "Energy": Campo("float32", 0.0),
+    "Frequency": Campo("float32", 60.0),
+    "PF": Campo("float32", 1.0),
+}
+
+# Marca de "sem instante": -2**63 sobrevive à conversão float64 -> int64 sem colidir com datas reais
+SEM_TS = np.iinfo("int64").min
+
+# Registros sem "ts" numérico (ex.: os gravados no cadastro) usam o campo "time";
+# sem nenhum dos dois ficam com SEM_TS e são descartados por quem grava o histórico
+ESQUEMA_HISTORICO = {
+    "ts": Campo("epoch", padrao=SEM_TS, alternativo="time"),
+    "Power": Campo("float32", np.nan),
+    "Energy": Campo("float32", np.nan),
+}
+
+ESQUEMA_CADASTRO = {
+    "Device_ID": Campo("category"),
+    "Dispositivo": Campo("category"),
+    "Prioridade": Campo("category"),
+    "Voltage": Campo("float32", 0.0),
+    "Current": Campo("float32", 0.0),
+    "Power": Campo("float32", 0.0),
+    "Energy": Campo("float32", 0.0),
+    "Frequency": Campo("float32", 0.0),
+    "PF": Campo("float32", 0.0),
+}
+
+
+def _numeros(valores) -> np.ndarray:
+    if isinstance(valores, np.ndarray) and valores.dtype.kind in "biuf":
+        return valores.astype("float64")
+    # Caminho rápido: o firmware grava números JSON; strings e None caem na conversão tolerante
+    try:
+        return np.fromiter(valores, dtype="float64", count=len(valores))
+    except (TypeError, ValueError):
+        return np.array(pd.to_numeric(pd.Series(valores, dtype="object"), errors="coerce"), dtype="float64")
+
+
+def _epoch(numeros: np.ndarray, alternativos, padrao) -> np.ndarray:
+    faltando = np.isnan(numeros)
+    if alternativos is not None and faltando.any():
+        idx = np.flatnonzero(faltando)
+        texto = pd.to_datetime(pd.Series([alternativos[i] for i in idx], dtype="object"), errors="coerce", utc=True)
+        numeros[idx] = (texto - pd.Timestamp(0, tz="UTC")) // pd.Timedelta(seconds=1)
+        faltando = np.isnan(numeros)
+    numeros[faltando] = time.time() if padrao is None else padrao
+    return numeros.astype("int64")
+
+
+def _extrair(valores: list, nome: str):
+    # Gerador direto no fromiter evita a lista intermediária; valores não numéricos voltam como lista
+    nan = float("nan")
+    try:
+        return np.fromiter((v.get(nome, nan) for v in valores), dtype="float64", count=len(valores))
+    except (TypeError, ValueError):
+        return [v.get(nome) for v in valores]
+
+
+def coluna(valores, campo: Campo, alternativos: list = None):
+    """Converte uma coluna crua conforme o campo do esquema"""
+    if campo.tipo == "category":
+        return pd.Categorical(valores)
+    numeros = _numeros(valores)
+    if campo.tipo == "epoch":
+        return _epoch(numeros, alternativos, campo.padrao)
+    if campo.padrao is not None:
+        numeros[np.isnan(numeros)] = campo.padrao
+    return numeros.astype(campo.tipo)
+
+
+def normalizar(registros: dict, esquema: dict, chave: str = None, ordenar: bool = False) -> dict:
+    """{id: registro} -> {coluna: array tipado}; `chave` guarda os ids como categóricos"""
+    ids = [k for k, v in registros.items() if isinstance(v, dict)]
+    if ordenar:
+        ids.sort()
+    valores = [registros[k] for k in ids]
+    colunas = {}
+    if chave:
+        # chaves de dict já são únicas: dispensa a fatoração do pd.Categorical
+        colunas[chave] = pd.Categorical.from_codes(np.arange(len(ids), dtype="int32"), pd.Index(ids))
+    for nome, campo in esquema.items():
+        if campo.tipo == "category":
+            brutos = [v.get(nome) for v in valores]
+        else:
+            brutos = _extrair(valores, nome)
+        alternativos = None
+        if campo.alternativo and (not isinstance(brutos, np.ndarray) or np.isnan(brutos).any()):
+            alternativos = [v.get(campo.alternativo) for v in valores]
+        colunas[nome] = coluna(brutos, campo, alternativos)
+    return colunas
+
+
+def tabela(registros: dict, esquema: dict, chave: str = None, ordenar: bool = False) -> pd.DataFrame:
+    """Como `normalizar`, em DataFrame; campos epoch ganham também a coluna "time" (UTC sem fuso)"""
+    df = pd.DataFrame(normalizar(registros, esquema, chave=chave, ordenar=ordenar))
+    for nome, campo in esquema.items():
+        if campo.tipo == "epoch":
+            df["time"] = pd.to_datetime(df[nome], unit="s")
+    return df
+
+
+def tipar(df: pd.DataFrame, esquema: dict) -> pd.DataFrame:
+    """Aplica o esquema às colunas já existentes de um DataFrame (ex.: lido do cadastro)"""
+    df = df.copy()
+    for nome, campo in esquema.items():
+        if nome not in df.columns:
+            continue
+        if campo.tipo == "category":
+            df[nome] = df[nome].astype("category")
+        else:
+            df[nome] = coluna(df[nome].to_numpy(), campo)
+    return df
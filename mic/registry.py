@@ -0,0 +1,141 @@
+"""Cadastro local de dispositivos em SQLite (modo WAL), indexado por Device_ID.
+
+Substitui a planilha ``dados_consumo_mic.xlsx`` como fonte da verdade: cada
+registro é um upsert pela chave primária, sem reescrever o arquivo inteiro, e
+sessões concorrentes não sobrescrevem as alterações umas das outras. Excel e
+CSV continuam disponíveis apenas para importação e exportação::
+
+    python -m mic.registry --import dados_consumo_mic.xlsx
+    python -m mic.registry --export backup.csv
+"""
+import argparse
+import os
+import sqlite3
+import threading
+
+from mic.metricas import medir
+
+REGISTRY_COLUMNS = [
+    "Device_ID", "Dispositivo", "Prioridade", "Nome_Conectado", "Modelo_Dispositivo",
+    "time", "Voltage", "Current", "Power", "Energy", "Frequency", "PF",
+]
+_REAL_COLUMNS = {"Voltage", "Current", "Power", "Energy", "Frequency", "PF"}
+
+
+class DeviceRegistry:
+    def __init__(self, path: str = "dados_consumo_mic.db"):
+        self.path = path
+        self._local = threading.local()
+        cols = ", ".join(f'"{c}" {"REAL" if c in _REAL_COLUMNS else "TEXT"}' for c in REGISTRY_COLUMNS[1:])
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(f'CREATE TABLE IF NOT EXISTS devices ("Device_ID" TEXT PRIMARY KEY, {cols})')
+        conn.commit()
+
+    def _conn(self) -> sqlite3.Connection:
+        # Uma conexão por thread: cada sessão do Streamlit roda na sua
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def upsert(self, device: dict):
+        self.upsert_many([device])
+
+    def upsert_many(self, devices):
+        """Insere ou atualiza dispositivos; só as colunas informadas são alteradas"""
+        conn = self._conn()
+        with conn:
+            for device in devices:
+                cols = [c for c in REGISTRY_COLUMNS if c in device]
+                if "Device_ID" not in cols:
+                    raise ValueError("Device_ID é obrigatório")
+                names = ", ".join(f'"{c}"' for c in cols)
+                marks = ", ".join("?" for _ in cols)
+                updates = ", ".join(f'"{c}"=excluded."{c}"' for c in cols if c != "Device_ID")
+                sql = f'INSERT INTO devices ({names}) VALUES ({marks})'
+                sql += f' ON CONFLICT("Device_ID") DO UPDATE SET {updates}' if updates else ' ON CONFLICT DO NOTHING'
+                conn.execute(sql, [_sql_value(device[c]) for c in cols])
+
+    def get(self, device_id: str):
+        row = self._conn().execute('SELECT * FROM devices WHERE "Device_ID"=?', (device_id,)).fetchone()
+        return dict(row) if row else None
+
+    def delete(self, device_id: str):
+        conn = self._conn()
+        with conn:
+            conn.execute('DELETE FROM devices WHERE "Device_ID"=?', (device_id,))
+
+    def ids(self) -> set:
+        return {r[0] for r in self._conn().execute('SELECT "Device_ID" FROM devices')}
+
+    def count(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM devices").fetchone()[0]
+
+    def all(self) -> list:
+        return [dict(r) for r in self._conn().execute('SELECT * FROM devices ORDER BY rowid')]
+
+    def to_dataframe(self):
+        import pandas as pd
+        return pd.DataFrame(self.all(), columns=REGISTRY_COLUMNS)
+
+    # ---------- importação / exportação ----------
+    def import_file(self, path_or_buffer, name: str = None) -> int:
+        """Importa uma planilha .xlsx ou .csv; devolve o número de dispositivos"""
+        import pandas as pd
+        name = name or str(path_or_buffer)
+        formato = "csv" if name.lower().endswith(".csv") else "xlsx"
+        with medir("planilha_leitura", formato=formato):
+            if formato == "csv":
+                df = pd.read_csv(path_or_buffer, dtype={"Device_ID": str})
+            else:
+                df = pd.read_excel(path_or_buffer, dtype={"Device_ID": str})
+        df = df[[c for c in REGISTRY_COLUMNS if c in df.columns]]
+        df = df[df["Device_ID"].notna()].astype(object).where(df.notna(), None)
+        devices = df.to_dict(orient="records")
+        self.upsert_many(devices)
+        return len(devices)
+
+    def export_file(self, path: str, df=None):
+        df = self.to_dataframe() if df is None else df
+        if path.lower().endswith(".csv"):
+            df.to_csv(path, index=False)
+        else:
+            df.to_excel(path, index=False)
+
+    def migrate_from_excel(self, path: str = "dados_consumo_mic.xlsx") -> int:
+        """Importa a planilha legada uma única vez, quando o cadastro ainda está vazio"""
+        if self.count() == 0 and os.path.exists(path):
+            return self.import_file(path)
+        return 0
+
+
+def _sql_value(value):
+    # Timestamps do pandas/datetime viram texto ISO; NaN vira NULL
+    if value is None:
+        return None
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    if isinstance(value, float) and value != value:
+        return None
+    if hasattr(value, "item"):
+        return value.item()
+    return value
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cadastro de dispositivos do MIC")
+    parser.add_argument("--db", default="dados_consumo_mic.db")
+    parser.add_argument("--import", dest="import_path", help="planilha .xlsx/.csv para importar")
+    parser.add_argument("--export", dest="export_path", help="arquivo .xlsx/.csv de saída")
+    args = parser.parse_args()
+
+    registry = DeviceRegistry(args.db)
+    if args.import_path:
+        print(f"{registry.import_file(args.import_path)} dispositivos importados de {args.import_path}")
+    if args.export_path:
+        registry.export_file(args.export_path)
+        print(f"{registry.count()} dispositivos exportados para {args.export_path}")
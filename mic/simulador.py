@@ -0,0 +1,403 @@
+"""Simulador de uma frota de tomadas inteligentes, sem hardware nem rede.
+
+Reproduz o protocolo do firmware (``informaçoes-adicionais/prototipo.cpp``)
+para N tomadas virtuais:
+
+- ao ligar, ``PUT /device_calls/{id}`` com ``status: "pending_registration"``;
+- a cada amostra, ``PUT /tomadas/{id}`` com a leitura atual;
+- e ``POST`` da mesma leitura no histórico.
+
+O id é um MAC sem ":", como no firmware. Cada tomada segue um perfil de
+carga (geladeira em ciclos, chuveiro em rajadas, TV à noite...). O ``ts`` vai
+em segundos epoch, que é como o painel o lê; o protótipo manda o tempo desde
+o boot.
+
+O destino é qualquer objeto com ``put``/``post``: o ``FirebaseClient`` (banco
+real ou ``mic.fake_rtdb``) ou o ``DestinoLocal``, que escreve direto na árvore
+de um RTDB falso do mesmo processo. Só assim dez mil tomadas cabem num laptop::
+
+    python -m mic.fake_rtdb --port 9000
+    python -m mic.simulador --url http://127.0.0.1:9000 --tomadas 200 --historico raiz
+
+    # RTDB falso e frota no mesmo processo, com 24 h de histórico e o cadastro para importar
+    python -m mic.simulador --fake --porta 9000 --tomadas 10000 --historico-horas 24 --cadastro frota.csv
+"""
+import argparse
+import csv
+import heapq
+import math
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+from mic.firebase import FirebaseClient, PushIdGenerator
+
+TENSAO_REDE = 127.8  # V, a mesma constante do firmware
+FREQUENCIA = 60.0
+PREFIXO_MAC = "24A160"  # OUI de ESP32; os 6 dígitos finais numeram a tomada
+DESTINOS_HISTORICO = ("tomadas", "raiz", "nenhum")
+
+
+@dataclass(frozen=True)
+class Perfil:
+    nome: str  # nome do aparelho no cadastro exportado
+    prioridade: str
+    nominal_w: float
+    standby_w: float = 0.0
+    pf: float = 1.0
+    forma: str = "constante"  # constante | ciclo | horario | rajada
+    periodo_s: float = 1800.0  # ciclo: duração de um ciclo completo
+    fracao_ligado: float = 0.5  # ciclo: parte do ciclo com o motor ligado
+    horas: tuple = ()  # horario/rajada: horas locais em que o aparelho liga
+    duracao_s: float = 600.0  # rajada: quanto dura cada uso
+    ruido: float = 0.03  # desvio relativo da potência
+
+
+PERFIS = {
+    "geladeira": Perfil("Geladeira", "Máxima", 150, standby_w=4, pf=0.85, forma="ciclo",
+                        periodo_s=1800, fracao_ligado=0.4),
+    "chuveiro": Perfil("Chuveiro elétrico", "Moderada", 5500, forma="rajada", horas=(7, 19), duracao_s=600),
+    "televisao": Perfil("Televisão", "Moderada", 120, standby_w=9, pf=0.95, forma="horario",
+                        horas=(19, 20, 21, 22)),
+    "computador": Perfil("Computador", "Moderada", 250, standby_w=5, pf=0.9, forma="horario",
+                         horas=tuple(range(9, 18))),
+    "lampada": Perfil("Lâmpada LED", "Mínima", 9, pf=0.9, forma="horario", horas=tuple(range(18, 24))),
+    "roteador": Perfil("Roteador", "Máxima", 8, pf=0.6),
+}
+
+
+def potencia(perfil: Perfil, t: float, fase: float, rng: random.Random) -> float:
+    """Potência (W) no instante ``t``; ``fase`` em [0, 1) dessincroniza tomadas do mesmo perfil"""
+    if perfil.forma == "ciclo":
+        ligado = (t / perfil.periodo_s + fase) % 1.0 < perfil.fracao_ligado
+    elif perfil.forma == "horario":
+        ligado = time.localtime(t).tm_hour in perfil.horas
+    elif perfil.forma == "rajada":
+        local = time.localtime(t)
+        segundo_do_dia = local.tm_hour * 3600 + local.tm_min * 60 + local.tm_sec
+        # cada tomada começa o uso num minuto diferente da primeira hora
+        inicio = int(fase * 3600)
+        ligado = any(0 <= segundo_do_dia - (h * 3600 + inicio) < perfil.duracao_s for h in perfil.horas)
+    else:
+        ligado = True
+    base = perfil.nominal_w if ligado else perfil.standby_w
+    return max(0.0, base * (1.0 + rng.gauss(0.0, perfil.ruido))) if base else 0.0
+
+
+class Tomada:
+    __slots__ = ("id", "perfil", "fase", "energia_kwh", "ultimo_t", "ligada_em", "rng", "ocupada")
+
+    def __init__(self, device_id: str, perfil: Perfil, semente: int = 0):
+        self.id = device_id
+        self.perfil = perfil
+        self.rng = random.Random(f"{semente}:{device_id}")
+        self.fase = self.rng.random()
+        self.energia_kwh = 0.0
+        self.ultimo_t = None
+        self.ligada_em = time.monotonic()
+        self.ocupada = False  # o firmware manda uma leitura por vez
+
+    def amostra(self, t: float) -> dict:
+        """Leitura no instante ``t``, com o mesmo JSON que o firmware monta"""
+        p = potencia(self.perfil, t, self.fase, self.rng)
+        v = TENSAO_REDE + self.rng.gauss(0.0, 0.4)
+        if self.ultimo_t is not None and t > self.ultimo_t:
+            self.energia_kwh += (p / 1000.0) * ((t - self.ultimo_t) / 3600.0)
+        self.ultimo_t = t
+        return {
+            "Voltage": round(v, 2),
+            "Current": round(p / (v * self.perfil.pf), 3),
+            "Power": round(p, 2),
+            "Energy": round(self.energia_kwh, 6),
+            "Frequency": FREQUENCIA,
+            "PF": self.perfil.pf,
+            "ts": int(t),
+        }
+
+    def chamado(self) -> dict:
+        return {
+            "Device_ID": self.id,
+            "Device_Name": "",
+            "Priority": "",
+            "Model": "",
+            "Nickname": "",
+            "status": "pending_registration",
+            "timestamp": int((time.monotonic() - self.ligada_em) * 1000),  # millis() do ESP32
+        }
+
+
+def gerar_tomadas(n: int, perfil: str = "mix", semente: int = 0, prefixo: str = PREFIXO_MAC) -> list:
+    """``n`` tomadas com ids sequenciais; ``mix`` alterna entre todos os perfis"""
+    if perfil != "mix" and perfil not in PERFIS:
+        raise ValueError(f"perfil desconhecido: {perfil} (use mix ou {', '.join(PERFIS)})")
+    nomes = list(PERFIS) if perfil == "mix" else [perfil]
+    return [Tomada(f"{prefixo}{i:06X}", PERFIS[nomes[i % len(nomes)]], semente) for i in range(n)]
+
+
+def caminho_historico(device_id: str, destino: str):
+    # "tomadas" é o caminho do firmware: o PUT seguinte em /tomadas/{id} apaga o que estava abaixo.
+    # O painel sincroniza /historico/{id}, por isso "raiz" é o que alimenta o gráfico.
+    if destino == "tomadas":
+        return f"/tomadas/{device_id}/historico"
+    if destino == "raiz":
+        return f"/historico/{device_id}"
+    return None
+
+
+def arvore_inicial(tomadas: list, instante: float = None, chamados: bool = True, historico_horas: float = 0,
+                   passo_s: float = 300, historico: str = "raiz") -> dict:
+    """Árvore pronta para ``FakeRTDB(data=...)``, sem uma requisição por tomada.
+
+    Traz a leitura atual de cada tomada, os chamados pendentes e, se pedido,
+    ``historico_horas`` de histórico a cada ``passo_s`` até ``instante``.
+    """
+    instante = time.time() if instante is None else instante
+    push_id = PushIdGenerator()
+    arvore = {"tomadas": {}}
+    if chamados:
+        arvore["device_calls"] = {t.id: t.chamado() for t in tomadas}
+    n_passos = int(historico_horas * 3600 // passo_s)
+    for t in tomadas:
+        registros = {}
+        for k in range(n_passos, 0, -1):
+            instante_k = instante - k * passo_s
+            registros[push_id(instante_k * 1000)] = t.amostra(instante_k)
+        arvore["tomadas"][t.id] = t.amostra(instante)
+        caminho = caminho_historico(t.id, historico)
+        if registros and caminho:
+            no = arvore
+            partes = caminho.strip("/").split("/")
+            for parte in partes[:-1]:
+                no = no.setdefault(parte, {})
+            no[partes[-1]] = registros
+    return arvore
+
+
+def exportar_cadastro(tomadas: list, path: str):
+    """CSV para ``python -m mic.registry --import``: a frota aparece no painel já cadastrada"""
+    contagem = {}
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(["Device_ID", "Dispositivo", "Prioridade", "Nome_Conectado", "Modelo_Dispositivo"])
+        for t in tomadas:
+            contagem[t.perfil.nome] = contagem.get(t.perfil.nome, 0) + 1
+            w.writerow([t.id, f"{t.perfil.nome} {contagem[t.perfil.nome]}", t.perfil.prioridade, "", "Simulador"])
+
+
+class DestinoLocal:
+    """Escreve direto na árvore de um ``FakeRTDB`` do mesmo processo, sem HTTP"""
+
+    def __init__(self, db):
+        self.db = db
+
+    def put(self, path: str, data):
+        self.db.set(path, data)
+        return data
+
+    def post(self, path: str, data):
+        return {"name": self.db.push(path, data)}
+
+
+class Simulador:
+    def __init__(self, destino, tomadas: list, intervalo: float = 5.0, historico: str = "tomadas",
+                 chamado: bool = True, workers: int = 8):
+        if historico not in DESTINOS_HISTORICO:
+            raise ValueError(f"historico deve ser um de {DESTINOS_HISTORICO}")
+        self.destino = destino
+        self.tomadas = tomadas
+        self.intervalo = intervalo
+        self.historico = historico
+        self.chamado = chamado
+        self.workers = workers
+        self.lock = threading.Lock()
+        self.amostras = 0
+        self.requisicoes = 0
+        self.falhas = 0
+        self.puladas = 0  # tomada ainda enviando a leitura anterior
+        self.atraso_total = 0.0
+        self.atraso_max = 0.0
+        self.ultimo_erro = None
+        self._inicio = None
+        self._parar = threading.Event()
+        # limita as tarefas na fila do pool: com o destino lento o atraso aparece nas métricas
+        self._vagas = threading.BoundedSemaphore(workers * 2)
+        self._executor = None
+        self._thread = None
+
+    def iniciar(self):
+        self._parar.clear()
+        self._inicio = time.time()
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="simulador")
+        self._thread = threading.Thread(target=self._loop, name="simulador", daemon=True)
+        self._thread.start()
+        return self
+
+    def parar(self):
+        self._parar.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def __enter__(self):
+        return self.iniciar()
+
+    def __exit__(self, *exc):
+        self.parar()
+
+    def _reservar(self) -> bool:
+        while not self._vagas.acquire(timeout=0.5):
+            if self._parar.is_set():
+                return False
+        return True
+
+    def _loop(self):
+        if self.chamado:
+            for tomada in self.tomadas:
+                if not self._reservar():
+                    return
+                self._executor.submit(self._chamar, tomada)
+        # a primeira leitura de cada tomada cai num ponto diferente do intervalo
+        agenda = [(self._inicio + t.fase * self.intervalo, i) for i, t in enumerate(self.tomadas)]
+        heapq.heapify(agenda)
+        while agenda and not self._parar.is_set():
+            previsto, i = agenda[0]
+            espera = previsto - time.time()
+            if espera > 0:
+                self._parar.wait(min(espera, 0.5))
+                continue
+            heapq.heapreplace(agenda, (previsto + self.intervalo, i))
+            tomada = self.tomadas[i]
+            if tomada.ocupada:
+                with self.lock:
+                    self.puladas += 1
+                continue
+            if not self._reservar():
+                return
+            tomada.ocupada = True
+            self._executor.submit(self._enviar, tomada, previsto)
+
+    def _chamar(self, tomada: Tomada):
+        try:
+            self.destino.put(f"/device_calls/{tomada.id}", tomada.chamado())
+            self._contar(1)
+        except Exception as e:
+            self._falhou(e)
+        finally:
+            self._vagas.release()
+
+    def _enviar(self, tomada: Tomada, previsto: float):
+        try:
+            agora = time.time()
+            leitura = tomada.amostra(agora)
+            self.destino.put(f"/tomadas/{tomada.id}", leitura)
+            requisicoes = 1
+            caminho = caminho_historico(tomada.id, self.historico)
+            if caminho:
+                self.destino.post(caminho, leitura)
+                requisicoes += 1
+            self._contar(requisicoes, agora - previsto)
+        except Exception as e:
+            self._falhou(e)
+        finally:
+            tomada.ocupada = False
+            self._vagas.release()
+
+    def _contar(self, requisicoes: int, atraso: float = None):
+        with self.lock:
+            self.requisicoes += requisicoes
+            if atraso is not None:
+                self.amostras += 1
+                self.atraso_total += atraso
+                self.atraso_max = max(self.atraso_max, atraso)
+
+    def _falhou(self, erro: Exception):
+        with self.lock:
+            self.falhas += 1
+            self.ultimo_erro = erro
+
+    def metricas(self) -> dict:
+        with self.lock:
+            decorrido = max(time.time() - self._inicio, 1e-9) if self._inicio else 0.0
+            return {
+                "tomadas": len(self.tomadas),
+                "decorrido_s": round(decorrido, 1),
+                "amostras": self.amostras,
+                "amostras_por_s": round(self.amostras / decorrido, 1) if decorrido else 0.0,
+                "esperado_por_s": round(len(self.tomadas) / self.intervalo, 1),
+                "requisicoes": self.requisicoes,
+                "falhas": self.falhas,
+                "puladas": self.puladas,
+                "atraso_medio_s": round(self.atraso_total / self.amostras, 3) if self.amostras else 0.0,
+                "atraso_max_s": round(self.atraso_max, 3),
+                "ultimo_erro": str(self.ultimo_erro) if self.ultimo_erro else None,
+            }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Frota de tomadas simuladas para testes de carga offline")
+    alvo = parser.add_mutually_exclusive_group(required=True)
+    alvo.add_argument("--url", help="URL do banco (Firebase real ou mic.fake_rtdb)")
+    alvo.add_argument("--fake", action="store_true", help="sobe o RTDB falso neste processo e escreve direto nele")
+    parser.add_argument("--auth", default="")
+    parser.add_argument("--host", default="127.0.0.1", help="com --fake: endereço do RTDB falso")
+    parser.add_argument("--porta", type=int, default=9000, help="com --fake: porta do RTDB falso")
+    parser.add_argument("--tomadas", type=int, default=10)
+    parser.add_argument("--perfil", default="mix", help=f"mix ou um de: {', '.join(PERFIS)}")
+    parser.add_argument("--intervalo", type=float, default=5.0, help="segundos entre leituras de cada tomada")
+    parser.add_argument("--historico", choices=DESTINOS_HISTORICO, default="tomadas",
+                        help="tomadas = caminho do firmware; raiz = /historico/{id}, lido pelo painel")
+    parser.add_argument("--historico-horas", type=float, default=0,
+                        help="com --fake: horas de histórico sintético já presentes ao subir")
+    parser.add_argument("--passo-historico", type=float, default=300, help="segundos entre registros sintéticos")
+    parser.add_argument("--sem-chamado", action="store_true", help="não envia /device_calls ao ligar")
+    parser.add_argument("--cadastro", help="grava um CSV da frota para python -m mic.registry --import")
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--duracao", type=float, default=0, help="segundos de simulação (0 = até Ctrl+C)")
+    parser.add_argument("--semente", type=int, default=0)
+    args = parser.parse_args()
+
+    tomadas = gerar_tomadas(args.tomadas, args.perfil, args.semente)
+    if args.cadastro:
+        exportar_cadastro(tomadas, args.cadastro)
+        print(f"Cadastro de {len(tomadas)} tomadas em {args.cadastro}")
+
+    db = cliente = None
+    if args.fake:
+        from mic.fake_rtdb import FakeRTDB
+        t0 = time.perf_counter()
+        arvore = arvore_inicial(tomadas, chamados=not args.sem_chamado, historico_horas=args.historico_horas,
+                                passo_s=args.passo_historico, historico=args.historico)
+        db = FakeRTDB(arvore, indices={"/device_calls": ["status"]}).start(args.host, args.porta)
+        destino = DestinoLocal(db)
+        print(f"RTDB falso em {db.url} com {len(tomadas)} tomadas ({time.perf_counter() - t0:.1f} s para montar)")
+    else:
+        cliente = FirebaseClient(args.url, args.auth, pool_size=args.workers, retries=1)
+        destino = cliente
+
+    # com --fake os chamados já estão na árvore inicial
+    sim = Simulador(destino, tomadas, intervalo=args.intervalo, historico=args.historico,
+                    chamado=not args.sem_chamado and not args.fake, workers=args.workers).iniciar()
+    fim = time.time() + args.duracao if args.duracao else math.inf
+    try:
+        while time.time() < fim:
+            time.sleep(min(10.0, max(fim - time.time(), 0.0)))
+            print(sim.metricas(), file=sys.stderr)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sim.parar()
+        if cliente is not None:
+            cliente.close()
+        if db is not None:
+            db.stop()
+    print(sim.metricas())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+"""Escuta o endpoint de streaming (server-sent events) do Realtime Database.
+
+Uma única conexão ``Accept: text/event-stream`` é mantida aberta em segundo
+plano e cada evento ``put``/``patch`` é aplicado ao estado em memória. O
+dashboard lê ``snapshot()`` em vez de consultar o Firebase a cada rerun.
+
+O Firebase manda um ``keep-alive`` a cada 30 s numa conexão ociosa. ``ativo()``
+só é verdadeiro com a conexão aberta, o snapshot inicial recebido e algum
+evento dentro de ``silencio_max``: fora disso quem lê deve voltar ao polling.
+"""
+import json
+import logging
+import random
+import threading
+import time
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+
+def parse_sse(lines):
+    """Converte linhas de um fluxo SSE em tuplas ``(evento, dados)``"""
+    event, data = None, []
+    for line in lines:
+        if line is None:
+            continue
+        if line == "":
+            if event is not None or data:
+                yield event or "message", "\n".join(data)
+            event, data = None, []
+        elif line.startswith(":"):
+            continue
+        else:
+            field, _, value = line.partition(":")
+            value = value[1:] if value.startswith(" ") else value
+            if field == "event":
+                event = value
+            elif field == "data":
+                data.append(value)
+
+
+def iter_lines(raw, chunk_size: int = 65536):
+    """Linhas de um corpo HTTP em streaming, entregues assim que chegam.
+
+    ``Response.iter_lines`` espera encher o bloco antes de devolver, o que
+    atrasaria eventos pequenos; ``read1`` devolve o que já estiver disponível.
+    """
+    read = getattr(raw, "read1", None) or (lambda n: raw.read(1))
+    buf = bytearray()
+    while True:
+        chunk = read(chunk_size)
+        if not chunk:
+            break
+        buf += chunk
+        while True:
+            i = buf.find(b"\n")
+            if i < 0:
+                break
+            line = bytes(buf[:i]).rstrip(b"\r")
+            del buf[:i + 1]
+            yield line.decode("utf-8")
+    if buf:
+        yield bytes(buf).decode("utf-8")
+
+
+class TelemetriaStream:
+    def __init__(self, client, path: str = "/tomadas", ignore_children=("historico",),
+                 read_timeout: float = 90, backoff: float = 1.0, max_backoff: float = 30.0,
+                 silencio_max: float = 75):
+        self.client = client
+        self.path = path
+        self.ignore_children = set(ignore_children)
+        self.read_timeout = read_timeout
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.silencio_max = silencio_max  # dois keep-alives perdidos, com folga
+
+        self.session = requests.Session()
+        self.state = {}
+        self.version = 0
+        self.connected = False
+        self.ready = False  # já recebeu o snapshot inicial
+        self.last_event = None
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._response = None
+        self._thread = None
+
+    # ---------- ciclo de vida ----------
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="telemetria-stream", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        response = self._response
+        if response is not None:
+            # fechar o Response não desbloqueia uma leitura em andamento; derruba o socket
+            try:
+                response.raw.shutdown()
+            except Exception:
+                pass
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def ativo(self) -> bool:
+        """Conectado, com o snapshot inicial e algum evento (ou keep-alive) dentro da janela"""
+        last_event = self.last_event
+        return (self.ready and self.connected and last_event is not None
+                and time.time() - last_event < self.silencio_max)
+
+    def snapshot(self) -> dict:
+        """Cópia do estado atual: {device_id: leitura}"""
+        with self._cond:
+            return {k: dict(v) for k, v in self.state.items() if isinstance(v, dict)}
+
+    def wait_for_version(self, version: int, timeout: float = None) -> bool:
+        """Bloqueia até o estado passar da versão informada"""
+        with self._cond:
+            return self._cond.wait_for(lambda: self.version > version, timeout=timeout)
+
+    # ---------- conexão ----------
+    def _run(self):
+        attempt = 0
+        while not self._stop.is_set():
+            try:
+                with self.session.get(self.client.url(self.path), params=self.client.params(),
+                                      headers={"Accept": "text/event-stream"}, stream=True,
+                                      timeout=(self.client.timeout, self.read_timeout)) as r:
+                    self._response = r
+                    r.raise_for_status()
+                    self.connected = True
+                    attempt = 0
+                    for event, data in parse_sse(iter_lines(r.raw)):
+                        if self._stop.is_set():
+                            break
+                        if event in ("put", "patch"):
+                            self._apply(event, json.loads(data))
+                        elif event == "keep-alive":
+                            self.last_event = time.time()
+                        elif event in ("cancel", "auth_revoked"):
+                            logger.warning("Stream %s encerrado pelo servidor: %s %s", self.path, event, data)
+                            break
+            except Exception as e:
+                if not self._stop.is_set():
+                    logger.warning("Falha no stream %s: %s", self.path, e)
+            finally:
+                # o estado em memória deixa de ser confiável até o próximo snapshot inicial
+                self.connected = False
+                self.ready = False
+                self._response = None
+            if not self._stop.is_set():
+                self._stop.wait(random.uniform(0, min(self.max_backoff, self.backoff * (2 ** attempt))))
+                attempt += 1
+
+    # ---------- aplicação dos eventos ----------
+    def _apply(self, event: str, message: dict):
+        parts = [p for p in (message.get("path") or "/").split("/") if p]
+        data = message.get("data")
+        if len(parts) >= 2 and parts[1] in self.ignore_children:
+            return
+        with self._cond:
+            if event == "put":
+                self._set(parts, data)
+            else:
+                for key, value in (data or {}).items():
+                    self._set(parts + [p for p in key.split("/") if p], value)
+            if not parts and event == "put":
+                self.ready = True
+            self.version += 1
+            self.last_event = time.time()
+            self._cond.notify_all()
+
+    def _set(self, parts: list, value):
+        if len(parts) >= 2 and parts[1] in self.ignore_children:
+            return
+        if not parts:
+            self.state = {k: self._clean(v) for k, v in value.items()} if isinstance(value, dict) else {}
+            return
+        if len(parts) == 1:
+            if value is None:
+                self.state.pop(parts[0], None)
+            else:
+                self.state[parts[0]] = self._clean(value)
+            return
+        node = self.state.setdefault(parts[0], {})
+        if not isinstance(node, dict):
+            node = self.state[parts[0]] = {}
+        for part in parts[1:-1]:
+            if not isinstance(node.get(part), dict):
+                node[part] = {}
+            node = node[part]
+        if value is None:
+            node.pop(parts[-1], None)
+        else:
+            node[parts[-1]] = value
+
+    def _clean(self, device):
+        if isinstance(device, dict):
+            return {k: v for k, v in device.items() if k not in self.ignore_children}
+        return device
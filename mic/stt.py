@@ -0,0 +1,97 @@
+"""Reconhecimento de fala em memória, fora da thread da interface.
+
+O áudio do ``audio_recorder()`` vai direto de um ``BytesIO`` para o
+``speech_recognition`` (nenhum arquivo temporário) e a transcrição roda num
+pool de threads com tempo limite. O mesmo limite vale para o socket do
+reconhecedor online, então uma chamada travada libera o worker. Com todos os
+workers ocupados, o pedido é recusado (``ReconhecimentoOcupado``) em vez de
+esperar na fila atrás deles. O backend é plugável: Google (online) ou
+motores locais suportados pelo ``speech_recognition`` (Sphinx, Vosk, Whisper).
+"""
+import io
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from mic.metricas import contar, medir
+
+_executor = None
+_max_workers = 0
+_ocupados = 0
+_lock = threading.Lock()
+
+
+class ReconhecimentoOcupado(RuntimeError):
+    pass
+
+
+class ReconhecedorSR:
+    """Backend que delega a um método ``recognize_*`` do ``speech_recognition.Recognizer``"""
+
+    def __init__(self, nome: str, usa_idioma: bool = True, **opcoes):
+        self.nome = nome
+        self.usa_idioma = usa_idioma
+        self.opcoes = opcoes
+
+    def reconhecer(self, recognizer, audio, idioma: str) -> str:
+        metodo = getattr(recognizer, f"recognize_{self.nome}")
+        if self.usa_idioma:
+            return metodo(audio, language=idioma, **self.opcoes)
+        return metodo(audio, **self.opcoes)
+
+
+BACKENDS = {
+    "google": lambda: ReconhecedorSR("google"),
+    "sphinx": lambda: ReconhecedorSR("sphinx"),
+    # Vosk usa o idioma do modelo baixado (diretório "model" ou VOSK_MODEL)
+    "vosk": lambda: ReconhecedorSR("vosk", usa_idioma=False),
+    "whisper": lambda: ReconhecedorSR("whisper", usa_idioma=False, language="portuguese"),
+}
+
+
+def criar_reconhecedor(nome: str = "google"):
+    try:
+        return BACKENDS[nome]()
+    except KeyError:
+        raise ValueError(f"Backend de reconhecimento desconhecido: {nome} (opções: {', '.join(BACKENDS)})")
+
+
+def transcrever(audio_bytes: bytes, reconhecedor, idioma: str = "pt-BR", timeout: float = None) -> str:
+    """Transcreve um WAV em memória com o backend informado"""
+    import speech_recognition as sr
+    with medir("stt", backend=getattr(reconhecedor, "nome", type(reconhecedor).__name__)):
+        recognizer = sr.Recognizer()
+        recognizer.operation_timeout = timeout  # backends online: o socket desiste junto com quem espera
+        with sr.AudioFile(io.BytesIO(audio_bytes)) as source:
+            audio = recognizer.record(source)
+        return reconhecedor.reconhecer(recognizer, audio, idioma)
+
+
+def _liberar(_futuro):
+    global _ocupados
+    with _lock:
+        _ocupados -= 1
+
+
+def reconhecer_audio(audio_bytes: bytes, reconhecedor, idioma: str = "pt-BR", timeout: float = 15,
+                     max_workers: int = 4) -> str:
+    """Transcreve no pool de threads.
+
+    Levanta ``TimeoutError`` se passar de ``timeout`` segundos e
+    ``ReconhecimentoOcupado`` se os ``max_workers`` estiverem todos em uso.
+    """
+    global _executor, _max_workers, _ocupados
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="stt")
+            _max_workers = max_workers
+        if _ocupados >= _max_workers:
+            contar("stt_recusados")
+            raise ReconhecimentoOcupado(f"{_ocupados} reconhecimentos em andamento")
+        _ocupados += 1
+    try:
+        futuro = _executor.submit(transcrever, audio_bytes, reconhecedor, idioma, timeout)
+    except Exception:
+        _liberar(None)
+        raise
+    futuro.add_done_callback(_liberar)
+    return futuro.result(timeout=timeout)
@@ -0,0 +1,162 @@
+"""Estado de telemetria compartilhado por todas as sessões do painel.
+
+Uma única thread mantém o estado atualizado (pelo stream SSE ou por polling) e
+publica um objeto novo a cada mudança. As sessões só leem a referência atual:
+nenhuma faz requisições próprias ao Firebase e ninguém altera um estado publicado.
+
+Se o stream cair ou ficar em silêncio, a thread volta a ler por polling a cada
+``intervalo`` e o snapshot traz o erro ``"stream"`` até ele voltar.
+"""
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class EstadoTelemetria:
+    """Snapshot imutável; `dados` é compartilhado entre sessões e não deve ser alterado"""
+    versao: int
+    dados: object  # o que `aplicar` devolve; None até a primeira montagem bem-sucedida
+    tomadas: dict
+    atualizado_em: float
+    erros: dict = field(default_factory=dict)
+
+
+class TelemetriaCache:
+    def __init__(self, carregar_base, ler_tomadas, aplicar, stream=None,
+                 intervalo: float = 5.0, intervalo_minimo: float = 0.5):
+        """
+        carregar_base() -> DataFrame com os dispositivos cadastrados
+        ler_tomadas() -> {device_id: leitura}, usado sem stream ou enquanto ele não está ativo
+        aplicar(base, tomadas) -> dados publicados para as sessões
+        """
+        self.carregar_base = carregar_base
+        self.ler_tomadas = ler_tomadas
+        self.aplicar = aplicar
+        self.stream = stream
+        self.intervalo = intervalo
+        self.intervalo_minimo = intervalo_minimo  # junta rajadas de eventos numa só reconstrução
+
+        self.rebuilds = 0
+        self._estado = EstadoTelemetria(0, None, {}, 0.0)
+        self._base = pd.DataFrame()
+        self._tomadas = {}
+        self._erros = {}
+        self._versao_stream = -1
+        self._lock = threading.Lock()  # serializa leituras e publicações
+        self._stop = threading.Event()
+        self._thread = None
+
+    # ---------- ciclo de vida ----------
+    def start(self):
+        # O primeiro estado é montado já na chamada: a primeira sessão não espera a thread
+        if self._estado.versao == 0:
+            self.recarregar()
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="telemetria-cache", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # ---------- leitura ----------
+    def snapshot(self) -> EstadoTelemetria:
+        # Trocar a referência é atômico: quem já leu continua com o estado antigo, intacto
+        return self._estado
+
+    def recarregar(self) -> EstadoTelemetria:
+        """Relê o cadastro e a telemetria e publica um novo estado na thread atual"""
+        with self._lock:
+            self._ler_base()
+            self._ler_tomadas()
+            return self._publicar()
+
+    # ---------- atualização ----------
+    def _run(self):
+        while not self._stop.is_set():
+            if self.stream is not None and self.stream.ativo():
+                self.stream.wait_for_version(self._versao_stream, timeout=self.intervalo)
+            else:
+                self._stop.wait(self.intervalo)
+            if self._stop.is_set():
+                break
+            try:
+                with self._lock:
+                    if self._ler_tomadas():
+                        self._publicar()
+            except Exception:
+                logger.exception("Falha ao atualizar o cache de telemetria")
+            self._stop.wait(self.intervalo_minimo)
+
+    def _ler_base(self):
+        try:
+            self._base = self.carregar_base()
+            self._erros.pop("cadastro", None)
+        except Exception as e:
+            self._erros["cadastro"] = e
+
+    def _ler_tomadas(self) -> bool:
+        """Atualiza as leituras; devolve False quando nada mudou"""
+        aviso_mudou = self._verificar_stream()
+        if self.stream is not None and self.stream.ativo():
+            versao = self.stream.version
+            if versao == self._versao_stream:
+                return aviso_mudou
+            self._versao_stream = versao
+            tomadas = self.stream.snapshot()
+        else:
+            self._versao_stream = -1  # na volta do stream, o snapshot dele é relido
+
+            try:
+                tomadas = self.ler_tomadas()
+            except Exception as e:
+                # Mantém as últimas leituras; republica só para as sessões verem o erro novo
+                novo = "tomadas" not in self._erros
+                self._erros["tomadas"] = e
+                return novo or aviso_mudou
+        erro_resolvido = self._erros.pop("tomadas", None) is not None
+        if tomadas == self._tomadas and self._estado.versao and not erro_resolvido:
+            return aviso_mudou
+        self._tomadas = tomadas
+        return True
+
+    def _verificar_stream(self) -> bool:
+        """Registra (ou limpa) o erro de stream caído; devolve True quando o aviso mudou"""
+        if self.stream is None:
+            return False
+        if self.stream.ativo():
+            return self._erros.pop("stream", None) is not None
+        last_event = self.stream.last_event
+        if last_event is None or "stream" in self._erros:
+            # nunca conectou (ainda): o polling já cobre, sem aviso
+            return False
+        ultimo = time.strftime("%H:%M:%S", time.localtime(last_event))
+        self._erros["stream"] = RuntimeError(
+            f"stream sem eventos desde {ultimo}; lendo por polling a cada {self.intervalo:.0f} s")
+        return True
+
+    def _publicar(self) -> EstadoTelemetria:
+        try:
+            dados = self.aplicar(self._base, self._tomadas)
+        except Exception as e:
+            self._erros["tomadas"] = e
+            dados = self._estado.dados
+        self.rebuilds += 1
+        self._estado = EstadoTelemetria(self._estado.versao + 1, dados, self._tomadas,
+                                        time.time(), dict(self._erros))
+        return self._estado
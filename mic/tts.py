@@ -0,0 +1,254 @@
+"""Síntese de voz com cache de áudio, pool de threads e motor plugável.
+
+- ``MotorGTTS`` (online), ``MotorEspeak`` (offline, via espeak-ng) e
+  ``MotorSilencioso`` (WAV mudo, para testes) seguem a mesma interface:
+  ``nome``, ``formato`` e ``sintetizar(texto, lang) -> bytes``.
+- ``AudioCache`` guarda o áudio em disco endereçado pelo conteúdo (texto
+  normalizado + idioma + motor), com limite de tamanho e descarte LRU.
+- ``SintetizadorTTS`` combina motor, cache e um pool de threads do processo.
+- ``TTSPorSentenca`` recebe o texto em pedaços (streaming do Gemini) e envia
+  cada sentença completa ao sintetizador assim que ela termina.
+- ``juntar_audios`` une os trechos de cada sentença num único áudio, para a
+  resposta ter um só player.
+"""
+import hashlib
+import io
+import os
+import re
+import shutil
+import subprocess
+import threading
+import unicodedata
+import wave
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+
+from mic.metricas import contar, medir
+
+# Fim de sentença: pontuação seguida de espaço, ou quebra de linha
+_FIM_SENTENCA = re.compile(r"(?<=[.!?…])\s+|\n+")
+
+
+# -------------------- Motores --------------------
+class MotorGTTS:
+    nome = "gtts"
+    formato = "audio/mp3"
+
+    def sintetizar(self, texto: str, lang: str = "pt") -> bytes:
+        from gtts import gTTS
+        buffer = io.BytesIO()
+        gTTS(texto, lang=lang).write_to_fp(buffer)
+        return buffer.getvalue()
+
+
+class MotorEspeak:
+    nome = "espeak"
+    formato = "audio/wav"
+    VOZES = {"pt": "pt-br"}
+
+    def __init__(self, executavel: str = None):
+        self.executavel = executavel or shutil.which("espeak-ng") or shutil.which("espeak")
+        if not self.executavel:
+            raise RuntimeError("espeak-ng/espeak não encontrado no PATH")
+
+    def sintetizar(self, texto: str, lang: str = "pt") -> bytes:
+        r = subprocess.run([self.executavel, "--stdout", "-v", self.VOZES.get(lang, lang), texto],
+                           capture_output=True, check=True, timeout=30)
+        return r.stdout
+
+
+class MotorSilencioso:
+    """WAV mudo com duração proporcional ao texto; não depende de rede nem de binários"""
+    nome = "silencioso"
+    formato = "audio/wav"
+
+    def __init__(self, taxa: int = 8000, segundos_por_caractere: float = 0.06):
+        self.taxa = taxa
+        self.segundos_por_caractere = segundos_por_caractere
+
+    def sintetizar(self, texto: str, lang: str = "pt") -> bytes:
+        buffer = io.BytesIO()
+        with wave.open(buffer, "wb") as w:
+            w.setnchannels(1)
+            w.setsampwidth(1)
+            w.setframerate(self.taxa)
+            w.writeframes(b"\x80" * int(len(texto) * self.segundos_por_caractere * self.taxa))
+        return buffer.getvalue()
+
+
+MOTORES = {"gtts": MotorGTTS, "espeak": MotorEspeak, "silencioso": MotorSilencioso}
+
+
+def criar_motor(nome: str = "gtts"):
+    try:
+        return MOTORES[nome]()
+    except KeyError:
+        raise ValueError(f"Motor de TTS desconhecido: {nome} (opções: {', '.join(MOTORES)})")
+
+
+# -------------------- Cache --------------------
+def normalizar(texto: str) -> str:
+    return " ".join(unicodedata.normalize("NFC", texto).split()).lower()
+
+
+class AudioCache:
+    def __init__(self, directory: str = os.path.join(".cache", "tts"), max_bytes: int = 50 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._total = sum(e.stat().st_size for e in os.scandir(directory) if e.is_file())
+
+    @staticmethod
+    def chave(texto: str, lang: str, motor: str) -> str:
+        return hashlib.sha256(f"{motor}|{lang}|{normalizar(texto)}".encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.audio")
+
+    def get(self, key: str):
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                audio = f.read()
+            os.utime(path)  # mtime marca o uso mais recente (LRU)
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return audio
+
+    def put(self, key: str, audio: bytes):
+        path = self._path(key)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(audio)
+        with self._lock:
+            previous = os.path.getsize(path) if os.path.exists(path) else 0
+            os.replace(tmp, path)
+            self._total += len(audio) - previous
+            if self._total > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        entries = sorted((e for e in os.scandir(self.directory) if e.name.endswith(".audio")),
+                         key=lambda e: e.stat().st_mtime)
+        for entry in entries:
+            if self._total <= self.max_bytes:
+                break
+            size = entry.stat().st_size
+            try:
+                os.remove(entry.path)
+                self._total -= size
+            except FileNotFoundError:
+                pass
+
+
+# -------------------- Sintetizador --------------------
+class SintetizadorTTS:
+    def __init__(self, motor=None, cache: AudioCache = None, max_workers: int = 2):
+        self.motor = motor or MotorGTTS()
+        self.cache = cache
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tts")
+
+    @property
+    def formato(self) -> str:
+        return self.motor.formato
+
+    def _gerar(self, key: str, texto: str, lang: str) -> bytes:
+        with medir("tts", motor=self.motor.nome):
+            audio = self.motor.sintetizar(texto, lang)
+        if self.cache is not None:
+            self.cache.put(key, audio)
+        return audio
+
+    def sintetizar(self, texto: str, lang: str = "pt") -> bytes:
+        return self.submeter(texto, lang).result()
+
+    def submeter(self, texto: str, lang: str = "pt") -> Future:
+        """Sintetiza no pool; acertos de cache voltam como futuros já resolvidos"""
+        key = AudioCache.chave(texto, lang, self.motor.nome)
+        if self.cache is not None:
+            audio = self.cache.get(key)
+            contar("tts_cache", resultado="falha" if audio is None else "acerto")
+            if audio is not None:
+                futuro = Future()
+                futuro.set_result(audio)
+                return futuro
+        return self._executor.submit(self._gerar, key, texto, lang)
+
+
+def dividir_sentencas(texto: str):
+    """Separa as sentenças completas do trecho final ainda incompleto"""
+    partes = _FIM_SENTENCA.split(texto)
+    return [p.strip() for p in partes[:-1] if p.strip()], partes[-1]
+
+
+class TTSPorSentenca:
+    def __init__(self, sintetizador: SintetizadorTTS, lang: str = "pt"):
+        self.sintetizador = sintetizador
+        self.lang = lang
+        self._pendente = ""
+        self._futuros = []
+        self._entregues = 0
+
+    def adicionar(self, pedaco: str):
+        """Acrescenta texto; sentenças completas entram na fila de síntese"""
+        sentencas, self._pendente = dividir_sentencas(self._pendente + pedaco)
+        for sentenca in sentencas:
+            self._futuros.append(self.sintetizador.submeter(sentenca, self.lang))
+
+    def finalizar(self):
+        """Envia o trecho final que não terminou em pontuação"""
+        if self._pendente.strip():
+            self._futuros.append(self.sintetizador.submeter(self._pendente.strip(), self.lang))
+        self._pendente = ""
+
+    def prontos(self) -> list:
+        """Áudios já sintetizados, em ordem, sem bloquear (erros voltam como exceções)"""
+        saida = []
+        while self._entregues < len(self._futuros) and self._futuros[self._entregues].done():
+            saida.append(self._resultado(self._futuros[self._entregues]))
+            self._entregues += 1
+        return saida
+
+    def concluido(self) -> bool:
+        """True quando todas as sentenças enviadas já foram sintetizadas (ou falharam)"""
+        return all(f.done() for f in self._futuros)
+
+    def audios(self) -> list:
+        """Todos os áudios, em ordem, sem bloquear: os ainda em síntese voltam como TimeoutError"""
+        return [self._resultado(f) if f.done() else TimeoutError("áudio ainda em síntese") for f in self._futuros]
+
+    def aguardar(self, timeout: float = None) -> list:
+        """Espera os áudios restantes por até ``timeout`` segundos; os atrasados voltam como TimeoutError"""
+        restantes = self._futuros[self._entregues:]
+        wait(restantes, timeout=timeout)
+        saida = [self._resultado(f) if f.done() else TimeoutError("áudio ainda em síntese") for f in restantes]
+        self._entregues = len(self._futuros)
+        return saida
+
+    @staticmethod
+    def _resultado(futuro):
+        try:
+            return futuro.result()
+        except Exception as e:
+            return e
+
+
+def juntar_audios(audios: list, formato: str) -> bytes:
+    """Une os trechos num só áudio: WAV é reescrito com um cabeçalho; MP3 aceita os quadros concatenados"""
+    audios = [a for a in audios if a]
+    if formato != "audio/wav" or len(audios) < 2:
+        return b"".join(audios)
+    saida = io.BytesIO()
+    with wave.open(saida, "wb") as w:
+        for i, audio in enumerate(audios):
+            with wave.open(io.BytesIO(audio), "rb") as r:
+                if i == 0:
+                    w.setparams(r.getparams())
+                w.writeframes(r.readframes(r.getnframes()))
+    return saida.getvalue()